@@ -1,248 +1,42 @@
-from contextlib import contextmanager
-
-# Stack of temporary speed profiles (LIFO). Each item can include:
-#  - "dp": {node_index -> multiplier}
-#  - "fo": {doc_index -> multiplier}
-#  - "ai": {stage_index -> multiplier}
-#  - "ai_per_payload_stage": {(payload_index, stage_index) -> multiplier}
-SPEED_OVERRIDES = []
-
-def _apply_overrides(seconds: float, *, kind: str = None, index=None, payload_idx=None, stage_idx=None) -> float:
-    """Apply all active SPEED_OVERRIDES to a given duration."""
-    mult = 1.0
-    for ov in SPEED_OVERRIDES:
-        if kind == "dp" and index is not None:
-            mult *= ov.get("dp", {}).get(index, 1.0)
-        elif kind == "fo" and index is not None:
-            mult *= ov.get("fo", {}).get(index, 1.0)
-        elif kind == "ai":
-            if stage_idx is not None:
-                mult *= ov.get("ai", {}).get(stage_idx, 1.0)
-            if payload_idx is not None and stage_idx is not None:
-                mult *= ov.get("ai_per_payload_stage", {}).get((payload_idx, stage_idx), 1.0)
-    return seconds * mult
-
-@contextmanager
-def speed_profile(*, dp=None, fo=None, ai=None, ai_per_payload_stage=None):
-    """Temporarily adjust speed of specific nodes/stages while inside the context."""
-    SPEED_OVERRIDES.append({
-        "dp": dp or {},
-        "fo": fo or {},
-        "ai": ai or {},
-        "ai_per_payload_stage": ai_per_payload_stage or {},
-    })
-    try:
-        yield
-    finally:
-        SPEED_OVERRIDES.pop()
-
-# --- Drop-in wait wrappers that respect overrides ---
-def wait_dp(node_index: int, phase: str):     # phase: "progress" | "success"
-    dur = SIM[f"dp_{phase}"] * SPEED_FACTOR
-    dur = _apply_overrides(dur, kind="dp", index=node_index)
-    _sleep_smooth(dur)
-
-def wait_fo(doc_index: int, phase: str):      # phase: "progress" | "success"
-    key = "fo_progress" if phase == "progress" else "fo_success"
-    dur = SIM[key] * SPEED_FACTOR
-    dur = _apply_overrides(dur, kind="fo", index=doc_index)
-    _sleep_smooth(dur)
-
-def wait_ai_phase(sim_key: str, *, payload_idx=None, stage_idx=None):
-    # sim_key is one of: "ai_progress", "ai_advance", "ai_settle" (you already use these)
-    dur = SIM.get(sim_key, 0.5) * SPEED_FACTOR
-    dur = _apply_overrides(dur, kind="ai", payload_idx=payload_idx, stage_idx=stage_idx)
-    _sleep_smooth(dur)
-
-  ##################################
-
-def _stage_duration(stage: int, payload_idx=None) -> float:
-    """Randomized dwell time for a payload at a given stage, scaled by SPEED_FACTOR and overrides."""
-    base = AI_STAGE_BASE[stage]
-    jitter = random.uniform(0.75, 1.35)
-    dur = base * jitter * SPEED_FACTOR
-    # Apply any AI overrides (global stage and/or (payload,stage) specific)
-    dur = _apply_overrides(dur, kind="ai", payload_idx=payload_idx, stage_idx=stage)
-    return dur
-
-###############################
-
-# Initial ETAs
-etas = [_stage_duration(0, p) for p in range(TOTAL_INTENTS)]
-
-# When a payload advances:
-if payloads_idx[p_next] < last_idx:
-    etas[p_next] = _stage_duration(payloads_idx[p_next], p_next)
-else:
-    etas[p_next] = INF
-
-
-###########################
-if failing_active and idx == BULK_FAIL_DOC_INDEX:
-    prev_node = 3  # "Proxy Document Retriever"
-
-    # While failing: slow Async DB (node 4), speed the others a bit, and
-    # optionally slow this specific doc's FO progress slightly for dramatization.
-    with speed_profile(
-        dp={4: 1.8, 0: 0.8, 1: 0.8, 2: 0.8, 3: 0.8, 5: 0.8},
-        fo={idx: 1.2},
-    ):
-        # Step 1: show error on Async DB with back arrow to Proxy
-        dp_states[4] = "error"
-        retry_badges[4] = {"type": "live", "label": "↶", "title": "Retrying via Proxy"}
-        event_chips.append('<span class="red">↑</span> Async DB → Proxy')
-        arrow_back_idx, arrow_back_live = 3, True
-        paint_lane(ingested=done, total=len(docs))
-
-        # Step 2: re-process Proxy (speeded up)
-        dp_states[prev_node] = "progress"; paint_lane(ingested=done, total=len(docs)); wait_dp(prev_node, "progress")
-        dp_states[prev_node] = "success";  paint_lane(ingested=done, total=len(docs)); wait_dp(prev_node, "success")
-
-        # Step 3: Async DB retries (slowed)
-        dp_states[4] = "progress"; paint_lane(ingested=done, total=len(docs)); wait_dp(4, "progress")
-
-        # doc completes (fanout timing respects FO override for this doc)
-        doc_states[idx] = "success"; done += 1
-        event_chips.append('<span class="green">✓</span> Recovered')
-        retry_badges[4] = {"type": "scar", "title": "1 retry on this stage"}
-        arrow_back_idx, arrow_back_live = None, False
-
-        paint_lane(ingested=done, total=len(docs))
-        fanout_area.markdown(render_fanout(docs, doc_states), unsafe_allow_html=True)
-        wait_fo(idx, "success")
-
-        failing_active = False
-
-        # Trigger Evaluation pacing unchanged (optional to keep as-is)
-        if (not trigger_started) and (done >= min(TRIGGER_START_AFTER, len(docs))):
-            trigger_started = True
-            dp_states[5] = "progress"
-            payloads_sent = 1
-            paint_lane(ingested=done, total=len(docs), payloads=payloads_sent, payloads_total=TOTAL_INTENTS)
-            wait("tr_start")
-        elif trigger_started and payloads_sent < TOTAL_INTENTS:
-            payloads_sent += 1
-            paint_lane(ingested=done, total=len(docs), payloads=payloads_sent, payloads_total=TOTAL_INTENTS)
-            wait("tr_tick")
-        else:
-            paint_lane(ingested=done, total=len(docs))
-
-    continue  # IMPORTANT
-
-#####################################
-if (
-    credit_fail_active and not credit_fail_consumed
-    and abl_payload_index is not None
-    and p_next == abl_payload_index
-    and payloads_idx[p_next] == 4
-):
-    # Slow just ABL on stage 4 (invocation), speed other stages slightly
-    with speed_profile(
-        ai={0: 0.85, 1: 0.85, 2: 0.85, 3: 0.85, 5: 0.85},
-        ai_per_payload_stage={ (abl_payload_index, 4): 1.9 }
-    ):
-        # 1) show error + live badge + back arrow
-        ai_state_overrides[4] = "error"
-        ai_retry_badges[4] = {"type": "live", "label": "↶", "title": "Retrying via Context"}
-        ai_event_chips.append('↶ Credit AI → Context • ABL')
-        ai_arrow_back_idx, ai_arrow_back_live = 3, True
-
-        card_overrides["ABL"] = {"pill": "retrying", "at": "Retrying via Context (ABL)"}
-        paint_ai()
-        wait_ai_phase("ai_progress", payload_idx=abl_payload_index, stage_idx=4)
-
-        # 2) re-process Context (stage 3) while invocation remains errored
-        ai_state_overrides[3] = "progress"; paint_ai()
-        wait_ai_phase("ai_progress", payload_idx=abl_payload_index, stage_idx=3)
-
-        ai_state_overrides[3] = "success";  paint_ai()
-        wait_ai_phase("ai_settle", payload_idx=abl_payload_index, stage_idx=3)
-
-        # 3) retry succeeds: clear error, keep scar
-        ai_state_overrides.pop(4, None)
-        ai_retry_badges[4] = {"type": "scar", "title": "1 retry on this stage"}
-        ai_event_chips.append('✓ Recovered (ABL)')
-        ai_arrow_back_idx, ai_arrow_back_live = None, False
-        card_overrides.pop("ABL", None)
-
-        credit_fail_consumed = True
-        paint_ai()
-        # continue to normal loop repaint
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
 import streamlit as st
 import re
 import base64
 
-from datetime import datetime
-import html, random
+import html, os, random
 import time as _time
-# import requests
-# from auth import get_authenticated_headers
-
-def mock_fetch_intent_result(intent: str) -> dict:
-    """Mock of your API result. Replace with the real call later."""
-    long_texts = {
-        "Business Description": (
-            "The company operates a diversified platform with recurring revenue streams "
-            "across software subscriptions and transaction processing. Go-to-market is hybrid "
-            "(direct + partners) with concentration in the mid-market. Unit economics show "
-            "steady CAC payback under 12 months with gross retention >90% and NRR ~112%. "
-            "Key dependencies include cloud infra providers and a two-sided network of ISVs and channel partners. "
-            "Regulatory exposure is limited but expanding with payments attach. "
-            "Growth is expected to normalize as larger cohorts mature, with incremental margin from automation."
-        ),
-        "Recent Developments": (
-            "Management closed two tuck-ins in Q2 focused on workflow automation; integrations are on-track. "
-            "Pricing was re-aligned for tiered value, with minimal logo churn. "
-            "A targeted restructuring reduced OpEx by ~6% while preserving roadmap capacity. "
-            "Debt refi extended maturities to 2029 at a modest spread increase; covenant headroom remains ample. "
-            "Customer health mixed: usage stabilizing in SMB while enterprise pilots expand."
-        ),
-        "ABL": (
-            "Borrowing base primarily AR (Net 85) with immaterial inventory. "
-            "Advance rates align with policy (85% AR, 20% inventory cap). "
-            "Dilution/offsets trend at 2.1%–2.6%; top-10 obligors <30% of AR. "
-            "Covenants include springing FCCR and minimum liquidity. "
-            "Field exam flagged minor documentation gaps; remediation underway. "
-            "No in-eligibles from cross-aging; concentrations monitored monthly."
-        ),
-    }
-    return {
-        "intent": intent,
-        "llm_response": long_texts.get(intent, "Generated text... " * 20),
-        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-    }
+from stylesheet import stylesheet_tag
+from theme import APP_CSS_BLOCKS
+from simulation import (
+    AI_BATCH_MEMBER_COST, AI_BATCH_STAGE, AI_BATCH_WINDOW, AI_LANE_CAPACITY, AI_NODES, AI_SCHEDULING_POLICY,
+    AI_WORKERS, DEMO_SEED, DOC_NODES, DOC_TYPES, DOWNLOAD_HIT_COST, PAYLOAD_QUEUE_CAPACITY, PAYLOAD_QUEUE_OVERFLOW,
+    PAYLOAD_SECTION_NAMES, SIM, SPEED_FACTOR, TOTAL_INTENTS,
+    pause, sleep_smooth, sleeper, speed_profile, stage_duration, wait, wait_ai_phase, wait_dp, wait_fo,
+)
+from cancellation import CancelToken, Cancelled, cancel_scope
+from concurrency_limit import INVOCATION_LIMITER
+from section_coverage import REVIEW_LEDGER, affected_sections, covered_documents, diff_documents, document_record
+from generation_cache import GENERATION_CACHE, document_hash, generation_key
+from fault_injection import CONFIGURED_FAULTS, FaultInjector, demo_faults
+from run_journal import RUN_JOURNAL
+from retry_policy import (
+    DEFAULT_RETRY_POLICY, RETRY_STATS, STAGE_RETRY_POLICIES, CircuitOpenError, StageFailure, run_with_retry,
+)
+from scheduling import (
+    DEFAULT_SECTION_DEADLINE, RUN_POLICIES, STAGE_HISTORY, BatchWindow, BoundedQueue, Job, WorkerPool, make_policy,
+)
+from trigger_rules import TriggerEvaluator
+from ingest_writer import INGEST_COMMIT_TIMEOUT, INGEST_FLUSH_EVERY, INGEST_WRITER, IngestError, extract_chunks
+from job_queue import JOB_CLAIM_POLL, JOB_QUEUE, WORKER_ID, ReviewLeased, inputs_hash
+from object_store import DOCUMENT_UPLOADER, document_key, open_document
+from download_cache import DOWNLOAD_CACHE, DownloadError
+from intents import (
+    SectionStream, invalidate_sections, iter_bulk_results, iter_intent_results, parse_review_keys,
+    stream_batch_results, stream_intent_result,
+)
+
+st.set_page_config(page_title="Memo Generation Demo", layout="wide")
 
-# def get_intent_result(intent, risk_party_id, review_id):
-#     headers = get_authenticated_headers()
-#     base_url = "url"
-#     response = requests.get(f"{base_url}/{risk_party_id}/{review_id}/{intent}", headers=headers)
+STREAM_REPAINT_EVERY = 0.12   # seconds between card repaints while sections stream
 
 def make_snippet(text: str, limit: int = 280) -> str:
     text = (text or "").strip()
@@ -254,70 +48,6 @@ def make_snippet(text: str, limit: int = 280) -> str:
     return text[:cut] + "…"
 
 
-DOC_TYPES = ["10K", "10Q", "Earnings", "Underwriting Memo", "Inventory Appraisal", "Field Exam"]
-
-TRIGGER_START_AFTER = 2   # start Trigger Evaluation once this many docs are ingested
-
-# --- Bulk ingest failure config ---
-BULK_FAIL_THRESHOLD = 2     # trigger the failure path when total docs > this
-BULK_FAIL_DOC_INDEX = 1     # 0-based index of the doc that fails once (2 => 3rd doc)
-
-# --- Per-stage timings (seconds) ---
-SIM = {
-    "dp_progress": 1.00,   # each of the first 4 nodes: progress animation
-    "dp_success":  0.35,   # short settle after success
-    "fo_progress": 0.90,   # per-doc ingest "Ingesting…"
-    "fo_success":  0.45,   # per-doc "Ready" settle
-    "tr_progress": 1.00,   # Trigger Evaluation progress
-    "tr_success":  0.35,   # Trigger Evaluation success settle
-}
-
-SIM.update({
-    "tr_start":  0.80,   # when TE first flips to progress
-    "tr_tick":   0.50,   # each payload sent (counter increments)
-    "tr_finish": 0.60,   # settle after last payload, before success
-})
-
-SIM.update({
-    "ai_progress": 0.80,   # highlight current AI stage
-    "ai_advance":  0.60,   # move payloads to next stage
-    "ai_settle":   0.35,   # small settle after each hop
-})
- 
-
-
-# Optional global multiplier for quick tuning (e.g., 1.0 normal, 1.5 slower, 2.0 slowest)
-SPEED_FACTOR = 1.0
-
-# Use existing sleep_step for smooth repaint; fall back if missing
-def _sleep_smooth(seconds: float):
-    try:
-        sleep_step(seconds)   # your existing function
-    except NameError:
-        import time
-        # fallback: chunked sleep so Streamlit can repaint
-        steps = max(1, int(seconds * 5))
-        for _ in range(steps):
-            time.sleep(seconds / steps)
-
-def wait(key: str):
-    dur = SIM[key] * SPEED_FACTOR
-    _sleep_smooth(dur)
-
-import random
-random.seed(7)  # deterministic demo; change/remove for more variety
-
-# Time to traverse each AI stage j -> j+1 (seconds, pre-jitter)
-# indexes: 0:Receive→Prompt, 1:Prompt→Download, 2:Download→Context,
-#          3:Context→Invocation, 4:Invocation→Output
-AI_STAGE_BASE = [0.7, 0.6, 0.6, 0.8, 1.1]
-
-def _stage_duration(stage: int) -> float:
-    """Randomized dwell time for a payload at a given stage, scaled by SPEED_FACTOR."""
-    base = AI_STAGE_BASE[stage]
-    jitter = random.uniform(0.75, 1.35)
-    return base * jitter * SPEED_FACTOR
-
 DATE_RE = re.compile(r"^(?:\d{4}|Q[1-4]\d{4})$")  # 2024 or Q22024
 
 def is_valid_business_date(s: str) -> bool:
@@ -326,46 +56,6 @@ def is_valid_business_date(s: str) -> bool:
     return bool(DATE_RE.match(s.strip()))
 
 
-# ===============================
-# THEME / COLORS (GS palette)
-# ===============================
-
-st.set_page_config(page_title="Memo Generation Demo", layout="wide")
-
-PRIMARY        = "#7297C5"  
-PRIMARY_DARK   = "#4F79B1"
-PRIMARY_LIGHT  = "#AFC3E1"
-BG_TOP         = "#F7FAFF"
-BG_MID         = "#EFF4FB"
-BG_BOTTOM      = "#E6EFFA"
-TEXT_DARK      = "#16324A"
-ERROR          = "#E74C3C"
-PENDING        = "#98A6B3"
-SUCCESS        = "#34C759"
-PROGRESS       = "#F4C542"
-
-DOC_NODES = [
-        "Document Upload",
-        "S3 Upload",
-        "Section Coverage Analysis",
-        "Proxy Document Retriever",
-        "Async DB Ingestion",
-        "Trigger Evaluation", 
-    ]
-
-AI_NODES = [
-    "Receive Generation Payloads",
-    "Prompt Manager",
-    "Download Documents",
-    "Context Assembly / Upload",
-    "Credit AI Invocation",
-    "Output Delivery",
-]
-
-# We have 3 sections now
-PAYLOAD_SECTION_NAMES = ["Business Description", "Recent Developments", "ABL"]
-TOTAL_INTENTS = len(PAYLOAD_SECTION_NAMES)  # = 3
-
 def _ai_counts(payloads_idx, n_nodes):
     counts = [0]*n_nodes
     for idx in payloads_idx:
@@ -428,16 +118,25 @@ def _paint_ai_lane(
     ai_lane_area.markdown(f'<div class="board">{html_lane}</div>', unsafe_allow_html=True)
 
 
-def _render_occupancy_row(payloads_idx, total_payloads):
+def _render_occupancy_row(payloads_idx, total_payloads, queue=None, in_flight=0):
     counts = _ai_counts(payloads_idx, len(AI_NODES))
     cells = []
     for c in counts:
         dots = ''.join(f'<span class="occ-dot {"on" if k < c else ""}"></span>' for k in range(total_payloads))
         cells.append(f'<div class="occ-cell">{dots}</div>')
-    return f'<div class="occ-strip">{"".join(cells)}</div>'
-
-def _render_payload_cards(names, idxs, results_map, card_overrides=None):
+    strip = f'<div class="occ-strip">{"".join(cells)}</div>'
+    if queue is None:
+        return strip
+    # queue feeding the lane: one dot per slot (numbers only for large queues), then the lane's intake
+    dots = ''.join(f'<span class="gdot {"on" if k < len(queue) else ""}"></span>'
+                   for k in range(queue.capacity)) if queue.capacity <= 12 else ""
+    shed = f' • {queue.stats["shed"]} shed' if queue.stats["shed"] else ""
+    return strip + (f'<div class="global-meter">{html.escape(queue.name)} {dots} {len(queue)}/{queue.capacity}'
+                    f' • lane {in_flight}/{AI_LANE_CAPACITY} in flight{shed}</div>')
+
+def _render_payload_cards(names, idxs, results_map, card_overrides=None, streams=None):
     card_overrides = card_overrides or {}
+    streams = streams or {}
     last = len(AI_NODES) - 1
     cards = []
     for name, idx in zip(names, idxs):
@@ -446,12 +145,26 @@ def _render_payload_cards(names, idxs, results_map, card_overrides=None):
         done = idx >= last
 
         ov = card_overrides.get(name, {})
-        pill = ov.get("pill") or ("success" if done else "progress")
+        streaming = done and name not in results_map and name in streams
+        pill = ov.get("pill") or ("streaming" if streaming else ("success" if done else "progress"))
 
         # Body text: allow an override line (e.g., "Retrying via Context")
-        if done and name in results_map and not ov.get("at"):
+        if streaming and not ov.get("at"):
+            stream = streams[name]
+            first = f"first chunk {stream.ttfc:.2f}s" if stream.ttfc is not None else "waiting for first chunk…"
+            body = (
+                f'<div class="doc-meta">Streaming • {first}</div>'
+                f'<div class="fulltext">{html.escape(stream.text)}▌</div>'
+            )
+        elif done and name in results_map and not ov.get("at"):
             res = results_map[name]
             ts = html.escape(res.get("timestamp", ""))
+            if res.get("ttfc") is not None and res.get("ttc") is not None:
+                ts += f' • first chunk {res["ttfc"]:.2f}s • complete {res["ttc"]:.2f}s'
+            elif res.get("cached"):
+                ts += " • from cache"
+            elif res.get("unchanged"):
+                ts += " • unchanged since last run"
             full = html.escape(res.get("llm_response", ""))
             snippet = html.escape(make_snippet(res.get("llm_response", "")))
             body = (
@@ -469,7 +182,7 @@ def _render_payload_cards(names, idxs, results_map, card_overrides=None):
             f'<h5>{html.escape(name)}</h5>'
             f'{body}'
             f'<div class="segbar">{segs}</div>'
-            f'<span class="status-pill {pill}">{"Done" if pill=="success" else ("Retrying…" if pill=="retrying" else ("Error" if pill=="error" else "Processing"))}</span>'
+            f'<span class="status-pill {pill}">{"Done" if pill=="success" else ("Retrying…" if pill=="retrying" else ("Error" if pill=="error" else ("Streaming…" if pill=="streaming" else ("Queued" if pill=="pending" else "Processing"))))}</span>'
             f'</div>'
         )
 
@@ -480,131 +193,6 @@ def _render_payload_cards(names, idxs, results_map, card_overrides=None):
         '</div>'
     )
 
-st.markdown("""
-<style>
-/* --- Review page: hide rogue unlabeled TextInput (prevents blank full-width pill) --- */
-.form-card [data-testid="stTextInput"]:has([data-testid="stWidgetLabel"] p:empty) {
-  display: none !important;
-  margin: 0 !important;
-  padding: 0 !important;
-  border: 0 !important;
-}
-/* Be safe: if the label exists but is whitespace-only, hide it too */
-.form-card [data-testid="stWidgetLabel"] p:empty { display:none !important; }
-</style>
-""", unsafe_allow_html=True)
-
-LANE_BASE_CSS = f""" 
-<style>
-.board {{
-  background: rgba(255, 255, 255, 0.98);
-  border: 1px solid rgba(22, 50, 74, 0.08);
-  border-radius: 16px;
-  box-shadow: 0 8px 24px rgba(22, 50, 74, 0.08);
-  padding: 14px 16px;
-}}
-.group-title {{
-  font-weight: 800; color: {PRIMARY}; margin: 4px 0 8px 4px; letter-spacing: .2px;
-}}
-.lane {{
-  display: flex; align-items: center; gap: 14px; flex-wrap: nowrap;
-  overflow-x: auto; padding: 10px 8px 14px 8px; border-radius: 12px;
-  background: #FAFDFF; border: 1px dashed rgba(79, 121, 177, 0.18);
-}}
-.node-wrap {{ position: relative; display: inline-block; }}
-.node-pill {{
-  flex-shrink: 0; min-width: 160px; text-align: center; white-space: nowrap;
-  padding: 10px 14px; border-radius: 999px; font-weight: 700; color: #173044;
-  background: #EEF3F7; border: 1px solid rgba(25, 53, 74, 0.08);
-  transition: background-color .6s ease, box-shadow .6s ease, border-color .6s ease, color .6s ease;
-}}
-.node-pill.pending  {{ background: #EEF3F7; color: #41515C; }}
-.node-pill.progress {{ background: {PROGRESS}; color: #132C3C; }}
-.node-pill.success  {{ background: {SUCCESS};  color: #06220E;  }}
-
-.arrow-flex {{
-  flex: 1 1 0; display: flex; align-items: center; justify-content: center;
-  min-width: 24px; font-size: 22px; color: rgba(60,84,96,0.65); user-select: none;
-}}
-.arrow-back {{ color:#E74C3C; text-shadow:0 0 8px rgba(231,76,60,0.22); }}
-.arrow-back.pulse {{ animation: backpulse .9s ease-in-out infinite; }}
-
-@keyframes backpulse {{
-  0%   {{ transform: translateY(0); }}
-  50%  {{ transform: translateY(-1px); }}
-  100% {{ transform: translateY(0); }}
-}}
-</style>
-"""
-
-st.markdown(LANE_BASE_CSS, unsafe_allow_html=True)
-
-BADGES_AND_EVENTS_CSS = f"""
-<style>
-/* Anchor badges to each pill */
-.node-wrap {{ position: relative; display: inline-block; }}
-
-.retry-badge {{
-  position: absolute; top: -8px; right: -8px;
-  background: {ERROR}; color: #fff; font-weight: 800;
-  border-radius: 10px; padding: 2px 6px; font-size: 11px; line-height: 1;
-  box-shadow: 0 4px 10px rgba(231,76,60,0.28);
-}}
-
-.retry-scar {{
-  position: absolute; top: -6px; right: -6px;
-  width: 10px; height: 10px; border-radius: 50%;
-  background: #A8B6C8; box-shadow: 0 0 0 2px rgba(168,182,200,0.25);
-}}
-
-/* Row of event chips under the lane */
-.event-row {{ margin: 6px 2px 0; display: flex; gap: 8px; flex-wrap: wrap; }}
-.event-chip {{
-  background:#F3F7FD; color:#435768; border:1px solid rgba(22,50,74,0.10);
-  padding: 4px 8px; border-radius: 999px; font-size:12px; font-weight:700;
-}}
-.event-chip .red   {{ color: {ERROR}; }}
-.event-chip .green {{ color: #2E7D32; }}
-</style>
-"""
-st.markdown(BADGES_AND_EVENTS_CSS, unsafe_allow_html=True)
-
-st.markdown("""
-<style>
-/* Make "Retrying…" pills red (card-level only) */
-.status-pill.retrying { background:#E74C3C; color:#ffffff; }
-.status-pill.error    { background:#E74C3C; color:#ffffff; }
-</style>
-""", unsafe_allow_html=True)
-
-st.markdown("""
-<style>
-/* Soft pulse for in-progress lane nodes (affects both pipelines) */
-@keyframes pillPulse {
-  0%   { transform: translateZ(0) scale(1.00); box-shadow: 0 0 0 0 rgba(255,149,0,.35); }
-  50%  { transform: translateZ(0) scale(1.035); box-shadow: 0 0 0 7px rgba(255,149,0,.10); }
-  100% { transform: translateZ(0) scale(1.00); box-shadow: 0 0 0 0 rgba(255,149,0,0); }
-}
-.node-pill.progress {
-  animation: pillPulse 1.25s ease-in-out infinite;
-  will-change: transform, box-shadow;
-  border-color: rgba(255,149,0,.55);
-}
-
-/* If you ever mark a lane node as "retrying", give it the same pulse */
-.node-pill.retrying {
-  animation: pillPulse 1.25s ease-in-out infinite;
-  will-change: transform, box-shadow;
-}
-
-/* Respect reduced motion prefs */
-@media (prefers-reduced-motion: reduce) {
-  .node-pill.progress,
-  .node-pill.retrying { animation: none; }
-}
-</style>
-""", unsafe_allow_html=True)
-
 
 
 def lane_html(
@@ -649,366 +237,26 @@ def lane_html(
     return html_lane
 
 
-GLOBAL_CSS = f"""
-<style>
-/* Force light background even if Streamlit is in dark mode */
-[data-testid="stAppViewContainer"] {{
-  background: linear-gradient(135deg, {BG_TOP} 0%, {BG_MID} 45%, {BG_BOTTOM} 100%);
-}}
-[data-testid="stHeader"] {{ background: transparent; }}
-.block-container {{ padding-top: 0 !important; padding-bottom: 0 !important; }}
-
-/* Hero */
-.hero-wrap {{
-  padding: 10vh 0 2vh;   /* not full-height → leaves room for buttons */
-  display: block;
-}}
-.hero {{
-  width: min(920px, 92vw);
-  margin: 0 auto;
-  background: rgba(255,255,255,0.98);
-  border: 1px solid rgba(22,50,74,0.08);
-  border-radius: 18px;
-  box-shadow: 0 16px 40px rgba(22,50,74,0.10);
-  padding: 36px 36px 24px 36px;
-  text-align: center;
-}}
-.hero h1 {{ margin: 0 0 10px; color: {TEXT_DARK}; font-weight: 800; }}
-.hero p  {{ margin: 0; color: #435768; }}
-
-/* Button row right under the hero */
-.btn-wrap {{
-  width: min(920px, 92vw);
-  margin: 14px auto 0 auto;
-  display: flex; gap: 14px; justify-content: center;
-}}
-
-.primary-btn button {{
-  background: linear-gradient(135deg, {PRIMARY} 0%, {PRIMARY_DARK} 100%) !important;
-  color: #fff !important; border: 0 !important;
-  padding: 0.9rem 1.4rem !important;
-  border-radius: 12px !important; font-weight: 800 !important;
-  box-shadow: 0 10px 22px rgba(79,121,177,0.28);
-}}
-.primary-btn button:hover {{
-  transform: translateY(-2px) scale(1.02);
-  box-shadow: 0 14px 26px rgba(79,121,177,0.36);
-}}
-.secondary-btn button {{
-  background: transparent !important; color: {PRIMARY_DARK} !important;
-  border: 2px solid {PRIMARY_DARK} !important;
-  padding: 0.85rem 1.25rem !important; border-radius: 12px !important; font-weight: 800 !important;
-}}
-.secondary-btn button:hover {{
-  transform: translateY(-2px) scale(1.02);
-  background: {PRIMARY_LIGHT}22 !important;
-  border-color: {PRIMARY} !important;
-}}
-</style>
-"""
-UPLOAD_CSS = f"""
-<style>
-/* Force light app background even in dark mode */
-[data-testid="stAppViewContainer"] {{
-  background: linear-gradient(135deg, #F7FAFF 0%, #EFF4FB 45%, #E6EFFA 100%);
-}}
-[data-testid="stHeader"] {{ background: transparent; }}
-
-/* -------- Inputs: text + select -------- */
-[data-testid="stTextInput"] input,
-[data-testid="stSelectbox"] [role="combobox"],
-[data-testid="stDateInput"] input {{
-  background: #FFFFFF !important;
-  color: {TEXT_DARK} !important;
-  border: 1.5px solid {PRIMARY_LIGHT} !important;
-  border-radius: 12px !important;
-  padding: 10px 12px !important;
-  box-shadow: 0 1px 2px rgba(22,50,74,0.06) inset;
-}}
-/* Focus ring */
-/*[data-testid="stTextInput"] input:focus,*/
-/*[data-testid="stSelectbox"] [role="combobox"]:focus,*/
-/*[data-testid="stDateInput"] input:focus {{*/
-  /*outline: none !important;*/
-  /*border-color: {PRIMARY} !important;*/
-  /*box-shadow: 0 0 0 3px {PRIMARY}22 !important;*/
-}}
-/* Labels */
-[data-testid="stWidgetLabel"] > p {{
-  color: {TEXT_DARK} !important;
-  font-weight: 700 !important;
-}}
-
-/* -------- File uploader -------- */
-[data-testid="stFileUploaderDropzone"] {{
-  background: #FFFFFF !important;
-  border: 2px dashed {PRIMARY_LIGHT} !important;
-  color: {TEXT_DARK} !important;
-  border-radius: 14px !important;
-}}
-[data-testid="stFileUploaderDropzone"]:hover {{
-  border-color: {PRIMARY} !important;
-  background: {PRIMARY_LIGHT}11 !important;
-}}
-[data-testid="stFileUploaderFile"] p {{
-  color: {TEXT_DARK} !important;
-}}
-
-/* -------- Expander per-doc card -------- */
-[data-testid="stExpander"] details {{
-  background: #FFFFFF !important;
-  border: 1px solid rgba(22,50,74,0.10) !important;
-  border-radius: 14px !important;
-  box-shadow: 0 6px 16px rgba(22,50,74,0.06);
-}}
-[data-testid="stExpander"] summary {{
-  color: {TEXT_DARK} !important;
-  font-weight: 700 !important;
-}}
-[data-testid="stExpander"] svg {{ color: {PRIMARY_DARK} !important; }}
-
-/* -------- Buttons (kills Streamlit red) -------- */
-.stButton > button {{
-  background: linear-gradient(135deg, {PRIMARY} 0%, {PRIMARY_DARK} 100%) !important;
-  color: #fff !important;
-  border: 0 !important;
-  border-radius: 12px !important;
-  padding: 0.9rem 1.2rem !important;
-  font-weight: 800 !important;
-  box-shadow: 0 8px 18px rgba(79,121,177,0.28);
-}}
-.stButton > button:hover {{
-  transform: translateY(-1px);
-  box-shadow: 0 12px 22px rgba(79,121,177,0.36);
-}}
-
-/* -------- Optional: form card wrapper -------- */
-.form-card {{
-  background: rgba(255,255,255,0.98);
-  border: 1px solid rgba(22,50,74,0.08);
-  border-radius: 18px;
-  box-shadow: 0 16px 40px rgba(22,50,74,0.10);
-  padding: 22px 20px;
-}}
-</style>
-"""
-FIX_SELECTBOX_CSS = f"""
-<style>
-/* --- Text inputs only (leave selectbox out of this) --- */
-[data-testid="stTextInput"] input,
-[data-testid="stDateInput"] input {{
-  background: #FFFFFF !important;
-  color: {TEXT_DARK} !important;
-  border: 1.5px solid {PRIMARY_LIGHT} !important;
-  border-radius: 12px !important;
-  padding: 10px 12px !important;
-  box-shadow: 0 1px 2px rgba(22,50,74,0.06) inset;
-}}
-[data-testid="stTextInput"] input:focus,
-[data-testid="stDateInput"] input:focus {{
-  outline: none !important;
-  border-color: {PRIMARY} !important;
-  box-shadow: 0 0 0 3px {PRIMARY}22 !important;
-}}
-
-/* --- Selectbox (wrapper) --- */
-[data-testid="stSelectbox"] [role="combobox"] {{
-  background: #FFFFFF !important;
-  color: {TEXT_DARK} !important;
-  border: 1.5px solid {PRIMARY_LIGHT} !important;
-  border-radius: 12px !important;
-  padding: 10px 12px !important;
-  box-shadow: 0 1px 2px rgba(22,50,74,0.06) inset;
-}}
-/* Focus ring when anything inside is focused */
-[data-testid="stSelectbox"] [role="combobox"]:focus-within {{
-  outline: none !important;
-  border-color: {PRIMARY} !important;
-  box-shadow: 0 0 0 3px {PRIMARY}22 !important;
-}}
-
-/* --- Kill the ghost inner input inside the select --- */
-[data-testid="stSelectbox"] [role="combobox"] input {{
-  background: transparent !important;
-  border: 0 !important;
-  box-shadow: none !important;
-  outline: none !important;
-  padding: 0 !important;
-  margin: 0 !important;
-  height: 24px !important;          /* keeps the control height tidy */
-  color: inherit !important;
-}}
-/* Ensure internal chips/labels don't add a background */
-[data-testid="stSelectbox"] [role="combobox"] > div {{
-  background: transparent !important;
-}}
-/* Chevron color */
-[data-baseweb="select"] svg {{
-  color: {PRIMARY_DARK} !important;
-}}
-
-/* Optional: dropdown menu styling for better contrast */
-[data-baseweb="menu"] {{
-  background: #FFFFFF !important;
-  color: {TEXT_DARK} !important;
-  border: 1px solid {PRIMARY_LIGHT} !important;
-  box-shadow: 0 10px 24px rgba(22,50,74,0.12) !important;
-  border-radius: 12px !important;
-}}
-</style>
-"""
-FIX_GHOST_SELECT_INPUT = f"""
-<style>
-/* Keep the select wrapper styled & with focus ring */
-[data-testid="stSelectbox"] [role="combobox"] {{
-  position: relative;
-  overflow: hidden;                 /* hide any inner pill corners */
-  background: #FFFFFF !important;
-  color: {TEXT_DARK} !important;
-  border: 1.5px solid {PRIMARY_LIGHT} !important;
-  border-radius: 12px !important;
-  padding: 10px 12px !important;
-  box-shadow: 0 1px 2px rgba(22,50,74,0.06) inset;
-}}
-[data-testid="stSelectbox"] [role="combobox"]:focus-within {{
-  outline: none !important;
-  border-color: {PRIMARY} !important;
-  box-shadow: 0 0 0 3px {PRIMARY}22 !important;
-}}
-
-/* Hide the internal search <input> Safari/BaseWeb renders */
-[data-testid="stSelectbox"] [role="combobox"] input,
-div[data-baseweb="select"] input {{
-  opacity: 0 !important;            /* invisible but still present */
-  width: 0 !important;
-  min-width: 0 !important;
-  height: 0 !important;
-  padding: 0 !important;
-  margin: 0 !important;
-  border: 0 !important;
-  box-shadow: none !important;
-  background: transparent !important;
-  outline: none !important;
-  caret-color: transparent !important;
-  pointer-events: none !important;  /* prevents cursor showing */
-}}
-/* Chevron color */
-[data-baseweb="select"] svg {{ color: {PRIMARY_DARK} !important; }}
-</style>
-"""
-
-FANOUT_CSS = f"""
-<style>
-/* Fan-out card */
-.fanout-card {{
-  background: rgba(255,255,255,0.98);
-  border: 1px solid rgba(22,50,74,0.08);
-  border-radius: 16px;
-  box-shadow: 0 10px 26px rgba(22,50,74,0.08);
-  padding: 14px 16px;
-  margin-top: 10px;
-}}
-.fanout-title {{
-  font-weight: 800; color: {PRIMARY}; margin: 0 0 8px 2px; letter-spacing: .2px;
-}}
-.doc-grid {{
-  display: grid;
-  grid-template-columns: repeat(auto-fit, minmax(240px, 1fr));
-  gap: 12px;
-}}
-.doc-chip {{
-  background: #FFFFFF;
-  border: 1px solid rgba(22,50,74,0.10);
-  border-radius: 14px;
-  box-shadow: 0 6px 16px rgba(22,50,74,0.06);
-  padding: 10px 12px;
-}}
-.doc-chip h5 {{
-  margin: 0 0 6px 0; font-size: 0.98rem; color: {TEXT_DARK}; white-space: nowrap; overflow: hidden; text-overflow: ellipsis;
-}}
-.doc-meta {{ color:#5d6c79; font-size: 12px; margin-top:2px; }}
-.status-pill {{
-  display: inline-block; padding: 3px 8px; border-radius: 999px; font-weight: 700; font-size: 12px; margin-top: 8px;
-}}
-.status-pill.pending  {{ background:#EEF3F7; color:#41515C; }}
-.status-pill.progress {{ background:{PROGRESS}; color:#132C3C; }}
-.status-pill.success  {{ background:{SUCCESS}; color:#06220E; }}
-</style>
-"""
-OCCUPANCY_CSS = f"""
-<style>
-/* Row of occupancy dots (one cell per AI node) */
-.occ-strip {{ 
-  display: grid; grid-template-columns: repeat({len(AI_NODES)}, 1fr);
-  gap: 10px; margin: 6px 2px 8px 2px;
-}}
-.occ-cell {{
-  display: flex; justify-content: center; align-items: center; gap: 6px;
-}}
-.occ-dot {{
-  width: 8px; height: 8px; border-radius: 50%;
-  background: #dbe6f4;
-}}
-.occ-dot.on {{
-  background: {PRIMARY_DARK}; box-shadow: 0 0 0 3px rgba(79,121,177,0.18);
-}}
-
-/* Global in-flight meter (right-aligned) */
-.global-meter {{
-  display: flex; align-items: center; gap: 8px; justify-content: flex-end; margin: 2px 4px 8px;
-  color: #5d6c79; font-size: 13px;
-}}
-.gdot {{ width: 10px; height: 10px; border-radius: 50%; background: #dbe6f4; }}
-.gdot.on {{ background: {PRIMARY_DARK}; }}
-
-/* Mini 6-segment progress bar in each payload card */
-.segbar {{
-  display: grid; grid-template-columns: repeat({len(AI_NODES)},1fr); gap: 3px; margin-top: 8px;
-}}
-.seg {{
-  height: 6px; border-radius: 4px; background: #e7eef8;
-}}
-.seg.on {{ background: {PRIMARY_DARK}; }}
-</style>
-"""
-
-LANE_RETRY_CSS = f"""
-<style>
-.node-pill.error   {{ background: {ERROR}; color: #fff; }}
-.node-pill.retrying {{ background:#FACC15; color: #3A2B00;}}
-/* Curved dashed retry arrow under the lane */
-.retry-wrap {{ position: relative; height: 40px; margin: -6px 0 8px 0;}}
-.retry-svg {{ width: 100%; height: 100%;}}
-.retry-path {{ fill: none; stroke: {ERROR}; stroke-width: 3; stroke-dasharray: 6 6;opacity: .85;}}
-</style>"""
-
-st.markdown(LANE_RETRY_CSS, unsafe_allow_html=True)
-
-st.markdown(OCCUPANCY_CSS, unsafe_allow_html=True)
-
-st.markdown(FANOUT_CSS, unsafe_allow_html=True)
-
-st.markdown(FIX_GHOST_SELECT_INPUT, unsafe_allow_html=True)
-
-st.markdown(FIX_SELECTBOX_CSS, unsafe_allow_html=True)
-
-st.markdown(UPLOAD_CSS, unsafe_allow_html=True)
-
-st.markdown(GLOBAL_CSS, unsafe_allow_html=True)
-
-st.markdown(f"""
-<style>
-.view-link {{ cursor:pointer; color:{PRIMARY_DARK}; font-weight:700; }}
-.view-link:hover {{ text-decoration: underline; }}
-.card-details {{ margin-top:6px; }}
-.card-details summary::-webkit-details-marker {{ display:none; }}
-.fulltext {{
-  margin-top:6px; background:#F7FAFF; border:1px solid rgba(22,50,74,0.10);
-  border-radius:10px; padding:10px; white-space:pre-wrap; color:{TEXT_DARK};
-  max-height:260px; overflow:auto;
-}}
-</style>
-""", unsafe_allow_html=True)
+# -------------------------------
+# INIT (once per server process)
+# -------------------------------
+# Streamlit re-executes this script on every interaction, but imported modules are
+# evaluated once per process: palette/CSS templates live in theme.py, timings and
+# speed profiles in simulation.py. Anything else that only needs doing once goes here.
+@st.cache_resource(show_spinner=False)
+def _init_process() -> dict:
+    """One-time setup shared by all sessions: merged + minified + hashed stylesheet."""
+    return {
+        "stylesheet_tag": stylesheet_tag(
+            APP_CSS_BLOCKS,
+            static_serving=bool(st.get_option("server.enableStaticServing")),
+        ),
+    }
+
+_APP = _init_process()
+
+# One small <link> per rerun; the hashed file itself is fetched once and cached by the browser.
+st.markdown(_APP["stylesheet_tag"], unsafe_allow_html=True)
 
 # -------------------------------
 # NAV STATE
@@ -1017,6 +265,9 @@ if "page" not in st.session_state:
   st.session_state.page = "home"
 
 def go(page: str):
+  active = st.session_state.get("active_run")
+  if active is not None:
+      active.cancel("navigated away")   # the running review stops at its next wait
   st.session_state.page = page
   st.rerun()
 
@@ -1064,6 +315,10 @@ def page_upload():
         rp = st.text_input("Risk Party ID", key="risk_party_id")
     with col2:
         rid = st.text_input("Review ID", key="review_id")
+    if rp and rid and REVIEW_LEDGER.known(rp, rid):
+        n_prev = len(REVIEW_LEDGER.get(rp, rid)["documents"])
+        st.info(f"Review {rid} already has {n_prev} processed document(s). Upload only new or changed "
+                "documents; the rest are kept and only the affected sections are re-generated.")
 
     st.divider()
     files = st.file_uploader(
@@ -1120,6 +375,12 @@ def page_upload():
             return
 
 
+        # Adding to a review processed before: keep its documents, same-named uploads replace them
+        if REVIEW_LEDGER.known(rp, rid):
+            new_names = {d["file_name"] for d in documents}
+            kept = [rec for name, rec in REVIEW_LEDGER.get(rp, rid)["documents"].items() if name not in new_names]
+            documents = kept + documents
+
         # Save to session for downstream pages
         st.session_state.uploaded_docs = documents
         st.session_state.payload = {
@@ -1137,7 +398,7 @@ def render_fanout(documents, states):
         fn = html.escape(d.get("file_name",""))
         dt = html.escape(d.get("document_type",""))
         bd = html.escape((d.get("business_date") or "—"))
-        status_txt = "Ingesting…" if s == "progress" else ("Ready" if s == "success" else "Queued")
+        status_txt = "Ingesting…" if s == "progress" else ("Ready" if s == "success" else ("Failed" if s == "error" else "Queued"))
         return (
             f'<div class="doc-chip">'
             f'<h5 title="{fn}">{fn}</h5>'
@@ -1166,186 +427,168 @@ def page_process():
             st.session_state.page = "upload"; st.rerun()
         return
 
+    # Cancel run: the click reruns the script, which stops this run at its next wait; the rerun leaves the page
+    if st.button("Cancel run", key="cancel_run"):
+        go("upload")
+
+    # Every run gets a cancel token: navigating away (a rerun), closing the tab (a stop) or Cancel run
+    # wakes it at its next wait, releases what it holds and leaves an entry in the run journal
+    review   = st.session_state.get("payload", {})
+    rp, rid  = review.get("risk_party_id", ""), review.get("review_id", "")
+    cancel   = CancelToken()
+    progress = {}   # filled in by the run: stage reached, sections delivered
+    run_id   = RUN_JOURNAL.start(rp, rid, documents=len(docs))
+
+    # The run is a job in the durable queue (job_queue.py): it survives restarts and is shared by every
+    # server process, so a review another process is working on is not started twice
+    queue_job = {"worker": f"{WORKER_ID}/run{run_id}"}
+    try:
+        queue_job["id"], queue_job["resumed"] = JOB_QUEUE.open_review(
+            rp, rid, inputs_hash(document_hash(d) for d in docs), queue_job["worker"])
+    except ReviewLeased as exc:
+        RUN_JOURNAL.record(run_id, "rejected", reason=str(exc))
+        st.info(f"This review is already being processed ({exc.owner}). Open it again once that run has finished.")
+        return
+    load = JOB_QUEUE.load()
+    st.caption(f"Job #{queue_job['id']}{' (resumed)' if queue_job['resumed'] else ''} • queue: "
+               f"{load['jobs'].get('running', 0)} review(s) running on {load['workers']} worker(s), "
+               f"{sum(t.get('pending', 0) for t in load['tasks'].values())} task(s) pending, "
+               f"{sum(t.get('leased', 0) for t in load['tasks'].values())} leased")
+
+    def sleep_renewing(seconds: float):
+        JOB_QUEUE.heartbeat(queue_job["worker"])   # the job's leases live as long as the run keeps waiting
+        sleep_smooth(seconds)
+
+    outcome = "done"
+    started = _time.perf_counter()
+    st.session_state.active_run = cancel
+    try:
+        with cancel_scope(cancel), sleeper(sleep_renewing):
+            _process_review(docs, cancel, progress, queue_job)
+        if progress.get("failed"):
+            outcome = "failed"
+    except Cancelled:
+        outcome = "cancelled"
+        st.warning(f"Run cancelled ({cancel.reason}).")
+    except Exception as exc:
+        outcome = "failed"      # a failure, not a cancel: the document bytes and the run's slots stay as they are
+        progress["failed"] = f"{type(exc).__name__}: {exc}"
+        raise
+    except BaseException:
+        outcome = "cancelled"
+        cancel.cancel("abandoned")   # Streamlit's rerun / stop unwinding the script
+        raise
+    finally:
+        if st.session_state.get("active_run") is cancel:
+            st.session_state.active_run = None
+        JOB_QUEUE.finish_review(queue_job["id"], queue_job["worker"], outcome,
+                                cancel.reason or progress.get("failed"))
+        JOB_QUEUE.forget(queue_job["worker"])
+        elapsed = round(_time.perf_counter() - started, 3)
+        if cancel.cancelled:
+            RUN_JOURNAL.record(run_id, "cancelled", reason=cancel.reason, elapsed_s=elapsed, job_id=queue_job["id"],
+                               stage=progress.get("stage"), sections_delivered=len(progress.get("sections", {})),
+                               released=dict(cancel.release()))
+        elif outcome == "failed":
+            RUN_JOURNAL.record(run_id, "failed", reason=progress.get("failed"), elapsed_s=elapsed,
+                               job_id=queue_job["id"], stage=progress.get("stage"),
+                               sections_delivered=len(progress.get("sections", {})))
+        else:
+            RUN_JOURNAL.record(run_id, "completed", elapsed_s=elapsed, job_id=queue_job["id"],
+                               sections_delivered=len(progress.get("sections", {})))
+
+
+def _process_review(docs, cancel, progress, queue_job):
+    run_started = _time.perf_counter()
+
+    # Delta plan: a review processed before only ingests new/changed documents, and
+    # Section Coverage Analysis picks the sections to re-generate (the rest keep their results)
+    review      = st.session_state.get("payload", {})
+    rp, rid     = review.get("risk_party_id", ""), review.get("review_id", "")
+    incremental = REVIEW_LEDGER.known(rp, rid)
+    previous    = REVIEW_LEDGER.get(rp, rid)
+    if incremental:
+        ingest_docs, _, removed = diff_documents(previous["documents"], docs)
+        affected = affected_sections(PAYLOAD_SECTION_NAMES, ingest_docs, removed, previous["documents"])
+    else:
+        ingest_docs, affected = docs[:], PAYLOAD_SECTION_NAMES[:]
+    run_sections  = [s for s in PAYLOAD_SECTION_NAMES if s in affected or s not in previous["results"]]
+    kept_sections = [s for s in PAYLOAD_SECTION_NAMES if s not in run_sections]
+    ingest_idx    = [i for i, d in enumerate(docs) if any(d is x for x in ingest_docs)]
+
+    # Durable tasks: one per document to ingest, one per section to invoke. A resumed job skips
+    # the documents it already ingested and keeps the sections it already generated
+    JOB_QUEUE.add_tasks(queue_job["id"], "Async DB Ingestion", [docs[i].get("file_name", "") for i in ingest_idx])
+    resumed_docs     = JOB_QUEUE.results(queue_job["id"], "Async DB Ingestion") if queue_job["resumed"] else {}
+    resumed_sections = JOB_QUEUE.results(queue_job["id"], "Credit AI Invocation") if queue_job["resumed"] else {}
+    ingest_idx       = [i for i in ingest_idx if docs[i].get("file_name", "") not in resumed_docs]
+
+    def task_claim(stage, key):
+        """(task_id, done): the leased task, or the result of a task another worker already finished.
+
+        While another live worker holds the task's lease, wait for it to settle or run out rather than
+        run the work twice. task_id is None (untracked) if the task is neither pending nor leased.
+        """
+        while True:
+            claimed = JOB_QUEUE.claim(queue_job["worker"], job_id=queue_job["id"], stage=stage, key=key)
+            if claimed:
+                return claimed[0]["task_id"], None
+            task = JOB_QUEUE.task(queue_job["id"], stage, key)
+            if task is None or task["state"] not in ("leased", "done"):
+                return None, None
+            if task["state"] == "done":
+                return None, task["result"]
+            JOB_QUEUE.heartbeat(queue_job["worker"])
+            pause(JOB_CLAIM_POLL)   # through the sleeper: the other lanes keep moving
+
+    def task_settle(task_id, result=None, error=None):
+        if task_id is None:
+            return
+        if error:
+            JOB_QUEUE.fail(task_id, queue_job["worker"], error)
+        else:
+            JOB_QUEUE.complete(task_id, queue_job["worker"], result)
+
+    n_ingest      = len(ingest_idx)
+    n_intents     = len(run_sections)
+
     # Areas
     lane_area   = st.empty()
     fanout_area = st.empty()
-    footer_area = st.empty()
-
-    # Node states
-    dp_nodes  = DOC_NODES[:]     # ["Document Upload", ..., "Trigger Evaluation"]
-    dp_states = ["pending"] * len(dp_nodes)
-    retry_badges = {}   # existing badges map (keep)
-    event_chips  = []   # existing chips (keep)
-    arrow_back_idx  = None   # ← which edge to flip (e.g., 3 for Proxy→Async)
-    arrow_back_live = False  # ← pulse while retrying
-
-    def paint_lane(ingested=None, total=None, payloads=None, payloads_total=None):
-      labels = dp_nodes[:]
-      if ingested is not None and total is not None:
-          labels[4] = f"Async DB Ingestion  {ingested}/{total}"
-      if payloads is not None and payloads_total is not None:
-          labels[5] = f"Trigger Evaluation  {payloads}/{payloads_total}"
-
-      html_lane = lane_html(
-          "Document Processing",
-          labels,
-          dp_states,
-          retry_badges=retry_badges,
-          events_html="".join(f'<span class="event-chip">{c}</span>' for c in event_chips),
-          back_edge_idx=arrow_back_idx,          # ← pass current override
-          back_live=arrow_back_live,             # ← pulse during retry
-      )
-      lane_area.markdown(f'<div class="board">{html_lane}</div>', unsafe_allow_html=True)
-
-
-    # 1–4: move as a bundle (happy path)
-    paint_lane()
-    for i in range(4):  # Document Upload → Proxy Document Retriever
-        dp_states[i] = "progress"; paint_lane(); wait("dp_progress")
-        dp_states[i] = "success";  paint_lane(); wait("dp_success")
-
-    # 5: Async DB Ingestion (fan-out)
-    dp_states[4] = "progress"
-    paint_lane(ingested=0, total=len(docs))
-
-    # Fan-out grid
-    doc_states = ["pending"] * len(docs)
-    fanout_area.markdown(render_fanout(docs, doc_states), unsafe_allow_html=True)
-
-    # Parallel Trigger Evaluation
-    trigger_started = False
-    payloads_sent   = 0
-
-    done = 0
-    failing_active = (len(docs) > BULK_FAIL_THRESHOLD)
-
-    for idx in range(len(docs)):
-        # this doc starts ingesting
-        doc_states[idx] = "progress"
-        fanout_area.markdown(render_fanout(docs, doc_states), unsafe_allow_html=True)
-        wait("fo_progress")
-
-        if failing_active and idx == BULK_FAIL_DOC_INDEX:
-          prev_node = 3  # "Proxy Document Retriever"
-
-          # Step 1: Async DB error + show live badge + flip arrow backward (Proxy←Async)
-          dp_states[4] = "error"
-          retry_badges[4] = {"type": "live", "label": "↶", "title": "Retrying via Proxy"}
-          event_chips.append('<span class="red">↑</span> Async DB → Proxy')
 
-          arrow_back_idx  = 3        # edge between nodes[3] and nodes[4]
-          arrow_back_live = True     # pulse while retrying
-          paint_lane(ingested=done, total=len(docs))
-
-          # Step 2: Proxy re-processes (yellow → green) while Async DB stays red
-          dp_states[prev_node] = "progress"; paint_lane(ingested=done, total=len(docs)); wait("dp_progress")
-          dp_states[prev_node] = "success";  paint_lane(ingested=done, total=len(docs)); wait("dp_success")
-
-          # Step 3: Async DB retries (yellow), then this doc completes
-          dp_states[4] = "progress"; paint_lane(ingested=done, total=len(docs)); wait("fo_progress")
-
-          doc_states[idx] = "success"
-          done += 1
-          event_chips.append('<span class="green">✓</span> Recovered')
-          retry_badges[4] = {"type": "scar", "title": "1 retry on this stage"}  # scar persists
-
-          # Clear the temporary back arrow now that Proxy succeeded
-          arrow_back_idx  = None
-          arrow_back_live = False
-
-          paint_lane(ingested=done, total=len(docs))
-          fanout_area.markdown(render_fanout(docs, doc_states), unsafe_allow_html=True)
-          wait("fo_success")
-
-          failing_active = False
-
-          # (optional) early Trigger Evaluation handling
-          if (not trigger_started) and (done >= min(TRIGGER_START_AFTER, len(docs))):
-              trigger_started = True
-              dp_states[5] = "progress"
-              payloads_sent = 1
-              paint_lane(ingested=done, total=len(docs), payloads=payloads_sent, payloads_total=TOTAL_INTENTS)
-              wait("tr_start")
-          elif trigger_started and payloads_sent < TOTAL_INTENTS:
-              payloads_sent += 1
-              paint_lane(ingested=done, total=len(docs), payloads=payloads_sent, payloads_total=TOTAL_INTENTS)
-              wait("tr_tick")
-          else:
-              paint_lane(ingested=done, total=len(docs))
-
-          continue  # IMPORTANT: skip the normal success path for this doc
-
-
-        # ---- normal success path (no failure) ----
-        doc_states[idx] = "success"
-        done += 1
-
-        # Start TE once threshold reached (or if threshold > total, we'll start later)
-        if (not trigger_started) and (done >= min(TRIGGER_START_AFTER, len(docs))):
-            trigger_started = True
-            dp_states[5] = "progress"
-            payloads_sent = 1   # first payload goes out as we start
-            paint_lane(ingested=done, total=len(docs),
-                      payloads=payloads_sent, payloads_total=TOTAL_INTENTS)
-            wait("tr_start")
-        else:
-            # If already started, continue sending payloads while docs keep ingesting
-            if trigger_started and payloads_sent < TOTAL_INTENTS:
-                payloads_sent += 1
-                paint_lane(ingested=done, total=len(docs),
-                          payloads=payloads_sent, payloads_total=TOTAL_INTENTS)
-                wait("tr_tick")
-            else:
-                # just repaint the ingest counter if TE hasn't started yet
-                paint_lane(ingested=done, total=len(docs))
-
-        # repaint fanout after this doc completes
-        fanout_area.markdown(render_fanout(docs, doc_states), unsafe_allow_html=True)
-        wait("fo_success")
-
-
-
-    # Mark ingest node success after all docs ready
-    dp_states[4] = "success"
-    paint_lane(ingested=len(docs), total=len(docs),
-               payloads=(payloads_sent if trigger_started else None),
-               payloads_total=(TOTAL_INTENTS if trigger_started else None))
-
-    # If TE never started (e.g., docs < threshold), start now
-    if not trigger_started:
-        trigger_started = True
-        dp_states[5] = "progress"
-        paint_lane(ingested=len(docs), total=len(docs),
-                   payloads=payloads_sent, payloads_total=TOTAL_INTENTS)
-        wait("tr_start")
-
-    # Finish sending any remaining payloads
-    while payloads_sent < TOTAL_INTENTS:
-        payloads_sent += 1
-        paint_lane(ingested=len(docs), total=len(docs),
-                   payloads=payloads_sent, payloads_total=TOTAL_INTENTS)
-        wait("tr_tick")
-
-    # TE completes
-    dp_states[5] = "success"
-    paint_lane(ingested=len(docs), total=len(docs),
-               payloads=payloads_sent, payloads_total=TOTAL_INTENTS)
-    wait("tr_finish")
-
-        # ===== CREDIT AI (with ABL retry if fail.pdf present) =====
+    # ===== CREDIT AI (with ABL retry if fail.pdf present) =====
+    # Laid out up front: each payload enters this lane as soon as Trigger Evaluation emits it,
+    # so its early stages overlap the rest of the ingest.
     st.subheader("Credit AI")
 
     # UI areas
     ai_lane_area  = st.empty()
     occ_area      = st.empty()
     payloads_area = st.empty()
+    kept_area     = st.empty()
 
     # Data/result state
-    results_map   = {}
-    payloads_names = PAYLOAD_SECTION_NAMES[:]   # ["Business Description","Recent Developments","ABL"]
-    payloads_idx   = [0] * TOTAL_INTENTS
+    results_map    = {}
+    progress["sections"] = results_map
+    payloads_names = []   # affected sections, in dispatch order (grows as Trigger Evaluation fires)
+    payloads_idx   = []   # current stage per payload
+    payloads_due   = []   # perf_counter deadline for each payload's current stage (None while queued)
     last_idx       = len(AI_NODES) - 1
 
+    # Flow control: Trigger Evaluation -> bounded payload queue -> the lane, while it has room
+    payload_q = BoundedQueue("Payload queue", PAYLOAD_QUEUE_CAPACITY, overflow=PAYLOAD_QUEUE_OVERFLOW)
+
+    # Sections the new documents don't touch keep their previous results
+    kept_results = {
+        name: {**previous["results"][name], "unchanged": True, "cached": False, "ttfc": None, "ttc": None}
+        for name in kept_sections
+    }
+    if kept_results:
+        kept_area.markdown(
+            _render_payload_cards(kept_sections, [last_idx] * len(kept_sections), kept_results),
+            unsafe_allow_html=True,
+        )
+
     # --- visuals state for retry UX on the AI lane ---
     card_overrides      = {}   # per-card pill/line overrides
     ai_retry_badges     = {}   # node index -> {type:"live"/"scar", ...}
@@ -1354,14 +597,40 @@ def page_process():
     ai_arrow_back_live  = False
     ai_state_overrides  = {}   # node index -> "error"/"progress"/"success" (overrides lane state)
 
-    # --- detect trigger: any uploaded file literally named "fail.pdf" ---
-    docs = st.session_state.get("payload", {}).get("documents", [])
-    credit_fail_active   = any((d.get("file_name","").lower() == "fail.pdf") for d in docs)
-    credit_fail_consumed = False
-    try:
-        abl_payload_index = payloads_names.index("ABL")
-    except ValueError:
-        abl_payload_index = None
+    # Faults for this run: the demo's built-in ones (bulk ingest, fail.pdf) plus any configured in FAULTS
+    faults = FaultInjector(demo_faults(docs, n_ingest) + CONFIGURED_FAULTS, rng=random.Random(DEMO_SEED))
+
+    # Failures are retried under the stage policies in retry_policy.py; the cost is reported at the end
+    retry_added  = {}   # stage -> seconds retries added on this run
+    retry_counts = {}   # stage -> retries on this run
+
+    def retry_scar(n):
+        return f"{n} retr{'y' if n == 1 else 'ies'} on this stage"
+
+    def note_recovery(stage_name, info) -> dict:
+        """Book a recovered stage; returns its scar badge."""
+        retry_counts[stage_name] = retry_counts.get(stage_name, 0) + info["attempt"] - 1
+        retry_added[stage_name] = retry_added.get(stage_name, 0.0) + info["added"]
+        faults.recovered(stage_name, info["added"])
+        return {"type": "scar", "title": retry_scar(retry_counts[stage_name])}
+
+    def report_recovery():
+        """What failed on this run, how long recovery took and the throughput that was left."""
+        elapsed   = _time.perf_counter() - run_started
+        delivered = sum(1 for r in results_map.values() if not r.get("error"))
+        summary   = faults.summary()
+        st.session_state.retry_metrics = {"added_s": dict(retry_added), "totals": RETRY_STATS.snapshot()}
+        st.session_state.fault_metrics = {**summary, "run_s": elapsed, "sections_per_min": delivered * 60 / elapsed}
+        if retry_added:
+            st.caption(f"Retries added {sum(retry_added.values()):.2f}s: " + " • ".join(
+                f"{stage} +{seconds:.2f}s" for stage, seconds in retry_added.items()))
+        if summary["injected"]:
+            recoveries = [t for times in summary["recovery_s"].values() for t in times]
+            st.caption(
+                f"Injected {summary['injected']} fault(s): " + ", ".join(d for _, d in summary["injected_at"])
+                + (f" • slowest recovery {max(recoveries):.2f}s" if recoveries else "")
+                + f" • {delivered} section(s) in {elapsed:.1f}s ({delivered * 60 / elapsed:.1f}/min)"
+            )
 
     # ---- helpers ---------------------------------------------------------------
     def _ai_states_from_payloads(idxs, override_states=None):
@@ -1376,17 +645,30 @@ def page_process():
                 continue
             at_j  = counts[j]
             after = sum(1 for x in idxs if x > j)
+            # a node is only done once every intent has been dispatched and has passed it
             if j == last:
-                state = "success" if all(x >= last for x in idxs) else ("progress" if at_j > 0 else "pending")
+                state = "success" if len(idxs) == n_intents and all(x >= last for x in idxs) else ("progress" if at_j > 0 else "pending")
             else:
-                state = "success" if after == len(idxs) else ("progress" if at_j > 0 else "pending")
+                state = "success" if after == n_intents else ("progress" if at_j > 0 else "pending")
             states.append(state)
         return states
 
     def paint_ai():
         """One paint for lane + occupancy + cards (chips are styled like the ingest lane)."""
-        states      = _ai_states_from_payloads(payloads_idx, ai_state_overrides)
+        overrides = ai_state_overrides
+        if any(not s.done for s in streams.values()):
+            overrides = {**ai_state_overrides, last_idx: "progress"}   # Output Delivery still streaming
+        states      = _ai_states_from_payloads(payloads_idx, overrides)
         labels      = AI_NODES[:]
+        queued      = ai_pool.queued_at(invocation_idx)
+        labels[invocation_idx] = (
+            f"Credit AI Invocation  {INVOCATION_LIMITER.in_flight}/{INVOCATION_LIMITER.limit}"
+            + (f" • {queued} queued" if queued else "")
+        )
+        if downloads["hits"] + downloads["misses"]:
+            labels[download_idx] = f"Download Documents  {downloads['hits']}/{downloads['hits'] + downloads['misses']} cached"
+        if downloads["context_bytes"]:
+            labels[context_idx] = f"Context Assembly / Upload  {downloads['context_bytes'] / 1e6:.1f} MB"
         events_html = "".join(f'<span class="event-chip">{c}</span>' for c in ai_event_chips)
 
         lane_html_block = lane_html(
@@ -1399,91 +681,809 @@ def page_process():
             back_live=ai_arrow_back_live,
         )
         ai_lane_area.markdown(f'<div class="board">{lane_html_block}</div>', unsafe_allow_html=True)
-        occ_area.markdown(_render_occupancy_row(payloads_idx, TOTAL_INTENTS), unsafe_allow_html=True)
+        occ_area.markdown(
+            _render_occupancy_row(payloads_idx, n_intents, payload_q, sum(1 for i in payloads_idx if i < last_idx)),
+            unsafe_allow_html=True,
+        )
         payloads_area.markdown(
-            _render_payload_cards(payloads_names, payloads_idx, results_map, card_overrides),
+            _render_payload_cards(payloads_names, payloads_idx, results_map, {**queued_cards(), **card_overrides}, streams),
             unsafe_allow_html=True
         )
 
-    # Initial paint
-    paint_ai()
+    # Generation cache sits in front of Credit AI Invocation: same documents + intent + prompt + model => reuse
+    invocation_idx = AI_NODES.index("Credit AI Invocation")
+    gen_keys       = {
+        name: generation_key([document_hash(d) for d in covered_documents(name, docs)], name)
+        for name in run_sections
+    }
+    failed_docs = set()   # indexes of documents Async DB Ingestion gave up on
+
+    def generated_without_failed(name) -> bool:
+        """A section whose key names a document that never got ingested must not be cached under it."""
+        failed = {document_hash(docs[i]) for i in failed_docs}
+        return bool(failed & set(gen_keys[name][0]))
+
+    # Download Documents / Context Assembly read the documents through the shared download cache:
+    # the first payload needing a document downloads it from the object store, later ones hit disk
+    download_idx = AI_NODES.index("Download Documents")
+    context_idx  = AI_NODES.index("Context Assembly / Upload")
+    downloads    = {"hits": 0, "misses": 0, "context_bytes": 0}
+
+    def job_documents(job) -> list:
+        return sorted({h for p in job.members for h in gen_keys[payloads_names[p]][0]})
+
+    def download_documents(job) -> float:
+        """Fetch a job's documents into the cache; the share of the stage's time it pays (bytes downloaded)."""
+        fetched, total = 0, 0
+        for h in job_documents(job):
+            cached = DOWNLOAD_CACHE.contains(h)
+            try:
+                with DOWNLOAD_CACHE.open(h, open_document) as f:    # open: an eviction cannot pull it away
+                    size = os.fstat(f.fileno()).st_size
+            except DownloadError as exc:
+                ai_event_chips.append(f'✕ {html.escape(str(exc))}')
+                downloads["misses"] += 1
+                return 1.0
+            downloads["hits" if cached else "misses"] += 1
+            fetched, total = fetched + (0 if cached else size), total + size
+        return max(DOWNLOAD_HIT_COST, fetched / total) if total else 1.0
+
+    def assemble_context(job):
+        """Context Assembly reads the cached documents through read-only memory maps (no copy)."""
+        for h in job_documents(job):
+            if not DOWNLOAD_CACHE.contains(h):
+                continue    # its download failed; the section is generated without it
+            with DOWNLOAD_CACHE.mapped(h, open_document) as view:
+                downloads["context_bytes"] += len(view)
+
+    # Output Delivery streams each section; cards repaint as chunks arrive
+    streams = {}   # intent -> SectionStream
+    invocation_tasks = {}   # intent -> its leased Credit AI Invocation task (settled when its stream ends)
+
+    def collect_streams(seen) -> bool:
+        """Move finished streams into results_map; True if any card has new text to show."""
+        changed = False
+        for name, stream in streams.items():
+            n = len(stream.text)
+            if seen.get(name) != n:
+                seen[name], changed = n, True
+            if stream.done and name not in results_map:
+                results_map[name] = stream.result()
+                if not generated_without_failed(name):
+                    GENERATION_CACHE.put(gen_keys[name], results_map[name])
+                task_settle(invocation_tasks.pop(name, None), results_map[name], results_map[name].get("error"))
+                changed = True
+        return changed
+
+    def sleep_streaming(seconds: float):
+        """Sleep like sleep_smooth, repainting whenever a delivering section receives chunks."""
+        seen = {name: len(stream.text) for name, stream in streams.items()}
+        end = _time.perf_counter() + seconds
+        while True:
+            remaining = end - _time.perf_counter()
+            if remaining <= 0:
+                break
+            JOB_QUEUE.heartbeat(queue_job["worker"])
+            sleep_smooth(min(STREAM_REPAINT_EVERY, remaining))
+            if streams and collect_streams(seen):
+                paint_ai()
+
+    # ---- pipeline: the Document Processing lane's waits drive the Credit AI lane --------
+    rng = random.Random(DEMO_SEED)  # per-run RNG: deterministic demo without reseeding the global module
+
+    # Credit AI Invocation also needs a slot from the process-wide adaptive limiter (shared model backend)
+    invocation_slots = {}   # job id -> limiter token
+
+    def admit(job) -> bool:
+        if job.stage != invocation_idx:
+            return True
+        token = INVOCATION_LIMITER.try_acquire()
+        if token is None:
+            return False
+        invocation_slots[job.job_id] = token
+        return True
+
+    # Bounded worker pool: a job (one payload, or a batch of them) holds a worker per stage;
+    # queued jobs are picked by the policy
+    ai_pool = WorkerPool(make_policy(AI_SCHEDULING_POLICY, allowed=RUN_POLICIES), AI_WORKERS, admit=admit)
+    job_of  = {}   # payload -> the job it currently moves with
+
+    def release_workers():
+        """On cancel: hand back invocation slots without a verdict and empty the pool."""
+        slots = len(invocation_slots)
+        for token in invocation_slots.values():
+            INVOCATION_LIMITER.abandon(token)
+        invocation_slots.clear()
+        return {"workers": ai_pool.drain(), "invocation_slots": slots}
+
+    cancel.on_cancel(release_workers)
+    cancel.on_cancel(lambda: {"streams": sum(not s.done for s in streams.values())})   # streams stop on the token
+    stage_faults = {}   # job id -> injected failure for the stage it is running
+
+    # Batching: payloads of this review meet at Download Documents and share download, context and invocation
+    batch   = BatchWindow(AI_BATCH_WINDOW)
+    batches = 0
+
+    def queued_cards():
+        """Card overrides for payloads waiting for a worker or for their batch to form."""
+        return {
+            payloads_names[p]: {
+                "pill": "pending",
+                "at": (f"Batching at {AI_NODES[payloads_idx[p]]}" if p in batch.members
+                       else f"Queued for {AI_NODES[payloads_idx[p]]} ({AI_SCHEDULING_POLICY})"),
+            }
+            for p in range(len(payloads_idx))
+            if payloads_idx[p] < last_idx and payloads_due[p] is None
+        }
 
-    # Per-payload ETAs to finish current stage (idx -> idx+1)
-    INF  = 10**9
-    etas = [_stage_duration(0) for _ in range(TOTAL_INTENTS)]
+    def ai_assign():
+        """Start the queued jobs the policy picks for any free workers (and decide which of them fail)."""
+        now = _time.perf_counter()
+        for job in ai_pool.assign(now):
+            dur = stage_duration(job.stage, job.members[0], rng) * (1 + AI_BATCH_MEMBER_COST * (len(job.members) - 1))
+            if job.stage == download_idx:
+                dur *= download_documents(job)
+            elif job.stage == context_idx:
+                assemble_context(job)
+            names = [payloads_names[p] for p in job.members]
+            fault = faults.draw(AI_NODES[job.stage], intent=names)
+            if fault is not None:
+                dur += fault.seconds          # latency spike, or the wait before a time-out
+                if fault.kind == "latency":
+                    ai_event_chips.append(f'⏱ {AI_NODES[job.stage]} +{fault.seconds:g}s • {" + ".join(names)}')
+                else:
+                    stage_faults[job.job_id] = fault   # fails when the stage finishes; see ai_advance
+            for p in job.members:
+                payloads_due[p] = now + dur
+
+    def flush_batch():
+        """Close the batch once every sibling has arrived or the window ran out; queue it as one job."""
+        nonlocal batches
+        now = _time.perf_counter()
+        still_expected = (n_intents - len(payloads_idx)) + sum(1 for i in payloads_idx if i < AI_BATCH_STAGE)
+        if not batch.should_flush(now, still_expected):
+            return
+        members = batch.flush()
+        if len(members) == 1:
+            job = job_of[members[0]]
+            job.stage = AI_BATCH_STAGE
+        else:
+            batches += 1
+            solo = [job_of[p] for p in members]
+            job = Job(("batch", batches), "batch", arrival=min(j.arrival for j in solo), stage=AI_BATCH_STAGE,
+                      priority=max(j.priority for j in solo), deadline=min(j.deadline for j in solo), members=members)
+            for p in members:
+                job_of[p] = job
+            ai_event_chips.append('⧉ Shared context • ' + ' + '.join(payloads_names[p] for p in members))
+        ai_pool.enqueue(job, now)
+
+    def ai_add(name):
+        """Trigger Evaluation emitted `name`: it queues for Receive Generation Payloads right away."""
+        now = _time.perf_counter()
+        p = len(payloads_idx)
+        payloads_names.append(name)
+        payloads_idx.append(0)
+        payloads_due.append(None)
+        job = Job(p, name, arrival=now, deadline=now + DEFAULT_SECTION_DEADLINE)
+        JOB_QUEUE.add_tasks(queue_job["id"], "Credit AI Invocation", [name])
+        job_of[p] = job
+        ai_pool.enqueue(job, now)
+        ai_assign()
+        paint_ai()
 
-    # ---- event loop ------------------------------------------------------------
-    while True:
-        if all(i >= last_idx for i in payloads_idx):
-            break
+    def admit_payloads():
+        """Move queued payloads into the lane while fewer than AI_LANE_CAPACITY are in flight."""
+        while payload_q and sum(1 for i in payloads_idx if i < last_idx) < AI_LANE_CAPACITY:
+            ai_add(payload_q.take())
+
+    def shed(name):
+        """The payload queue was full (overflow="shed"): the section is dropped from this run."""
+        payloads_names.append(name)
+        payloads_idx.append(last_idx)
+        payloads_due.append(None)
+        JOB_QUEUE.add_tasks(queue_job["id"], "Credit AI Invocation", [name])   # stays pending for a resume
+        results_map[name] = {"intent": name, "error": "shed: Credit AI queue full"}
+        card_overrides[name] = {"pill": "error", "at": "Shed • Credit AI queue full"}
+        ai_event_chips.append(f'✕ Shed • {name}')
+        progress["failed"] = "payloads shed"
+        paint_ai()
 
-        # next event: payload with smallest ETA among those not delivered
-        active = [(p, t) for p, t in enumerate(etas) if payloads_idx[p] < last_idx]
-        p_next, dt = min(active, key=lambda x: x[1])
+    def ai_next():
+        """Running payload whose current stage finishes first (None when none is running)."""
+        running = [p for p in range(len(payloads_idx)) if payloads_idx[p] < last_idx and payloads_due[p] is not None]
+        return min(running, key=lambda p: payloads_due[p]) if running else None
+
+    def retry_stage(job, fault):
+        """Replay a job's failed stage under the stage's retry policy; the lane holds while it plays out."""
+        stage, stage_name = job.stage, AI_NODES[job.stage]
+        policy   = STAGE_RETRY_POLICIES.get(stage_name, DEFAULT_RETRY_POLICY)
+        fallback = AI_NODES.index(policy.fallback) if policy.fallback in AI_NODES else None
+        names    = [payloads_names[p] for p in job.members]
+        label    = " + ".join(names)
+        lead     = job.members[0]
+        started  = _time.perf_counter()
+
+        def attempt(n):
+            if n == 1:   # the stage already ran: this is the failure the injector scheduled
+                raise StageFailure(f"{label}: {stage_name} {fault.kind} (injected)")
+            wait_ai_phase("ai_progress", payload_idx=lead, stage_idx=stage)
+            faults.fire(stage_name, intent=names, sleep=pause)   # a retry can be hit too
+
+        def reprocess(n):
+            # Re-process the fallback stage (e.g. Context) while the failed stage stays red
+            if fallback is None:
+                return
+            ai_state_overrides[fallback] = "progress"; paint_ai()
+            wait_ai_phase("ai_progress", payload_idx=lead, stage_idx=fallback)
+            ai_state_overrides[fallback] = "success";  paint_ai()
+            wait_ai_phase("ai_settle", payload_idx=lead, stage_idx=fallback)
+
+        def on_retry_event(kind, info):
+            nonlocal ai_arrow_back_idx, ai_arrow_back_live
+            via = f"via {AI_NODES[fallback].split(' /')[0]}" if fallback is not None else "in place"
+            if kind == "failed":
+                # failed stage shows error + live badge; back arrow to the fallback; cards turn yellow
+                ai_state_overrides[stage] = "error"
+                ai_retry_badges[stage] = {
+                    "type": "live", "label": "↶",
+                    "title": f"Retrying {via} (attempt {info['attempt'] + 1}/{policy.max_attempts})",
+                }
+                ai_event_chips.append(f'↶ {stage_name} {fault.kind} • {label} • backoff {info["delay"]:.1f}s')
+                if fallback is not None:
+                    ai_arrow_back_idx, ai_arrow_back_live = fallback, True
+                for name in names:
+                    card_overrides[name] = {"pill": "retrying", "at": f"Retrying {via}"}
+                paint_ai()
+                return
+            # recovered / gave up / circuit open: clear the error and the back arrow
+            ai_state_overrides.pop(stage, None)
+            ai_state_overrides.pop(fallback, None)
+            ai_arrow_back_idx, ai_arrow_back_live = None, False
+            if kind == "recovered":
+                ai_retry_badges[stage] = note_recovery(stage_name, info)
+                ai_event_chips.append(f'✓ Recovered ({label}) • +{info["added"]:.1f}s')
+                for name in names:
+                    card_overrides.pop(name, None)
+            else:
+                reason = "circuit open" if kind == "rejected" else f"gave up after {info['attempt']} attempts"
+                ai_event_chips.append(f'✕ {label} • {stage_name} {reason}')
+                for name in names:
+                    card_overrides[name] = {"pill": "error", "at": f"{stage_name} {reason}"}
+                    results_map[name] = {"intent": name, "error": f"{stage_name} {reason}"}   # nothing to stream
+
+        # Slow the failing job on its stage; speed the other stages slightly while retrying
+        with sleeper(sleep_streaming), speed_profile(
+            ai={s: 0.85 for s in range(len(AI_NODES)) if s != stage},
+            ai_per_payload_stage={(lead, stage): 1.9},
+        ):
+            try:
+                run_with_retry(stage_name, attempt, policy=policy, fallback=reprocess,
+                               on_event=on_retry_event, sleep=pause, rng=rng)
+            except (StageFailure, CircuitOpenError):
+                pass   # shown by on_retry_event; the payloads ride the lane out and deliver the error
+
+        paused = _time.perf_counter() - started   # in-flight stages were frozen during the retry
+        for p in range(len(payloads_due)):
+            if payloads_due[p] is not None:
+                payloads_due[p] += paused
+
+    def ai_advance(p_next):
+        """Move a job (all of its payloads) a stage forward, then hand its worker to the next queued job."""
+        job = job_of[p_next]
+        fault = stage_faults.pop(job.job_id, None)
+        STAGE_HISTORY.observe(job.intent, job.stage, _time.perf_counter() - job.started_at)
+        ai_pool.release()
+        if job.job_id in invocation_slots:
+            # a failed attempt backs the limit off
+            INVOCATION_LIMITER.release(invocation_slots.pop(job.job_id), ok=fault is None)
+        if fault is not None:
+            retry_stage(job, fault)
+        for p in job.members:
+            payloads_due[p] = None
+            payloads_idx[p] += 1
+
+        # unchanged inputs: serve the cached section (or the resumed job's result) and skip the model call
+        for p in job.members[:]:
+            name = payloads_names[p]
+            if payloads_idx[p] == invocation_idx:
+                resumed = resumed_sections.get(name)
+                cached  = resumed or GENERATION_CACHE.get(gen_keys[name])
+                if cached is None:
+                    task_id, resumed = task_claim("Credit AI Invocation", name)
+                    if resumed is None:
+                        invocation_tasks[name] = task_id
+                        continue
+                    cached = resumed   # another worker generated it meanwhile
+                elif resumed is None:
+                    task_settle(task_claim("Credit AI Invocation", name)[0], cached)
+                results_map[name] = cached
+                payloads_idx[p] = last_idx
+                job.members.remove(p)
+                ai_event_chips.append(f'↻ Resumed • {name}' if resumed else f'⚡ Cache hit • {name}')
+
+        stage = payloads_idx[job.members[0]] if job.members else last_idx
+        if stage == AI_BATCH_STAGE and AI_BATCH_WINDOW > 0 and len(job.members) == 1:
+            batch.add(job.members[0], _time.perf_counter())   # wait for siblings to share the context
+            flush_batch()
+        elif stage < last_idx:
+            job.stage = stage
+            ai_pool.enqueue(job, _time.perf_counter())
+        else:
+            # reached Output Delivery: a batch makes one streaming backend call; each section's chunks
+            # go to its own card as they arrive
+            names = [payloads_names[p] for p in job.members
+                     if payloads_names[p] not in results_map and payloads_names[p] not in streams]
+            if len(names) > 1:
+                chunks = stream_batch_results(names, rp, rid)
+            else:
+                chunks = {name: stream_intent_result(name, rp, rid) for name in names}
+            for name in names:
+                streams[name] = SectionStream(name, chunks[name], cancel=cancel)
 
-        _sleep_smooth(dt)
-        for p in range(TOTAL_INTENTS):
-            if payloads_idx[p] < last_idx:
-                etas[p] = max(0.0, etas[p] - dt)
+        admit_payloads()   # delivered payloads leave room in the lane
+        ai_assign()
+        paint_ai()
 
-        # advance the chosen payload one stage
-        payloads_idx[p_next] += 1
+    def ai_sleep(seconds: float):
+        """Sleeper for the ingest lane: Credit AI payloads keep advancing while it waits."""
+        end = _time.perf_counter() + seconds
+        while True:
+            flush_batch()
+            ai_assign()   # invocation slots may have been freed by other sessions
+            p_next = ai_next()
+            due = payloads_due[p_next] if p_next is not None else float("inf")
+            until = min(end, due, batch.flush_at() or float("inf"))
+            sleep_streaming(max(0.0, until - _time.perf_counter()))
+            if due <= until:
+                ai_advance(p_next)
+            elif until >= end:
+                return
+
+    if n_intents:
+        paint_ai()   # empty lane until the first payload is emitted
 
-        if payloads_idx[p_next] < last_idx:
-            etas[p_next] = _stage_duration(payloads_idx[p_next])
-        else:
-            etas[p_next] = INF  # delivered
-            name = payloads_names[p_next]
-            if name not in results_map:
-                results_map[name] = mock_fetch_intent_result(name)
-
-        # --- inject a one-time failure at "Credit AI Invocation" for ABL when fail.pdf uploaded ---
-        # Node indexes: 0 Receive, 1 Prompt, 2 Download, 3 Context, 4 Credit AI Invocation, 5 Output
-        if (
-            credit_fail_active and not credit_fail_consumed
-            and abl_payload_index is not None
-            and p_next == abl_payload_index
-            and payloads_idx[p_next] == 4  # just reached "Credit AI Invocation"
-        ):
-            # 1) Invocation pill shows error + live badge; show animated back arrow to Context
-            ai_state_overrides[4] = "error"
-            ai_retry_badges[4] = {"type": "live", "label": "↶", "title": "Retrying via Context"}
-            ai_event_chips.append('↶ Credit AI → Context • ABL')
-            ai_arrow_back_idx  = 3   # edge between Context (3) and Invocation (4)
-            ai_arrow_back_live = True
-
-            # ABL card shows yellow pill + explicit retry message
-            card_overrides["ABL"] = {"pill": "retrying", "at": "Retrying via Context"}
-
-            paint_ai()
-            _sleep_smooth(SIM.get("ai_progress", 0.80) * SPEED_FACTOR)
-
-            # 2) Re-process prior node (Context) while Invocation stays red
-            ai_state_overrides[3] = "progress"; paint_ai(); _sleep_smooth(SIM.get("ai_settle", 0.35) * SPEED_FACTOR)
-            ai_state_overrides[3] = "success";  paint_ai(); _sleep_smooth(SIM.get("ai_settle", 0.35) * SPEED_FACTOR)
-
-            # 3) Retry succeeds → clear error, keep scar, stop back arrow, log recovery
-            ai_state_overrides.pop(4, None)
-            ai_retry_badges[4] = {"type": "scar", "title": "1 retry on this stage"}
-            ai_event_chips.append('✓ Recovered (ABL)')
-            ai_arrow_back_idx  = None
-            ai_arrow_back_live = False
-            card_overrides.pop("ABL", None)  # remove the temporary yellow pill / line
-
-            credit_fail_consumed = True
-            paint_ai()
-            continue  # still repaint at loop bottom, but we're already fresh
-
-        # Normal repaint after each hop
-        paint_ai()
+    # Node states
+    dp_nodes  = DOC_NODES[:]     # ["Document Upload", ..., "Trigger Evaluation"]
+    dp_states = ["pending"] * len(dp_nodes)
+    retry_badges = {}   # existing badges map (keep)
+    event_chips  = []   # existing chips (keep)
+    if incremental:
+        event_chips.append(f'Δ {n_ingest} new/changed doc(s) • {n_intents}/{TOTAL_INTENTS} section(s) affected')
+    if resumed_docs or resumed_sections:
+        event_chips.append(f'↻ Resumed job #{queue_job["id"]} • {len(resumed_docs)} doc(s) ingested, '
+                           f'{len(resumed_sections)} section(s) generated before')
+    arrow_back_idx  = None   # ← which edge to flip (e.g., 3 for Proxy→Async)
+    arrow_back_live = False  # ← pulse while retrying
+
+    upload_rate = None   # S3 Upload label once measured: "12.4 MB/s" / "deduped"
+
+    def paint_lane(ingested=None, total=None, payloads=None, payloads_total=None):
+      labels = dp_nodes[:]
+      if upload_rate:
+          labels[1] = f"S3 Upload  {upload_rate}"
+      if incremental:
+          labels[1] = f"{labels[1]} • {n_ingest} new" if upload_rate else f"S3 Upload  {n_ingest} new"
+          labels[2] = f"Section Coverage Analysis  {n_intents}/{TOTAL_INTENTS}"
+      if ingested is not None and total is not None:
+          labels[4] = f"Async DB Ingestion  {ingested}/{total}"
+      if payloads is not None and payloads_total is not None:
+          labels[5] = f"Trigger Evaluation  {payloads}/{payloads_total}"
+
+      html_lane = lane_html(
+          "Document Processing",
+          labels,
+          dp_states,
+          retry_badges=retry_badges,
+          events_html="".join(f'<span class="event-chip">{c}</span>' for c in event_chips),
+          back_edge_idx=arrow_back_idx,          # ← pass current override
+          back_live=arrow_back_live,             # ← pulse during retry
+      )
+      lane_area.markdown(f'<div class="board">{html_lane}</div>', unsafe_allow_html=True)
+
+
+    def dp_inject(stage_name, paint, doc=None):
+        """Apply a fault injected into this call on a Document Processing stage (latency waits, failures raise)."""
+        def announce(fault):
+            if fault.kind == "latency":
+                event_chips.append(f'⏱ {html.escape(fault.describe())}')
+                paint()
+        faults.fire(stage_name, doc=doc, sleep=pause, on_inject=announce)
+
+    def dp_run(node, attempt, paint, label=None) -> bool:
+        """Run attempt(n) for a Document Processing stage under its retry policy; False if it gave up."""
+        stage_name = dp_nodes[node]
+        policy     = STAGE_RETRY_POLICIES.get(stage_name, DEFAULT_RETRY_POLICY)
+        fallback   = dp_nodes.index(policy.fallback) if policy.fallback in dp_nodes else None
+        short      = {"Async DB Ingestion": "Async DB", "Proxy Document Retriever": "Proxy"}
+        name       = short.get(stage_name, stage_name)
+        suffix     = f" • {html.escape(label)}" if label else ""
+
+        def refetch(n):
+            # the fallback stage re-processes (yellow → green) while this one stays red
+            if fallback is None:
+                return
+            dp_states[fallback] = "progress"; paint(); wait_dp(fallback, "progress")
+            dp_states[fallback] = "success";  paint(); wait_dp(fallback, "success")
+
+        def on_retry_event(kind, info):
+            nonlocal arrow_back_idx, arrow_back_live
+            if kind == "failed":
+                # error + live badge (+ arrow flipped backward to the fallback, e.g. Proxy←Async)
+                dp_states[node] = "error"
+                via = f"via {short.get(policy.fallback, policy.fallback)}" if fallback is not None else "in place"
+                retry_badges[node] = {
+                    "type": "live", "label": "↶",
+                    "title": f"Retrying {via} (attempt {info['attempt'] + 1}/{policy.max_attempts})",
+                }
+                target = f" → {short.get(policy.fallback, policy.fallback)}" if fallback is not None else ""
+                event_chips.append(f'<span class="red">↑</span> {name}{target}{suffix} • backoff {info["delay"]:.1f}s')
+                if fallback is not None:
+                    arrow_back_idx, arrow_back_live = fallback, True
+                paint()
+                return
+            dp_states[node] = "progress"
+            arrow_back_idx, arrow_back_live = None, False
+            if kind == "recovered":
+                retry_badges[node] = note_recovery(stage_name, info)   # scar persists
+                event_chips.append(f'<span class="green">✓</span> Recovered{suffix} • +{info["added"]:.1f}s')
+            else:
+                reason = "circuit open" if kind == "rejected" else f"gave up after {info['attempt']} attempts"
+                event_chips.append(f'<span class="red">✕</span> {name} {reason}{suffix}')
+            paint()
+
+        # While retrying: slow the failed stage, speed its fallback
+        with speed_profile(dp={node: 1.8, **({fallback: 0.75} if fallback is not None else {})}):
+            try:
+                run_with_retry(stage_name, attempt, policy=policy, fallback=refetch,
+                               on_event=on_retry_event, sleep=pause, rng=rng)
+            except (StageFailure, CircuitOpenError):
+                return False
+        return True
+
+    def upload_documents():
+        """S3 Upload: put the new/changed documents at their content hash (deduped, multipart, resumable)."""
+        nonlocal upload_rate
+        sent, seconds, total = 0, 0.0, 0
+        for idx in ingest_idx:
+            data = docs[idx].get("data")
+            if not data:    # bytes already dropped: the object went up on an earlier run
+                continue
+            result = DOCUMENT_UPLOADER.upload(document_key(document_hash(docs[idx])), base64.b64decode(data))
+            sent, seconds, total = sent + result["sent"], seconds + result["seconds"], total + 1
+        if sent:
+            upload_rate = f"{sent / 1e6 / max(seconds, 1e-6):.1f} MB/s"
+        elif total:
+            upload_rate = "deduped"
+
+    def restore_bytes(doc: dict) -> dict:
+        """A document whose bytes were dropped by a cancelled run: read them back from the object store by hash."""
+        if doc.get("data"):
+            return doc
+        with DOWNLOAD_CACHE.open(document_hash(doc), open_document) as f:
+            return {**doc, "data": base64.b64encode(f.read()).decode("ascii")}
+
+    def drop_doc_bytes():
+        """On cancel: keep only hash + metadata of the uploads (what the ledger keeps), not their bytes."""
+        freed = sum(len(d.get("data") or "") * 3 // 4 for d in docs)
+        records = [document_record(d) for d in docs]
+        st.session_state.uploaded_docs = records
+        if "payload" in st.session_state:
+            st.session_state.payload["documents"] = records
+        return {"doc_bytes": freed}
+
+    # 1–4: move as a bundle (happy path)
+    paint_lane()
+    for i in range(4):  # Document Upload → Proxy Document Retriever
+        progress["stage"] = dp_nodes[i]
+
+        def bundle_step(n, i=i):
+            dp_states[i] = "progress"; paint_lane()
+            if n == 1:
+                wait("dp_progress")
+            else:
+                wait_dp(i, "progress")
+            dp_inject(dp_nodes[i], paint_lane)
+            if dp_nodes[i] == "S3 Upload":
+                upload_documents()
+
+        if not dp_run(i, bundle_step, paint_lane):
+            dp_states[i] = "error"; paint_lane()
+            st.error(f"{dp_nodes[i]} failed; processing stopped.")
+            progress["failed"] = f"{dp_nodes[i]} failed"
+            report_recovery()
+            return
+        dp_states[i] = "success";  paint_lane(); wait("dp_success")
+        if dp_nodes[i] == "S3 Upload":
+            cancel.on_cancel(drop_doc_bytes)   # the bytes are in the object store from here on
+
+    # From here on every ingest wait also advances the Credit AI lane
+    with sleeper(ai_sleep):
+        # 5: Async DB Ingestion (fan-out)
+        progress["stage"] = "Async DB Ingestion"
+        dp_states[4] = "progress"
+        paint_lane(ingested=0, total=n_ingest)
+
+        # Fan-out grid
+        doc_states = ["pending" if i in ingest_idx else "success" for i in range(len(docs))]   # unchanged: already ingested
+        fanout_area.markdown(render_fanout(docs, doc_states), unsafe_allow_html=True)
+
+        # Dependency-aware Trigger Evaluation: each intent goes out as soon as its required docs are ingested
+        trigger = TriggerEvaluator(run_sections, docs, ingested=[d for i, d in enumerate(docs) if i not in ingest_idx],
+                                   delta=[docs[i] for i in ingest_idx] if incremental else ())
+        trigger_started = False
+        payloads_sent   = 0
+
+        done = 0
+
+        def paint_dp():
+            paint_lane(ingested=done, total=n_ingest,
+                       payloads=(payloads_sent if trigger_started else None),
+                       payloads_total=(n_intents if trigger_started else None))
+
+        def dispatch(fired):
+            """Send payloads for newly ready intents; the first dispatch starts Trigger Evaluation."""
+            nonlocal trigger_started, payloads_sent
+            if not fired:
+                paint_dp()
+                return
+            first = not trigger_started
+            trigger_started = True
+            dp_states[5] = "progress"
+            payloads_sent += len(fired)
+            event_chips.extend(f'<span class="green">→</span> {html.escape(name)}' for name in fired)
+            for name in fired:
+                offer_payload(name)
+            paint_dp()
+            wait("tr_start" if first else "tr_tick")
+
+        def offer_payload(name):
+            """Hand a payload to the Credit AI lane; a full queue holds Trigger Evaluation here or sheds it."""
+            held_at = None
+            while not payload_q.offer(name):
+                if payload_q.overflow == "shed":
+                    shed(name)
+                    return
+                if held_at is None:
+                    held_at = _time.perf_counter()
+                    event_chips.append(f'⏸ Trigger Evaluation held • payload queue full ({payload_q.capacity})')
+                    paint_dp()
+                pause(STREAM_REPAINT_EVERY)   # through ai_sleep: the lane drains the queue meanwhile
+            if held_at is not None:
+                payload_q.blocked(_time.perf_counter() - held_at)
+            admit_payloads()
+
+        for name in trigger.unsatisfiable():
+            event_chips.append(f'{html.escape(name)}: no {html.escape(trigger.rule_for(name).describe())} in review')
+        dispatch(trigger.ready())   # inputs already ingested on an earlier run
+
+        ingest_node = dp_nodes.index("Async DB Ingestion")
+
+        for idx in ingest_idx:
+            # this doc starts ingesting
+            doc_states[idx] = "progress"
+            fanout_area.markdown(render_fanout(docs, doc_states), unsafe_allow_html=True)
+            doc_name = docs[idx].get("file_name", "")
+
+            def ingest(attempt):
+                if attempt == 1:
+                    wait("fo_progress")
+                else:   # Async DB retries (yellow) after the fallback re-fetched the doc
+                    dp_states[ingest_node] = "progress"; paint_dp(); wait_dp(ingest_node, "progress")
+                dp_inject("Async DB Ingestion", paint_dp, doc=doc_name)
+                # extracted chunks go to the shared batched writer; the doc is ingested once its batch commits
+                doc = restore_bytes(docs[idx])   # resumed after a cancel: the session kept only its record
+                ticket = INGEST_WRITER.write(doc, document_hash(doc), extract_chunks(doc))
+                deadline = _time.perf_counter() + INGEST_COMMIT_TIMEOUT
+                while not INGEST_WRITER.committed(ticket):
+                    if _time.perf_counter() > deadline:
+                        raise IngestError(f"Async DB Ingestion: {doc_name} not committed "
+                                          f"within {INGEST_COMMIT_TIMEOUT:g}s")
+                    pause(INGEST_FLUSH_EVERY / 2)   # through the sleeper: the Credit AI lane keeps moving
+
+            # retried per the stage policy: Proxy re-fetches the doc, back off, ingest again
+            task_id, ingested = task_claim("Async DB Ingestion", doc_name)
+            if ingested is None:    # otherwise another worker ingested it meanwhile
+                if not dp_run(ingest_node, ingest, paint_dp):
+                    task_settle(task_id, error="Async DB Ingestion gave up")
+                    doc_states[idx] = "error"   # its intents go out at finish() without it
+                    failed_docs.add(idx)
+                    for name, res in results_map.items():   # already generated without it: uncache
+                        if name in gen_keys and not res.get("cached") and generated_without_failed(name):
+                            GENERATION_CACHE.invalidate(gen_keys[name])
+                    fanout_area.markdown(render_fanout(docs, doc_states), unsafe_allow_html=True)
+                    continue
+                task_settle(task_id, document_record(docs[idx]))
+
+            doc_states[idx] = "success"
+            done += 1
+            dispatch(trigger.on_ingested(docs[idx]))
+
+            # repaint fanout after this doc completes
+            fanout_area.markdown(render_fanout(docs, doc_states), unsafe_allow_html=True)
+            wait_fo(idx, "success")
+
+        # Mark ingest node success after all docs ready
+        dp_states[4] = "success"
+        paint_dp()
+
+        # Intents whose inputs are not in the review go out once ingestion is done
+        dispatch(trigger.finish())
+        if not trigger_started:   # nothing to send (no affected sections): still show TE running
+            trigger_started = True
+            dp_states[5] = "progress"
+            paint_dp()
+            wait("tr_start")
+
+        # TE completes
+        progress["stage"] = "Trigger Evaluation"
+        dp_states[5] = "success"
+        paint_dp()
+        wait("tr_finish")
+
+    # Documents ingestion gave up on stay out of the ledger: the next run ingests them again, and the
+    # job stays 'failed' so it can be resumed
+    ingested_docs = [d for i, d in enumerate(docs) if i not in failed_docs]
+    if failed_docs:
+        progress["failed"] = f"Async DB Ingestion gave up on {len(failed_docs)} document(s)"
+
+    def warn_skipped() -> bool:
+        if failed_docs:
+            st.warning("Not ingested: " + ", ".join(docs[i].get("file_name", "") for i in sorted(failed_docs))
+                       + ". Sections were generated without them; run the review again to ingest them.")
+        return bool(failed_docs)
+
+    if not n_intents:
+        REVIEW_LEDGER.record(rp, rid, ingested_docs, {})
+        if not warn_skipped():
+            st.success("No sections are affected by the new documents. Previous results kept.")
+        report_recovery()
+        return
+
+    # Ingest is done: let the Credit AI lane run out
+    progress["stage"] = "Credit AI"
+    while payload_q or any(i < last_idx for i in payloads_idx):
+        ai_sleep(STREAM_REPAINT_EVERY)
+
+    # drain the remaining streams
+    while any(not s.done for s in streams.values()):
+        sleep_streaming(STREAM_REPAINT_EVERY)
+    collect_streams({})
+    paint_ai()
 
     # final settle & message
-    _sleep_smooth(SIM.get("ai_settle", 0.35) * SPEED_FACTOR)
-    st.success("All payloads delivered. Output Delivery complete.")
+    sleep_smooth(SIM.get("ai_settle", 0.35) * SPEED_FACTOR)
+    REVIEW_LEDGER.record(rp, rid, ingested_docs, results_map)
+    invalidate_sections(results_map, rp, rid)
+    skipped = warn_skipped()
+    if payload_q.stats["shed"]:
+        st.warning(f"{payload_q.stats['shed']} section(s) shed: the Credit AI queue was full. "
+                   "Run the review again to generate them.")
+    elif not skipped:
+        st.success("All payloads delivered. Output Delivery complete.")
+    st.session_state.delivery_metrics = {
+        name: {"ttfc": res.get("ttfc"), "ttc": res.get("ttc"), "cached": bool(res.get("cached"))}
+        for name, res in results_map.items()
+    }
+    st.caption(" • ".join(
+        f"{name}: from cache" if m["cached"] else f'{name}: first chunk {m["ttfc"]:.2f}s, complete {m["ttc"]:.2f}s'
+        for name, m in st.session_state.delivery_metrics.items()
+        if m["cached"] or (m["ttfc"] is not None and m["ttc"] is not None)
+    ))
+    report_recovery()
+
+def _review_cards_html(results):
+    """Review cards in the app's visual language; sections not yet in `results` show as fetching."""
+    cards = []
+    for name in PAYLOAD_SECTION_NAMES:
+        res = results.get(name)
+        if res is None:
+            cards.append(
+                f'<div class="doc-chip">'
+                f'  <h5>{html.escape(name)}</h5>'
+                f'  <div class="doc-meta">Fetching…</div>'
+                f'  <span class="status-pill progress">Fetching</span>'
+                f'</div>'
+            )
+            continue
+        if res.get("error"):
+            cards.append(
+                f'<div class="doc-chip">'
+                f'  <h5>{html.escape(name)}</h5>'
+                f'  <div class="doc-meta">{html.escape(res["error"])}</div>'
+                f'  <span class="status-pill error">Error</span>'
+                f'</div>'
+            )
+            continue
+        ts = html.escape(res.get("timestamp", ""))
+        full = html.escape(res.get("llm_response", ""))
+        snippet = html.escape(make_snippet(res.get("llm_response", "")))
+
+        cards.append(
+            f'<div class="doc-chip">'
+            f'  <h5>{html.escape(name)}</h5>'
+            f'  <div class="doc-meta">Delivered • {ts}</div>'
+            f'  <div class="doc-meta">{snippet}</div>'
+            f'  <details class="card-details"><summary class="view-link">View full response</summary>'
+            f'    <div class="fulltext">{full}</div>'
+            f'  </details>'
+            f'  <span class="status-pill success">Ready</span>'
+            f'</div>'
+        )
+    return (
+        '<div class="fanout-card">'
+        '  <div class="fanout-title">Review Sections</div>'
+        f'  <div class="doc-grid">{"".join(cards)}</div>'
+        '</div>'
+    )
+
+def page_review_bulk():
+    """Bulk mode: many review keys, all sections, one batched concurrency-limited pipeline."""
+    st.markdown('<div class="form-card">', unsafe_allow_html=True)
+    keys_text = st.text_area(
+        "Review keys (one risk_party_id,review_id per line)",
+        key="bulk_review_keys", height=160,
+    )
+    keys_csv = st.file_uploader("…or upload a CSV of review keys", type=["csv"], key="bulk_review_csv")
+    fetch = st.button("Fetch All Reviews", type="primary", use_container_width=True)
+    st.markdown('</div>', unsafe_allow_html=True)  # close form-card
+
+    if "bulk_results" not in st.session_state:
+        st.session_state.bulk_results = None
+
+    progress_area = st.empty()
+
+    if fetch:
+        text = keys_text or ""
+        if keys_csv is not None:
+            text += "\n" + keys_csv.getvalue().decode("utf-8", errors="replace")
+        review_keys = parse_review_keys(text)
+        if not review_keys:
+            st.warning("Please enter or upload at least one risk_party_id,review_id pair.")
+            return
+
+        total = len(review_keys) * len(PAYLOAD_SECTION_NAMES)
+        reviews = {key: {} for key in review_keys}
+        done = 0
+        t0 = _time.perf_counter()
+        bar = progress_area.progress(0.0, text=f"0/{total} sections")
+        for rp, rid, intent, res in iter_bulk_results(review_keys, PAYLOAD_SECTION_NAMES):
+            reviews[(rp, rid)][intent] = res
+            done += 1
+            complete = sum(1 for secs in reviews.values() if len(secs) == len(PAYLOAD_SECTION_NAMES))
+            bar.progress(done / total, text=f"{done}/{total} sections • {complete}/{len(review_keys)} reviews complete")
+        st.session_state.bulk_results = {"reviews": reviews, "elapsed": _time.perf_counter() - t0}
+
+    bulk = st.session_state.bulk_results
+    if not bulk:
+        return
+    reviews = bulk["reviews"]
+    rows = []
+    for (rp, rid), sections in reviews.items():
+        errors = sum(1 for r in sections.values() if r.get("error"))
+        rows.append({
+            "Risk Party ID": rp,
+            "Review ID": rid,
+            "Sections": f"{len(sections) - errors}/{len(PAYLOAD_SECTION_NAMES)}",
+            "Errors": errors,
+        })
+    progress_area.caption(
+        f'Fetched {sum(len(s) for s in reviews.values())} sections for {len(reviews)} reviews '
+        f'in {bulk["elapsed"]:.2f}s'
+    )
+    st.dataframe(rows, use_container_width=True, hide_index=True)
+    choice = st.selectbox("View review", list(reviews), format_func=lambda k: f"{k[0]} / {k[1]}", key="bulk_view")
+    if choice:
+        st.markdown(_review_cards_html(reviews[choice]), unsafe_allow_html=True)
 
 def page_review():
     st.header("Review Results")
 
+    mode = st.radio("Mode", ["Single review", "Bulk"], horizontal=True, key="review_mode",
+                    label_visibility="collapsed")
+    if mode == "Bulk":
+        page_review_bulk()
+        return
+
     # Card wrapper like Upload page for consistency
     st.markdown('<div class="form-card">', unsafe_allow_html=True)
 
@@ -1505,177 +1505,40 @@ def page_review():
     if "review_results" not in st.session_state:
         st.session_state.review_results = None
 
+    cards_area = st.empty()
+
     if fetch:
         if not rp or not rid:
             st.warning("Please enter both Risk Party ID and Review ID.")
             return
-        # For now we use the mock function for all three sections
-        results = {name: mock_fetch_intent_result(name) for name in PAYLOAD_SECTION_NAMES}
+        # All sections in flight at once; each card renders as soon as its section lands
+        results = {}
+        t0 = _time.perf_counter()
+        cards_area.markdown(_review_cards_html(results), unsafe_allow_html=True)
+        for name, res in iter_intent_results(PAYLOAD_SECTION_NAMES, rp, rid):
+            results[name] = res
+            cards_area.markdown(_review_cards_html(results), unsafe_allow_html=True)
         st.session_state.review_results = {
             "risk_party_id": rp,
             "review_id": rid,
-            "sections": results
+            "sections": results,
+            "elapsed": _time.perf_counter() - t0,
         }
 
     if st.session_state.review_results:
-        results = st.session_state.review_results["sections"]
-
-        # Build cards using same visual language as the app
-        def _review_cards_html():
-            cards = []
-            for name in PAYLOAD_SECTION_NAMES:
-                res = results.get(name, {})
-                ts = html.escape(res.get("timestamp", ""))
-                full = html.escape(res.get("llm_response", ""))
-                snippet = html.escape(make_snippet(res.get("llm_response", "")))
-
-                cards.append(
-                    f'<div class="doc-chip">'
-                    f'  <h5>{html.escape(name)}</h5>'
-                    f'  <div class="doc-meta">Delivered • {ts}</div>'
-                    f'  <div class="doc-meta">{snippet}</div>'
-                    f'  <details class="card-details"><summary class="view-link">View full response</summary>'
-                    f'    <div class="fulltext">{full}</div>'
-                    f'  </details>'
-                    f'  <span class="status-pill success">Ready</span>'
-                    f'</div>'
-                )
-            return (
-                '<div class="fanout-card">'
-                '  <div class="fanout-title">Review Sections</div>'
-                f'  <div class="doc-grid">{"".join(cards)}</div>'
-                '</div>'
-            )
-
-        st.markdown(_review_cards_html(), unsafe_allow_html=True)
+        review = st.session_state.review_results
+        cards_area.markdown(_review_cards_html(review["sections"]), unsafe_allow_html=True)
+        st.caption(f'Fetched {len(review["sections"])} sections in {review.get("elapsed", 0.0):.2f}s')
 
 # -------------------------------
 # ROUTER
 # -------------------------------
-if st.session_state.page == "home":
-    page_home()
-elif st.session_state.page == "upload":
-    page_upload()
-elif st.session_state.page == "process":
-    page_process()
-elif st.session_state.page == "review":
-    page_review()
-
-"--------------------------"
-from contextlib import contextmanager
-
-# ---- Speed profiles (same idea as before) ----
-SPEED_OVERRIDES = []
-def _apply_overrides(seconds: float, *, kind: str = None, index=None, payload_idx=None, stage_idx=None) -> float:
-    mult = 1.0
-    for ov in SPEED_OVERRIDES:
-        if kind == "dp" and index is not None:
-            mult *= ov.get("dp", {}).get(index, 1.0)
-        elif kind == "fo" and index is not None:
-            mult *= ov.get("fo", {}).get(index, 1.0)
-        elif kind == "ai":
-            if stage_idx is not None:
-                mult *= ov.get("ai", {}).get(stage_idx, 1.0)
-            if payload_idx is not None and stage_idx is not None:
-                mult *= ov.get("ai_per_payload_stage", {}).get((payload_idx, stage_idx), 1.0)
-    return seconds * mult
-
-@contextmanager
-def speed_profile(*, dp=None, fo=None, ai=None, ai_per_payload_stage=None):
-    SPEED_OVERRIDES.append({
-        "dp": dp or {},
-        "fo": fo or {},
-        "ai": ai or {},
-        "ai_per_payload_stage": ai_per_payload_stage or {},
-    })
-    try:
-        yield
-    finally:
-        SPEED_OVERRIDES.pop()
-
-# ---- Context pointers telling wait() what to scale ----
-_CURRENT_DP_NODE = None     # which DP node index is "active" for the next waits
-_CURRENT_FO_DOC  = None     # which doc index is "active" for fanout waits
-
-@contextmanager
-def at_dp_node(node_index: int):
-    global _CURRENT_DP_NODE
-    prev = _CURRENT_DP_NODE
-    _CURRENT_DP_NODE = node_index
-    try:
-        yield
-    finally:
-        _CURRENT_DP_NODE = prev
-
-@contextmanager
-def at_fo_doc(doc_index: int):
-    global _CURRENT_FO_DOC
-    prev = _CURRENT_FO_DOC
-    _CURRENT_FO_DOC = doc_index
-    try:
-        yield
-    finally:
-        _CURRENT_FO_DOC = prev
-
-# ---- PATCH your wait() so it honors the contexts above ----
-def wait(key: str):
-    dur = SIM[key] * SPEED_FACTOR
-    if key.startswith("dp_"):       # scale by active DP node (if any)
-        dur = _apply_overrides(dur, kind="dp", index=_CURRENT_DP_NODE)
-    elif key.startswith("fo_"):     # scale by active doc (if any)
-        dur = _apply_overrides(dur, kind="fo", index=_CURRENT_FO_DOC)
-    _sleep_smooth(dur)
-
-'-------------------------------'
-if failing_active and idx == BULK_FAIL_DOC_INDEX:
-    prev_node = 3  # Proxy Document Retriever
-
-    # Slow Async DB (4), speed Proxy (3). You can also add others here.
-    with speed_profile(dp={4: 1.8, 3: 0.75}, fo={idx: 1.15}):
-        # Step 1: mark error on Async DB and show back arrow
-        dp_states[4] = "error"
-        retry_badges[4] = {"type": "live", "label": "↶", "title": "Retrying via Proxy"}
-        event_chips.append('<span class="red">↑</span> Async DB → Proxy')
-        arrow_back_idx, arrow_back_live = 3, True
-        paint_lane(ingested=done, total=len(docs))
-
-        # Step 2: re-run Proxy (sped up because dp[3]=0.75)
-        dp_states[prev_node] = "progress"; paint_lane(ingested=done, total=len(docs))
-        with at_dp_node(prev_node): wait("dp_progress")
-
-        dp_states[prev_node] = "success";  paint_lane(ingested=done, total=len(docs))
-        with at_dp_node(prev_node): wait("dp_success")
-
-        # Step 3: retry Async DB (slowed because dp[4]=1.8)
-        dp_states[4] = "progress"; paint_lane(ingested=done, total=len(docs))
-        with at_dp_node(4): wait("dp_progress")
-
-        # doc completes
-        doc_states[idx] = "success"; done += 1
-        event_chips.append('<span class="green">✓</span> Recovered')
-        retry_badges[4] = {"type": "scar", "title": "1 retry on this stage"}
-        arrow_back_idx, arrow_back_live = None, False
-
-        paint_lane(ingested=done, total=len(docs))
-        fanout_area.markdown(render_fanout(docs, doc_states), unsafe_allow_html=True)
-        with at_fo_doc(idx): wait("fo_success")
-
-        failing_active = False
-
-        # (rest of your TE handling stays as-is)
-    continue
-
-'-------------------'
-def _stage_duration(stage: int, payload_idx=None) -> float:
-    base = AI_STAGE_BASE[stage]
-    jitter = random.uniform(0.75, 1.35)
-    dur = base * jitter * SPEED_FACTOR
-    return _apply_overrides(dur, kind="ai", payload_idx=payload_idx, stage_idx=stage)
-
-'------------------'
-with speed_profile(
-    ai={0: 0.85, 1: 0.85, 2: 0.85, 3: 0.85, 5: 0.85},          # speed other stages
-    ai_per_payload_stage={(abl_payload_index, 4): 1.9}          # slow ABL at Invocation
-):
-    # your ABL retry sequence...
+PAGES = {
+    "home": page_home,
+    "upload": page_upload,
+    "process": page_process,
+    "review": page_review,
+}
 
+# Only the routed page's work runs on a given rerun
+PAGES.get(st.session_state.page, page_home)()
@@ -0,0 +1,135 @@
+"""Flow control benchmark: a burst of uploads into the Credit AI lane (discrete-event, no sleeping).
+
+    python bench_backpressure.py [--reviews 60] [--workers 4] [--burst-s 0.5] [--capacity 6] [--lane 6]
+
+--reviews reviews are uploaded within --burst-s seconds; Trigger Evaluation emits
+one payload per section as each review's documents finish ingesting (spread over
+a few seconds per review). The same burst is replayed three ways:
+
+    unbounded   every payload enters the lane at once (no flow control)
+    block       bounded queue (--capacity) feeding a lane of --lane in flight;
+                a full queue holds Trigger Evaluation, so ingestion waits too
+    shed        same bounds; a payload arriving at a full queue is dropped
+
+Reports the peak number of payloads held in the Credit AI lane and its queue (what
+sits in memory with its prompt and context), the peak waiting for a worker at
+Credit AI Invocation, how long Trigger Evaluation was held, payloads shed,
+throughput and p95 latency from a section's documents being ingested to its
+delivery (time held upstream included).
+"""
+import argparse
+import heapq
+import random
+
+from bench_scheduling import SECTION_COST, percentile
+from scheduling import BoundedQueue, Job, WorkerPool, make_policy
+from simulation import AI_NODES, AI_STAGE_BASE, PAYLOAD_SECTION_NAMES
+
+INGEST_S = (1.0, 4.0)   # seconds from upload until a section's documents are ingested
+
+
+def burst(reviews: int, burst_s: float, seed: int) -> list:
+    """[(emitted, review, intent, stage durations)] sorted by emission."""
+    rng = random.Random(seed)
+    out = []
+    for r in range(reviews):
+        uploaded = rng.uniform(0, burst_s)
+        for intent in PAYLOAD_SECTION_NAMES:
+            cost = SECTION_COST.get(intent, [1.0] * len(AI_STAGE_BASE))
+            durations = [b * c * rng.uniform(0.75, 1.35) for b, c in zip(AI_STAGE_BASE, cost)]
+            out.append((uploaded + rng.uniform(*INGEST_S), r, intent, durations))
+    return sorted(out)
+
+
+def simulate(mode: str, payloads, workers: int, capacity: int, lane: int) -> dict:
+    pool = WorkerPool(make_policy("fifo"), workers)
+    queue = BoundedQueue("payloads", capacity, overflow="shed" if mode == "shed" else "block")
+    lane_cap = float("inf") if mode == "unbounded" else lane
+    invocation = AI_NODES.index("Credit AI Invocation")
+    events, seq = [], 0
+    in_lane, peak_held, peak_invocation_queue = 0, 0, 0
+    pending = list(payloads)            # not emitted yet, in order (Trigger Evaluation is one producer)
+    held_since = None                   # Trigger Evaluation held by a full queue since
+    held_s, latency, emitted_at, durations = 0.0, [], {}, {}
+    now = 0.0
+
+    def admit(now):
+        nonlocal in_lane
+        while queue and in_lane < lane_cap:
+            job = queue.take()
+            in_lane += 1
+            pool.enqueue(job, now)
+
+    def emit(now):
+        """Trigger Evaluation emits every payload that is due, unless the queue holds it up."""
+        nonlocal held_since, held_s
+        while pending and pending[0][0] <= now:
+            t, review, intent, stage_times = pending[0]
+            job = Job((review, intent), intent, arrival=max(t, now))
+            if mode == "unbounded":
+                queue.items.append(job)     # no bound: straight through
+            elif not queue.offer(job):
+                if mode == "block":
+                    if held_since is None:
+                        held_since = now
+                    return
+            pending.pop(0)
+            if held_since is not None:
+                held_s += now - held_since
+                held_since = None
+            emitted_at[job.job_id] = t          # latency counts the time Trigger Evaluation was held
+            durations[job.job_id] = stage_times
+            admit(now)
+
+    for t, *_ in payloads:
+        seq += 1
+        heapq.heappush(events, (t, seq, "emit", None))
+    while events:
+        now, _, kind, job = heapq.heappop(events)
+        if kind == "done":
+            pool.release()
+            job.stage += 1
+            if job.stage < len(AI_STAGE_BASE):
+                pool.enqueue(job, now)
+            else:
+                in_lane -= 1
+                latency.append(now - emitted_at[job.job_id])
+                admit(now)
+        emit(now)
+        peak_held = max(peak_held, in_lane + len(queue))
+        peak_invocation_queue = max(peak_invocation_queue, pool.queued_at(invocation))
+        for started in pool.assign(now):
+            seq += 1
+            heapq.heappush(events, (now + durations[started.job_id][started.stage], seq, "done", started))
+    return {
+        "peak_held": peak_held,
+        "peak_invocation_queue": peak_invocation_queue,
+        "held_s": held_s,
+        "shed": queue.stats["shed"],
+        "throughput": len(latency) * 60 / max(now, 1e-9),
+        "p95": percentile(latency, 0.95),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--reviews", type=int, default=60)
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--burst-s", type=float, default=0.5)
+    ap.add_argument("--capacity", type=int, default=6)
+    ap.add_argument("--lane", type=int, default=6)
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    payloads = burst(args.reviews, args.burst_s, args.seed)
+    print(f"{args.reviews} reviews ({len(payloads)} payloads) uploaded within {args.burst_s}s, {args.workers} workers, "
+          f"queue {args.capacity}, lane {args.lane}")
+    for mode in ("unbounded", "block", "shed"):
+        r = simulate(mode, payloads, args.workers, args.capacity, args.lane)
+        print(f"{mode:<10} peak held {r['peak_held']:4d}  peak waiting at invocation {r['peak_invocation_queue']:4d}  "
+              f"TE held {r['held_s']:6.1f} s  shed {r['shed']:3d}  {r['throughput']:5.1f} sections/min  "
+              f"p95 {r['p95']:6.2f} s")
+
+
+if __name__ == "__main__":
+    main()
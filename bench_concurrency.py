@@ -0,0 +1,114 @@
+"""Credit AI Invocation concurrency benchmark: fixed fan-out vs adaptive limits.
+
+    python bench_concurrency.py [--requests 600] [--clients 48] [--capacity 8] [--base-ms 40]
+
+An in-process stand-in for the model backend serves --capacity calls at --base-ms;
+every call beyond capacity slows all in-flight calls down and fails with a
+probability that grows with the overload (503-style), which callers retry up to 3
+times. --clients threads issue --requests invocations:
+
+    fixed      every client calls at once (today's fan-out)
+    aimd       through AdaptiveLimiter(algorithm="aimd")
+    gradient   through AdaptiveLimiter(algorithm="gradient")
+
+Reports throughput, p50/p95 end-to-end latency (queueing + retries included),
+backend errors and the limit each controller settled on.
+"""
+import argparse
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from concurrency_limit import AdaptiveLimiter
+
+MAX_ATTEMPTS = 4
+
+
+class OverloadedBackend:
+    def __init__(self, capacity: int, base_ms: float, seed: int = 7):
+        self.capacity = capacity
+        self.base = base_ms / 1000.0
+        self.rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.calls = 0
+        self.errors = 0
+
+    def invoke(self):
+        with self._lock:
+            self.in_flight += 1
+            self.calls += 1
+            overload = max(0, self.in_flight - self.capacity) / self.capacity
+            fail = self.rng.random() < min(0.9, 0.6 * overload)
+            jitter = self.rng.uniform(0.9, 1.1)
+        try:
+            time.sleep(self.base * jitter * (1 + 1.5 * overload))
+            if fail:
+                with self._lock:
+                    self.errors += 1
+                raise RuntimeError("503 backend overloaded")
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+def percentile(samples, q: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    k = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[k]
+
+
+def run(label, backend, requests, clients, limiter=None):
+    latencies, failed = [], []
+    lock = threading.Lock()
+
+    def one(_):
+        t0 = time.perf_counter()
+        for _attempt in range(MAX_ATTEMPTS):
+            try:
+                if limiter is None:
+                    backend.invoke()
+                else:
+                    with limiter.slot():
+                        backend.invoke()
+                break
+            except RuntimeError:
+                continue
+        else:
+            with lock:
+                failed.append(1)
+        with lock:
+            latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(one, range(requests)))
+    wall = time.perf_counter() - t0
+    limit = f"limit {limiter.limit:3d}" if limiter is not None else "limit   -"
+    print(f"{label:<9} {(requests - len(failed)) / wall:7.1f} ok/s  p50 {statistics.median(latencies) * 1000:7.1f} ms  "
+          f"p95 {percentile(latencies, 0.95) * 1000:7.1f} ms  backend calls {backend.calls:5d}  "
+          f"errors {backend.errors:4d}  gave up {len(failed):3d}  {limit}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--requests", type=int, default=600)
+    ap.add_argument("--clients", type=int, default=48)
+    ap.add_argument("--capacity", type=int, default=8)
+    ap.add_argument("--base-ms", type=float, default=40.0)
+    args = ap.parse_args()
+
+    print(f"{args.requests} invocations from {args.clients} clients; backend capacity {args.capacity} "
+          f"at {args.base_ms:.0f} ms")
+    run("fixed", OverloadedBackend(args.capacity, args.base_ms), args.requests, args.clients)
+    for algorithm in ("aimd", "gradient"):
+        limiter = AdaptiveLimiter(algorithm=algorithm, initial=2, max_limit=args.clients)
+        run(algorithm, OverloadedBackend(args.capacity, args.base_ms), args.requests, args.clients, limiter)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Download Documents benchmark: every intent fetching its documents vs the shared download cache.
+
+    python bench_download.py [--reviews 4] [--docs 4] [--mb 8] [--intents 3] [--workers 6] [--mbps 50]
+                             [--latency-ms 20] [--cache-mb 64]
+
+--reviews reviews of --docs documents (--mb each) are in a throttled LocalObjectStore
+(--latency-ms per request, --mbps per connection). Each review has --intents intent
+payloads that all need every document of their review, run by --workers threads:
+
+    no cache     each payload downloads its documents itself
+    cache        payloads read through a DownloadCache: the first payload of a review
+                 downloads, concurrent misses on a document share one download, the
+                 rest read the local copy (the store throttles each connection, not the
+                 link, so the cold run saves bytes and requests rather than time)
+    warm         the same payloads again on the now-warm cache
+
+Then context assembly reads one review's documents, held at once, as copies (read())
+and through mapped() (mmap), reporting the private memory each costs the process.
+--cache-mb smaller than the working set shows LRU eviction.
+"""
+import argparse
+import hashlib
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+from download_cache import DownloadCache
+from object_store import LocalObjectStore, open_document, document_key
+
+
+def anon_rss_mb() -> float:
+    """Private (anonymous) resident memory: what copies cost; mapped file pages are not counted (Linux)."""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("RssAnon:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--reviews", type=int, default=4)
+    ap.add_argument("--docs", type=int, default=4)
+    ap.add_argument("--mb", type=float, default=8)
+    ap.add_argument("--intents", type=int, default=3)
+    ap.add_argument("--workers", type=int, default=6)
+    ap.add_argument("--mbps", type=float, default=50)
+    ap.add_argument("--latency-ms", type=float, default=20)
+    ap.add_argument("--cache-mb", type=float, default=256)
+    args = ap.parse_args()
+
+    store = LocalObjectStore(tempfile.mkdtemp(), latency=args.latency_ms / 1000, mbps=args.mbps)
+    reviews = []
+    for _ in range(args.reviews):
+        hashes = []
+        for _ in range(args.docs):
+            data = os.urandom(int(args.mb * 1e6))
+            sha = hashlib.sha256(data).hexdigest()
+            store.put_object(Bucket="bench", Key=document_key(sha), Body=data)
+            hashes.append(sha)
+        reviews.append(hashes)
+    payloads = [hashes for hashes in reviews for _ in range(args.intents)]
+    fetch = lambda sha: open_document(sha, store, "bench")   # noqa: E731
+    print(f"{args.reviews} reviews x {args.docs} documents x {args.mb:g} MB, {args.intents} intents each, "
+          f"{args.workers} workers, {args.mbps:g} MB/s per connection, {args.latency_ms:g} ms per request")
+
+    def run(label, download):
+        store.stats.update(requests=0, bytes_out=0)
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            list(pool.map(lambda hashes: [download(h) for h in hashes], payloads))
+        elapsed = time.perf_counter() - t0
+        print(f"{label:<9} {elapsed:6.2f}s  {len(payloads) / elapsed:6.1f} payloads/s  "
+              f"downloaded {store.stats['bytes_out'] / 1e6:7.1f} MB in {store.stats['requests']:3d} requests")
+
+    def uncached(sha):
+        body = fetch(sha)
+        try:
+            while body.read(1024 * 1024):
+                pass
+        finally:
+            body.close()
+
+    run("no cache", uncached)
+    cache = DownloadCache(tempfile.mkdtemp(), max_bytes=int(args.cache_mb * 1024 * 1024))
+    run("cache", lambda sha: cache.get(sha, fetch))
+    run("warm", lambda sha: cache.get(sha, fetch))
+    s = cache.stats
+    print(f"cache: hits {s['hits']}  misses {s['misses']}  shared downloads {cache._flights.stats['shared']}  "
+          f"evictions {s['evictions']}  holding {cache.size_bytes / 1e6:.1f} MB in {len(cache)} documents")
+
+    # context assembly holds a review's documents while it builds the context and reads all of them
+    context = [h for h in reviews[-1] if cache.contains(h)]
+    for label in ("mapped()", "read()"):    # mapped first: freed copies are not always returned to the OS
+        rss, t0 = anon_rss_mb(), time.perf_counter()
+        with ExitStack() as stack:
+            if label == "read()":
+                views = [open(cache.get(sha, fetch), "rb").read() for sha in context]
+            else:
+                views = [stack.enter_context(cache.mapped(sha, fetch)) for sha in context]
+            digest = hashlib.sha256()
+            for view in views:
+                digest.update(view)
+            held = anon_rss_mb() - rss
+            total = sum(len(v) for v in views)
+            del views, view
+        print(f"context {label:<9} {total / 1e6:6.1f} MB read in {time.perf_counter() - t0:6.3f}s  "
+              f"private memory {max(held, 0.0):+6.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""Section fetch benchmark against the local stand-in server.
+
+    python bench_fetch.py [--requests 60] [--threads 6] [--latency-ms 40] [--error-rate 0]
+
+Compares a fresh `requests.get` per section (the old get_intent_result) with the
+pooled keep-alive IntentClient, sequentially and from a thread pool. Reports
+p50/p95 latency, throughput and how many TCP connections the server accepted.
+
+The committee scenario has --viewers sessions open the same review at once and
+counts backend requests with and without single-flight coalescing (cache off).
+The bulk scenario fetches --reviews reviews x all sections per-section (thread pool)
+versus through the batched bulk pipeline (POST /batch). The auth scenario compares a token round-trip per section with the shared
+refresh-ahead TokenCache against an issuer with a short token lifetime.
+"""
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from intent_client import IntentClient
+from intents import BULK_BATCH_SIZE, MAX_CONCURRENT_BATCHES, iter_bulk_results
+from singleflight import SingleFlight
+from token_cache import TokenCache, http_token_fetcher
+from simulation import PAYLOAD_SECTION_NAMES
+from stand_in_server import serve_in_thread
+
+
+def percentile(samples, q: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    k = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[k]
+
+
+def run(label, fetch, n, threads, server):
+    before = dict(server.stats)
+    keys = [(PAYLOAD_SECTION_NAMES[i % len(PAYLOAD_SECTION_NAMES)], "RP1", f"R{i // 3}") for i in range(n)]
+
+    failures = []
+
+    def one(key):
+        t0 = time.perf_counter()
+        try:
+            fetch(*key)
+        except Exception:
+            failures.append(key)
+        return (time.perf_counter() - t0) * 1000
+
+    t0 = time.perf_counter()
+    if threads > 1:
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            lat = list(pool.map(one, keys))
+    else:
+        lat = [one(k) for k in keys]
+    wall = time.perf_counter() - t0
+    conns = server.stats["connections"] - before["connections"]
+    print(f"{label:<30} p50 {statistics.median(lat):7.1f} ms  p95 {percentile(lat, 0.95):7.1f} ms  "
+          f"{n / wall:7.1f} req/s  connections {conns}  failed {len(failures)}")
+
+
+def run_committee(client, viewers, server):
+    """`viewers` sessions fetch the same review concurrently; report backend requests served."""
+    keys = [(name, "RP1", "COMMITTEE") for name in PAYLOAD_SECTION_NAMES]
+
+    def session(fetch):
+        for key in keys:
+            fetch(*key)
+
+    for label, flights in (("independent fetches", None), ("single-flight", SingleFlight())):
+        if flights is None:
+            fetch = client.get_intent_result
+        else:
+            def fetch(intent, rp, rid, _f=flights):
+                return _f.do((rp, rid, intent), client.get_intent_result, intent, rp, rid)
+        before = server.stats["requests"]
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=viewers) as pool:
+            list(pool.map(lambda _: session(fetch), range(viewers)))
+        wall = time.perf_counter() - t0
+        print(f"{viewers} viewers, {label:<20} backend requests {server.stats['requests'] - before:4d}  "
+              f"wall {wall * 1000:7.1f} ms")
+
+
+def run_bulk(client, reviews, threads, server):
+    """Morning portfolio run: per-section calls vs the batched bulk pipeline."""
+    review_keys = [(f"RP{i:03d}", f"BULK{i:03d}") for i in range(reviews)]
+    keys = [(rp, rid, intent) for rp, rid in review_keys for intent in PAYLOAD_SECTION_NAMES]
+
+    before = server.stats["requests"]
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(lambda k: client.get_intent_result(k[2], k[0], k[1]), keys))
+    wall = time.perf_counter() - t0
+    print(f"bulk {reviews} reviews, per-section ({threads} thr)   requests {server.stats['requests'] - before:4d}  "
+          f"wall {wall * 1000:7.1f} ms")
+
+    before = server.stats["requests"]
+    t0 = time.perf_counter()
+    n = sum(1 for _ in iter_bulk_results(review_keys, PAYLOAD_SECTION_NAMES, cache=None,
+                                         fetch_batch=client.get_intent_results_batch))
+    wall = time.perf_counter() - t0
+    print(f"bulk {reviews} reviews, batched ({BULK_BATCH_SIZE}/batch, {MAX_CONCURRENT_BATCHES} in flight) "
+          f"requests {server.stats['requests'] - before:4d}  wall {wall * 1000:7.1f} ms  sections {n}")
+
+
+def run_auth(n, threads, latency_ms):
+    """Per-request token fetch vs shared TokenCache, against an auth-enforcing stand-in."""
+    server = serve_in_thread(latency_ms=latency_ms, jitter_ms=latency_ms / 4, seed=7,
+                             require_auth=True, token_ttl=0.4)
+    fetch_token = http_token_fetcher(f"{server.base_url}/token", "bench", "secret")
+    try:
+        per_request = IntentClient(server.base_url, pool_maxsize=threads,
+                                   headers_provider=lambda: {"Authorization": f"Bearer {fetch_token()['access_token']}"})
+        tokens = TokenCache(fetch_token, refresh_ahead=0.2, skew=0.0)
+        cached = IntentClient(server.base_url, pool_maxsize=threads,
+                              headers_provider=tokens.headers, on_unauthorized=tokens.invalidate)
+        for label, client in (("token per request", per_request), ("TokenCache", cached)):
+            issued = server.stats["tokens_issued"]
+            run(f"auth: {label} ({threads} thr)", client.get_intent_result, n, threads, server)
+            print(f"{'':<30} tokens issued {server.stats['tokens_issued'] - issued}  "
+                  f"401s {server.stats['unauthorized']}")
+            client.close()
+        print(f"{'':<30} TokenCache stats {tokens.stats}")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--requests", type=int, default=60)
+    ap.add_argument("--threads", type=int, default=6)
+    ap.add_argument("--latency-ms", type=float, default=40.0)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--viewers", type=int, default=12)
+    ap.add_argument("--reviews", type=int, default=36)
+    args = ap.parse_args()
+
+    server = serve_in_thread(latency_ms=args.latency_ms, jitter_ms=args.latency_ms / 4,
+                             error_rate=args.error_rate, seed=7)
+    client = IntentClient(server.base_url, pool_maxsize=max(args.threads, args.viewers))
+
+    def fresh_get(intent, rp, rid):
+        resp = requests.get(client.url_for(intent, rp, rid), timeout=client.timeout)
+        resp.raise_for_status()
+        return resp.json()
+
+    try:
+        run("fresh requests.get (serial)", fresh_get, args.requests, 1, server)
+        run("pooled client (serial)", client.get_intent_result, args.requests, 1, server)
+        run(f"fresh requests.get ({args.threads} thr)", fresh_get, args.requests, args.threads, server)
+        run(f"pooled client ({args.threads} thr)", client.get_intent_result, args.requests, args.threads, server)
+        run_committee(client, args.viewers, server)
+        run_bulk(client, args.reviews, args.threads, server)
+        run_auth(args.requests, args.threads, args.latency_ms)
+    finally:
+        client.close()
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Async DB Ingestion write benchmark: per-chunk inserts vs the batched IngestWriter.
+
+    python bench_ingest.py [--docs 200] [--chunks 200] [--workers 8] [--rtt-ms 0.5] [--slow-ms 0]
+
+--workers extraction threads each take documents of --chunks chunks and write
+them to a fresh SQLite file:
+
+    per-chunk   one INSERT and one commit per chunk (the naive writer)
+    batched     IngestWriter: buffered, executemany in size / time based batches
+
+Every statement and commit also waits --rtt-ms, the round trip to the real
+database this SQLite file stands in for (0 measures SQLite alone). --slow-ms
+adds that much time per batch write (a slow or contended database) to show
+backpressure: with the buffer bounded, extraction blocks instead of piling up
+rows. Reports rows/s, transactions, the peak number of buffered rows and how long
+extraction workers spent blocked.
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ingest_writer import SCHEMA, IngestWriter
+
+
+def documents(n_docs: int, n_chunks: int):
+    return [({"file_name": f"doc{i}.pdf", "document_type": "10K", "business_date": "2024"}, f"{i:064x}",
+             [f"chunk {j} of document {i} " * 40 for j in range(n_chunks)]) for i in range(n_docs)]
+
+
+def per_chunk(path, docs, workers, rtt_s, _slow_s):
+    lock = threading.Lock()     # one connection per thread; SQLite serializes the writers anyway
+    local = threading.local()
+    commits = 0
+
+    def write(item):
+        nonlocal commits
+        doc, sha, chunks = item
+        db = getattr(local, "db", None)
+        if db is None:
+            db = local.db = sqlite3.connect(path, timeout=30)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+        for seq, text in enumerate(chunks):
+            db.execute("INSERT OR REPLACE INTO chunks VALUES (?, ?, ?)", (sha, seq, text))
+            db.commit()
+            time.sleep(2 * rtt_s)
+        db.execute("INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?, ?)",
+                   (sha, doc["file_name"], doc["document_type"], doc["business_date"], len(chunks), time.time()))
+        db.commit()
+        time.sleep(2 * rtt_s)
+        with lock:
+            commits += len(chunks) + 1
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(write, docs))
+    return {"transactions": commits}
+
+
+class SlowWriter(IngestWriter):
+    def __init__(self, *args, delay_s: float = 0.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.delay_s = delay_s
+
+    def _write_batch(self, db, docs, chunks):
+        time.sleep(self.delay_s)
+        super()._write_batch(db, docs, chunks)
+
+
+def batched(path, docs, workers, rtt_s, slow_s):
+    writer = SlowWriter(path, delay_s=4 * rtt_s + slow_s)     # BEGIN, two executemany, COMMIT
+
+    def write(item):
+        doc, sha, chunks = item
+        writer.write(doc, sha, chunks)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(write, docs))
+    writer.flush()
+    s = writer.stats
+    return {"transactions": s["batches"], "peak buffered": s["peak_buffered"], "blocked": s["blocked"],
+            "blocked s": round(s["blocked_s"], 2), "size/time flushes": f'{s["size_flushes"]}/{s["time_flushes"]}'}
+
+
+def run(label, fn, args, docs, *extra):
+    path = os.path.join(tempfile.mkdtemp(), "ingest.sqlite3")
+    db = sqlite3.connect(path)
+    db.executescript(SCHEMA)
+    db.close()
+    t0 = time.perf_counter()
+    info = fn(path, docs, args.workers, *extra)
+    elapsed = time.perf_counter() - t0
+    rows = sqlite3.connect(path).execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+    print(f"{label:<10} {rows} rows in {elapsed:6.2f}s ({rows / elapsed:8.0f} rows/s)  "
+          + "  ".join(f"{k} {v}" for k, v in info.items()))
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--docs", type=int, default=200)
+    ap.add_argument("--chunks", type=int, default=200)
+    ap.add_argument("--workers", type=int, default=8)
+    ap.add_argument("--rtt-ms", type=float, default=0.5)
+    ap.add_argument("--slow-ms", type=float, default=0.0)
+    args = ap.parse_args()
+
+    docs = documents(args.docs, args.chunks)
+    print(f"{args.docs} documents x {args.chunks} chunks, {args.workers} extraction workers, "
+          f"{args.rtt_ms:g} ms round trip")
+    run("per-chunk", per_chunk, args, docs, args.rtt_ms / 1000, 0.0)
+    run("batched", batched, args, docs, args.rtt_ms / 1000, args.slow_ms / 1000)
+
+
+if __name__ == "__main__":
+    main()
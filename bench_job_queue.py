@@ -0,0 +1,91 @@
+"""Job queue benchmark: several processes sharing one SQLite queue, with a crash and a stall.
+
+    python bench_job_queue.py [--processes 4] [--tasks 2000] [--batch 8] [--work-ms 2] [--lease 1.0]
+
+One job with --tasks tasks is put in a fresh queue file; --processes worker
+processes claim --batch tasks at a time, "invoke" each (--work-ms) and complete
+it. One worker crashes (os._exit) right after a claim, holding its leases; another
+stalls past --lease on one batch and only then tries to complete it. Reports
+throughput and checks the queue ended with every task done exactly once: none
+lost (the crashed worker's batch is reclaimed once its lease expires), no result
+recorded twice (the stalled worker's late completions are rejected).
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+from job_queue import JobQueue
+
+
+def worker(path, name, args, role, out):
+    queue = JobQueue(path, lease_seconds=args.lease)
+    invoked, rejected, batches = 0, 0, 0
+    while True:
+        tasks = queue.claim(name, limit=args.batch)
+        if not tasks:
+            if queue.load()["tasks"]["bench"].get("leased", 0) == 0:
+                break
+            time.sleep(args.lease / 10)   # leased elsewhere: wait in case a lease expires
+            continue
+        batches += 1
+        if role == "crash" and batches == 3:
+            out.put((name, invoked, rejected))
+            out.close()
+            out.join_thread()             # flush the report: os._exit skips the queue's feeder thread
+            os._exit(1)                   # dies holding the batch's leases
+        if role == "stall" and batches == 3:
+            time.sleep(args.lease * 1.5)  # the leases run out while it is stuck
+        for task in tasks:
+            time.sleep(args.work_ms / 1000)
+            invoked += 1
+            if not queue.complete(task["task_id"], name, {"by": name}):
+                rejected += 1
+        queue.heartbeat(name)
+    out.put((name, invoked, rejected))
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--processes", type=int, default=4)
+    ap.add_argument("--tasks", type=int, default=2000)
+    ap.add_argument("--batch", type=int, default=8)
+    ap.add_argument("--work-ms", type=float, default=2.0)
+    ap.add_argument("--lease", type=float, default=1.0)
+    args = ap.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "jobs.sqlite3")
+    queue = JobQueue(path, lease_seconds=args.lease)
+    job_id, _ = queue.open_review("bench", "bench", "inputs", "bench")
+    queue.add_tasks(job_id, "bench", [str(i) for i in range(args.tasks)])
+
+    roles = ["crash", "stall"] + ["ok"] * max(0, args.processes - 2)
+    out = multiprocessing.Queue()
+    t0 = time.perf_counter()
+    procs = [multiprocessing.Process(target=worker, args=(path, f"w{i}-{role}", args, role, out))
+             for i, role in enumerate(roles)]
+    for p in procs:
+        p.start()
+    reports = [out.get() for _ in procs]
+    for p in procs:
+        p.join()
+    elapsed = time.perf_counter() - t0
+
+    db = queue._db()
+    done = db.execute("SELECT COUNT(*) FROM tasks WHERE stage = 'bench' AND state = 'done'").fetchone()[0]
+    by_worker = dict(db.execute("SELECT json_extract(result, '$.by'), COUNT(*) FROM tasks "
+                                "WHERE stage = 'bench' AND state = 'done' GROUP BY 1").fetchall())
+    reclaimed = db.execute("SELECT COUNT(*) FROM tasks WHERE stage = 'bench' AND attempts > 1").fetchone()[0]
+    invoked = sum(r[1] for r in reports)
+    rejected = sum(r[2] for r in reports)
+    print(f"{args.processes} processes, {args.tasks} tasks, batch {args.batch}, {args.work_ms:g} ms each, "
+          f"lease {args.lease:g}s: {elapsed:.2f}s ({done / elapsed:.0f} tasks/s)")
+    print(f"done {done}/{args.tasks} (lost {args.tasks - done}), reclaimed after lease expiry {reclaimed}, "
+          f"late completions rejected {rejected}")
+    print(f"invocations {invoked} for {done} results ({invoked - done} re-run after a lease was lost)")
+    print("results per worker: " + ", ".join(f"{name} {n}" for name, n in sorted(by_worker.items())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Speed-profile lookup benchmark: stack walk vs the compiled SpeedTable.
+
+    python bench_speed.py [--depth 8] [--payloads 2000] [--lookups 200000] [--threads 4]
+
+Pushes --depth nested profiles (the innermost carrying a multiplier for each of
+--payloads (payload, stage) pairs), then times --lookups multiplier lookups the
+way the waits do them: per-list walk with nested dict gets (what speed_profile
+used to do) vs SpeedTable's flat arrays. The table is also read from --threads
+threads while another thread keeps pushing and popping profiles, to check lookups
+stay consistent (every multiplier is one of the values the profiles can produce).
+"""
+import argparse
+import random
+import threading
+import time
+
+from simulation import AI_NODES, DOC_NODES, SpeedTable
+
+
+def stack_walk(stack, kind, index=None, payload_idx=None, stage_idx=None) -> float:
+    """The previous per-call lookup over a list of profile dicts."""
+    mult = 1.0
+    for ov in stack:
+        if kind == "dp" and index is not None:
+            mult *= ov.get("dp", {}).get(index, 1.0)
+        elif kind == "fo" and index is not None:
+            mult *= ov.get("fo", {}).get(index, 1.0)
+        elif kind == "ai":
+            if stage_idx is not None:
+                mult *= ov.get("ai", {}).get(stage_idx, 1.0)
+            if payload_idx is not None and stage_idx is not None:
+                mult *= ov.get("ai_per_payload_stage", {}).get((payload_idx, stage_idx), 1.0)
+    return mult
+
+
+def profiles(depth: int, payloads: int) -> list:
+    stack = [{"dp": {4: 1.1}, "fo": {i: 1.05 for i in range(8)}, "ai": {s: 0.95 for s in range(len(AI_NODES))},
+              "ai_per_payload_stage": {}} for _ in range(depth)]
+    stack[-1]["ai_per_payload_stage"] = {(p, p % len(AI_NODES)): 1.9 for p in range(payloads)}
+    return stack
+
+
+def timed(fn, lookups: int, payloads: int) -> float:
+    rng = random.Random(1)
+    calls = [(rng.randrange(payloads), rng.randrange(len(AI_NODES))) for _ in range(lookups)]
+    t0 = time.perf_counter()
+    for p, s in calls:
+        fn(p, s)
+    return (time.perf_counter() - t0) / lookups * 1e9
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--depth", type=int, default=8)
+    ap.add_argument("--payloads", type=int, default=2000)
+    ap.add_argument("--lookups", type=int, default=200000)
+    ap.add_argument("--threads", type=int, default=4)
+    args = ap.parse_args()
+
+    stack = profiles(args.depth, args.payloads)
+    table = SpeedTable(len(DOC_NODES), len(AI_NODES))
+    for profile in stack:
+        table.push(profile)
+
+    walk_ns = timed(lambda p, s: stack_walk(stack, "ai", payload_idx=p, stage_idx=s), args.lookups, args.payloads)
+    table_ns = timed(table.ai, args.lookups, args.payloads)
+    print(f"depth {args.depth}, {args.payloads} payload overrides: stack walk {walk_ns:7.0f} ns/lookup  "
+          f"table {table_ns:5.0f} ns/lookup  ({walk_ns / table_ns:.1f}x)")
+
+    t0 = time.perf_counter()
+    for _ in range(200):
+        table.pop(table.push({"dp": {4: 2.0}}))
+    print(f"push + pop with {args.depth} active profiles: {(time.perf_counter() - t0) / 200 * 1e6:.0f} us")
+
+    # concurrent readers while a writer pushes / pops: every read must be a whole-table value
+    base = table.dp(4)
+    allowed = {round(base, 9), round(base * 2.0, 9)}
+    stop, bad = threading.Event(), []
+
+    def writer():
+        while not stop.is_set():
+            table.pop(table.push({"dp": {4: 2.0}}))
+
+    def reader():
+        for _ in range(args.lookups // args.threads):
+            if round(table.dp(4), 9) not in allowed:
+                bad.append(1)
+
+    w = threading.Thread(target=writer)
+    w.start()
+    readers = [threading.Thread(target=reader) for _ in range(args.threads)]
+    for t in readers:
+        t.start()
+    for t in readers:
+        t.join()
+    stop.set()
+    w.join()
+    print(f"{args.threads} readers x {args.lookups // args.threads} lookups during push/pop: {len(bad)} inconsistent")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Startup benchmark: module import time and first-paint time of app.py.
+
+    python bench_startup.py [--runs N]
+
+Import time covers every local module app.py imports (read from its source), measured
+in fresh interpreters (cold module cache) started in an empty directory, so import-time
+side effects (opening SQLite, creating and scanning cache directories) are included.
+First paint is the wall time of the first headless script run (streamlit.testing
+AppTest), which includes the once-per-process init; rerun is the steady-state cost per
+interaction.
+Exits non-zero when a budget is exceeded.
+"""
+import argparse
+import ast
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Import-time budget for our own modules (streamlit itself is reported, not budgeted)
+IMPORT_BUDGET_MS      = 50.0
+FIRST_PAINT_BUDGET_MS = 1500.0
+RERUN_BUDGET_MS       = 250.0
+
+
+def app_modules() -> list:
+    """Our modules app.py imports at top level, read from its source so the list cannot go stale."""
+    with open(os.path.join(HERE, "app.py"), encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    names = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names += [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.append(node.module)
+    return [n for n in dict.fromkeys(names) if os.path.exists(os.path.join(HERE, f"{n}.py"))]
+
+
+APP_MODULES = app_modules()
+
+_IMPORT_SNIPPET = """
+import sys, time
+t0 = time.perf_counter()
+import streamlit
+t1 = time.perf_counter()
+for name in sys.argv[1:]:
+    __import__(name)
+t2 = time.perf_counter()
+print(f"{(t1 - t0) * 1000:.3f} {(t2 - t1) * 1000:.3f}")
+"""
+
+
+def measure_imports(runs: int):
+    """Each run in a fresh interpreter and an empty working directory: the process-wide singletons
+    (job queue, caches, writers) pay their import-time setup against a cold .cache, as on a new server."""
+    st_ms, app_ms = [], []
+    env = {**os.environ, "PYTHONPATH": HERE + os.pathsep + os.environ.get("PYTHONPATH", "")}
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as cwd:
+            out = subprocess.run(
+                [sys.executable, "-c", _IMPORT_SNIPPET, *APP_MODULES],
+                cwd=cwd, env=env, capture_output=True, text=True, check=True,
+            ).stdout.split()
+        st_ms.append(float(out[0]))
+        app_ms.append(float(out[1]))
+    return st_ms, app_ms
+
+
+def measure_paint(runs: int):
+    from streamlit.testing.v1 import AppTest
+
+    first, rerun = [], []
+    for _ in range(runs):
+        at = AppTest.from_file(os.path.join(HERE, "app.py"), default_timeout=30)
+        t0 = time.perf_counter()
+        at.run()
+        first.append((time.perf_counter() - t0) * 1000)
+        if at.exception:
+            raise SystemExit(f"app raised: {at.exception}")
+        t0 = time.perf_counter()
+        at.run()
+        rerun.append((time.perf_counter() - t0) * 1000)
+    return first, rerun
+
+
+def _row(label, samples, budget=None):
+    med = statistics.median(samples)
+    verdict = "" if budget is None else ("  ok" if med <= budget else f"  OVER BUDGET ({budget:.0f} ms)")
+    print(f"{label:<28} median {med:8.2f} ms   max {max(samples):8.2f} ms{verdict}")
+    return budget is None or med <= budget
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--runs", type=int, default=5)
+    args = ap.parse_args()
+
+    st_ms, app_ms = measure_imports(args.runs)
+    first, rerun = measure_paint(args.runs)
+
+    ok = True
+    _row("import streamlit", st_ms)
+    ok &= _row(f"import app modules ({len(APP_MODULES)})", app_ms, IMPORT_BUDGET_MS)
+    ok &= _row("first paint (home)", first, FIRST_PAINT_BUDGET_MS)
+    ok &= _row("rerun (home)", rerun, RERUN_BUDGET_MS)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
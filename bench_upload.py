@@ -0,0 +1,88 @@
+"""S3 Upload benchmark: one put vs parallel multipart, dedupe and resume, against a throttled stand-in.
+
+    python bench_upload.py [--mb 64] [--part-mb 5] [--mbps 20] [--latency-ms 20] [--fail-after 5]
+
+A --mb document goes to a fresh LocalObjectStore whose every request pays
+--latency-ms and whose every connection carries --mbps MB/s (one connection per
+request in flight, like S3):
+
+    put          one put_object with the whole document
+    multipart    --part-mb parts with 1, 4 and 8 workers in parallel
+    dedupe       the same document again: head_object finds its hash, nothing is sent
+    resume       a multipart upload that fails after --fail-after parts, then the retry:
+                 only the parts the store does not hold yet are sent again
+
+Reports wall time, MB/s, requests and bytes sent.
+"""
+import argparse
+import hashlib
+import os
+import tempfile
+
+from object_store import DocumentUploader, LocalObjectStore, document_key
+
+
+class FlakyStore(LocalObjectStore):
+    """Fails every upload_part after the first `fail_after` (a dropped connection mid-upload)."""
+
+    def __init__(self, *args, fail_after: int, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fail_after = fail_after
+        self.parts = 0
+
+    def upload_part(self, **kwargs):
+        with self._lock:
+            self.parts += 1
+            failing = self.parts > self.fail_after
+        if failing:
+            raise ConnectionError("connection reset")
+        return super().upload_part(**kwargs)
+
+
+def report(label, store, result):
+    mb = result["sent"] / 1e6
+    print(f"{label:<13} {result['seconds']:6.2f}s  {mb / max(result['seconds'], 1e-9):7.1f} MB/s  "
+          f"sent {mb:6.1f} MB  requests {store.stats['requests']:3d}  parts {result['parts']:3d}  "
+          f"resumed parts {result['resumed_parts']:3d}  deduped {result['deduped']}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--mb", type=float, default=64)
+    ap.add_argument("--part-mb", type=float, default=5)
+    ap.add_argument("--mbps", type=float, default=20)
+    ap.add_argument("--latency-ms", type=float, default=20)
+    ap.add_argument("--fail-after", type=int, default=5)
+    args = ap.parse_args()
+
+    data = os.urandom(int(args.mb * 1e6))
+    key = document_key(hashlib.sha256(data).hexdigest())
+    part_size = int(args.part_mb * 1e6)
+    throttle = {"latency": args.latency_ms / 1000, "mbps": args.mbps}
+    print(f"{args.mb:g} MB document, {args.part_mb:g} MB parts, {args.mbps:g} MB/s per connection, "
+          f"{args.latency_ms:g} ms per request")
+
+    store = LocalObjectStore(tempfile.mkdtemp(), **throttle)
+    report("put", store, DocumentUploader(store, threshold=len(data) + 1).upload(key, data))
+    for workers in (1, 4, 8):
+        store = LocalObjectStore(tempfile.mkdtemp(), **throttle)
+        uploader = DocumentUploader(store, threshold=part_size, part_size=part_size, workers=workers)
+        report(f"multipart x{workers}", store, uploader.upload(key, data))
+    store.stats["requests"] = 0
+    report("dedupe", store, uploader.upload(key, data))
+
+    root = tempfile.mkdtemp()
+    flaky = FlakyStore(root, fail_after=args.fail_after, **throttle)
+    try:
+        DocumentUploader(flaky, threshold=part_size, part_size=part_size, workers=4).upload(key, data)
+    except ConnectionError:
+        print(f"interrupted   after {args.fail_after} parts (upload left pending)")
+    store = LocalObjectStore(root, **throttle)
+    result = DocumentUploader(store, threshold=part_size, part_size=part_size, workers=4).upload(key, data)
+    report("resume", store, result)
+    with open(os.path.join(root, uploader.bucket, *key.split("/")), "rb") as f:
+        assert f.read() == data, "resumed object differs from the document"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Cooperative cancellation for a running review.
+
+A CancelToken is created per run and installed for the script thread with
+cancel_scope(token). Every wait in simulation.py and every retry in
+retry_policy.py checks the active token (check_cancelled) and sleeps on it
+(token.wait), so cancelling wakes the run at its next wait and raises Cancelled
+instead of sleeping on for nobody. Threads a run starts (section streams) are
+handed the token explicitly.
+
+Cancelled derives from BaseException (like asyncio.CancelledError) so the
+`except Exception` blocks that turn failures into error cards or retries do not
+swallow it. Resources the run holds (worker slots, invocation slots, streams,
+buffered document bytes) are released by callbacks registered with on_cancel.
+cancel() may come from any thread, so it only sets the flag; the run calls
+release() on its own thread as it unwinds, and what each callback freed is
+collected in `released` for the run journal.
+"""
+import threading
+from contextlib import contextmanager
+
+
+class Cancelled(BaseException):
+    """The run's token was cancelled; unwinds the run."""
+
+    def __init__(self, reason: str = "cancelled"):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class CancelToken:
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+        self.reason = None
+        self.released = {}      # resource -> amount freed by the on_cancel callbacks
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "cancelled") -> bool:
+        """Cancel once (safe from any thread); False if it was already cancelled."""
+        with self._lock:
+            if self._event.is_set():
+                return False
+            self.reason = reason
+            self._event.set()
+        return True
+
+    def on_cancel(self, fn):
+        """Register fn() -> {resource: amount} for release() to run if the run is cancelled."""
+        with self._lock:
+            self._callbacks.append(fn)
+
+    def release(self) -> dict:
+        """Run the cleanup callbacks of a cancelled run, last registered first; returns `released`."""
+        if not self._event.is_set():
+            return self.released
+        with self._lock:
+            callbacks, self._callbacks = self._callbacks, []
+        for fn in reversed(callbacks):      # last acquired, first released
+            for resource, amount in (fn() or {}).items():
+                self.released[resource] = self.released.get(resource, 0) + amount
+        return self.released
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise Cancelled(self.reason)
+
+    def wait(self, seconds: float):
+        """Sleep up to `seconds`; raises Cancelled as soon as the token is cancelled."""
+        if self._event.wait(max(0.0, seconds)):
+            raise Cancelled(self.reason)
+
+
+_ACTIVE = threading.local()
+
+
+@contextmanager
+def cancel_scope(token: CancelToken):
+    """Make `token` the one waits on this thread check while inside the context."""
+    previous = getattr(_ACTIVE, "token", None)
+    _ACTIVE.token = token
+    try:
+        yield token
+    finally:
+        _ACTIVE.token = previous
+
+
+def current_token():
+    return getattr(_ACTIVE, "token", None)
+
+
+def check_cancelled():
+    token = current_token()
+    if token is not None:
+        token.raise_if_cancelled()
@@ -0,0 +1,189 @@
+"""Adaptive concurrency limit for Credit AI Invocation.
+
+The model backend has a capacity we cannot see: push past it and latency climbs,
+then requests start failing and retries make it worse. AdaptiveLimiter finds the
+limit from what it observes instead of using a fixed fan-out:
+
+    aimd      +1 after a success while the limit is in use; x backoff on an error
+              or when latency exceeds `tolerance` x the no-load latency
+    gradient  limit follows (long-term latency / short-term latency) plus a small
+              queue allowance (sqrt(limit)); x backoff on an error
+
+Callers take a slot (try_acquire / acquire / slot()) and hand it back with
+release(token, ok=...), or abandon(token) when the caller's run was cancelled and
+there is no outcome to learn from. Latency is measured from acquisition. Slots carry a
+lease: one that is never released (a session that went away mid-run) is
+reclaimed after `lease_timeout` seconds and counted as an error.
+"""
+import itertools
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+INVOCATION_LIMIT_ALGORITHM = os.environ.get("INVOCATION_LIMIT_ALGORITHM", "aimd")
+INVOCATION_INITIAL_LIMIT   = 2
+INVOCATION_MAX_LIMIT       = 32
+INVOCATION_LEASE_TIMEOUT   = 120.0   # seconds before an unreleased slot is reclaimed
+
+
+class AdaptiveLimiter:
+    def __init__(self, *, algorithm: str = "aimd", initial: float = 4, min_limit: float = 1,
+                 max_limit: float = 64, backoff: float = 0.75, tolerance: float = 2.0,
+                 smoothing: float = 0.2, lease_timeout: float = None, clock=time.monotonic):
+        if algorithm not in ("aimd", "gradient"):
+            raise ValueError(f"unknown algorithm {algorithm!r} (expected 'aimd' or 'gradient')")
+        self.algorithm = algorithm
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.lease_timeout = lease_timeout
+        self.clock = clock
+        self._cond = threading.Condition()
+        self._limit = float(initial)
+        self._leases = {}           # token -> acquired_at
+        self._tokens = itertools.count(1)
+        self._waiters = deque()     # blocked acquire() calls, served first come first served
+        self._rtt_noload = None     # lowest latency seen (aimd)
+        self._rtt_short = None      # fast EWMA of latency (gradient)
+        self._rtt_long = None       # slow EWMA of latency (gradient)
+        self.stats = {"acquired": 0, "rejected": 0, "successes": 0, "errors": 0, "reclaimed": 0, "abandoned": 0,
+                      "backoffs": 0}
+
+    # ---- slots ---------------------------------------------------------------
+    @property
+    def limit(self) -> int:
+        return max(1, int(self._limit))
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._leases)
+
+    @property
+    def queue_depth(self) -> int:
+        """Callers blocked in acquire()."""
+        return len(self._waiters)
+
+    def try_acquire(self):
+        """A slot token, or None when the limit is reached (or others are already queued)."""
+        with self._cond:
+            self._reclaim()
+            if self._waiters or len(self._leases) >= self.limit:
+                self.stats["rejected"] += 1
+                return None
+            return self._grant()
+
+    def acquire(self, timeout: float = None):
+        """Block until a slot is free (or `timeout` passes: None is returned). Waiters are served in order."""
+        deadline = None if timeout is None else self.clock() + timeout
+        with self._cond:
+            self._reclaim()
+            if not self._waiters and len(self._leases) < self.limit:
+                return self._grant()
+            ticket = object()
+            self._waiters.append(ticket)
+            try:
+                while True:
+                    self._reclaim()
+                    if self._waiters[0] is ticket and len(self._leases) < self.limit:
+                        self._waiters.popleft()
+                        return self._grant()
+                    remaining = None if deadline is None else deadline - self.clock()
+                    if remaining is not None and remaining <= 0:
+                        self.stats["rejected"] += 1
+                        return None
+                    self._cond.wait(min(remaining, 1.0) if remaining is not None else 1.0)
+            finally:
+                if ticket in self._waiters:
+                    self._waiters.remove(ticket)
+                self._cond.notify_all()     # the next waiter may be able to go now
+
+    def release(self, token, *, ok: bool = True):
+        with self._cond:
+            acquired_at = self._leases.pop(token, None)
+            if acquired_at is None:
+                return      # already reclaimed
+            self._update(self.clock() - acquired_at, ok)
+            self._cond.notify_all()
+
+    def abandon(self, token) -> bool:
+        """Hand a slot back without an outcome (its run was cancelled): the limit is not adjusted."""
+        with self._cond:
+            if self._leases.pop(token, None) is None:
+                return False
+            self.stats["abandoned"] += 1
+            self._cond.notify_all()
+            return True
+
+    @contextmanager
+    def slot(self, timeout: float = None):
+        """with limiter.slot(): ... - an exception inside counts as an error."""
+        token = self.acquire(timeout)
+        if token is None:
+            raise TimeoutError("no invocation slot within timeout")
+        ok = False
+        try:
+            yield token
+            ok = True
+        finally:
+            self.release(token, ok=ok)
+
+    def observe(self, latency: float, *, ok: bool):
+        """Feed an outcome seen outside a slot (e.g. a call that failed before it was admitted)."""
+        with self._cond:
+            self._update(latency, ok)
+            self._cond.notify_all()
+
+    # ---- control law -----------------------------------------------------------
+    def _grant(self):
+        token = next(self._tokens)
+        self._leases[token] = self.clock()
+        self.stats["acquired"] += 1
+        return token
+
+    def _reclaim(self):
+        if self.lease_timeout is None:
+            return
+        cutoff = self.clock() - self.lease_timeout
+        for token in [t for t, at in self._leases.items() if at < cutoff]:
+            del self._leases[token]
+            self.stats["reclaimed"] += 1
+            self._update(self.lease_timeout, False)
+
+    def _update(self, latency: float, ok: bool):
+        if not ok:
+            self.stats["errors"] += 1
+            self._decrease()
+            return
+        self.stats["successes"] += 1
+        if self.algorithm == "aimd":
+            if self._rtt_noload is None or latency < self._rtt_noload:
+                self._rtt_noload = latency
+            if latency > self.tolerance * self._rtt_noload:
+                self._decrease()
+            elif (len(self._leases) + 1) * 2 >= self._limit:   # only grow a limit that is actually used
+                self._limit = min(self.max_limit, self._limit + 1)
+        else:
+            self._rtt_short = latency if self._rtt_short is None else self._rtt_short + 0.5 * (latency - self._rtt_short)
+            self._rtt_long = latency if self._rtt_long is None else self._rtt_long + 0.05 * (latency - self._rtt_long)
+            gradient = max(0.5, min(1.0, self._rtt_long / self._rtt_short)) if self._rtt_short > 0 else 1.0
+            target = self._limit * gradient + math.sqrt(self._limit)
+            self._limit = min(self.max_limit, max(self.min_limit,
+                                                  self._limit * (1 - self.smoothing) + target * self.smoothing))
+
+    def _decrease(self):
+        self.stats["backoffs"] += 1
+        self._limit = max(self.min_limit, self._limit * self.backoff)
+
+
+# Process-wide: every session's Credit AI Invocation shares the same model backend
+INVOCATION_LIMITER = AdaptiveLimiter(
+    algorithm=INVOCATION_LIMIT_ALGORITHM,
+    initial=INVOCATION_INITIAL_LIMIT,
+    max_limit=INVOCATION_MAX_LIMIT,
+    lease_timeout=INVOCATION_LEASE_TIMEOUT,
+)
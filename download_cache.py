@@ -0,0 +1,229 @@
+"""Download Documents: a size-bounded, content-addressed on-disk cache shared by every intent.
+
+Every intent payload passes Download Documents and needs its review's documents.
+DownloadCache keeps them on local disk under their sha256
+(DOWNLOAD_CACHE_DIR/<first two hex digits>/<sha256>), so a document is downloaded
+once and every later intent, worker or review needing the same bytes reads the
+local copy. Concurrent misses on one hash share a single download (SingleFlight).
+A download is streamed to a temp file, checked against its hash and renamed into
+place, so a reader never sees a partial or corrupt document.
+
+The cache holds at most DOWNLOAD_CACHE_MAX_MB; the least recently used documents
+are evicted first. The LRU order lives in memory and is rebuilt from file mtimes
+on first use, not at import (a hit touches the file), and a file another process downloaded is
+adopted instead of fetched again. Temp files of downloads still in progress in
+another process are left alone; only stale ones (DOWNLOAD_TMP_STALE_S) are removed.
+
+mapped() gives a read-only memory map of a cached document: context assembly reads
+large PDFs straight from the page cache instead of copying them into the process.
+Evicting a mapped document only unlinks the file; the map stays valid until closed.
+"""
+import hashlib
+import mmap
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from cancellation import check_cancelled
+from retry_policy import StageFailure
+from singleflight import SingleFlight
+
+DOWNLOAD_CACHE_DIR    = os.environ.get("DOWNLOAD_CACHE_DIR",
+                                       os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "downloads"))
+DOWNLOAD_CACHE_MAX_MB = float(os.environ.get("DOWNLOAD_CACHE_MAX_MB", "512"))
+DOWNLOAD_CHUNK_BYTES  = 1024 * 1024     # streamed to disk (and hashed) in chunks of this size
+DOWNLOAD_TMP_STALE_S  = 3600            # a temp file untouched this long belongs to a download that died
+
+
+class DownloadError(StageFailure):
+    """A document could not be downloaded, or its bytes did not match its hash."""
+
+
+class DownloadCache:
+    def __init__(self, root: str = DOWNLOAD_CACHE_DIR, *, max_bytes: int = int(DOWNLOAD_CACHE_MAX_MB * 1024 * 1024),
+                 chunk_bytes: int = DOWNLOAD_CHUNK_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.chunk_bytes = chunk_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # sha256 -> size, least recently used first
+        self._bytes = 0
+        self._flights = SingleFlight()
+        self.stats = {"hits": 0, "misses": 0, "adopted": 0, "evictions": 0, "errors": 0,
+                      "bytes_downloaded": 0, "bytes_served": 0}
+        self._loaded = False
+        self._load_lock = threading.Lock()
+
+    def _path(self, sha256: str) -> str:
+        return os.path.join(self.root, sha256[:2], sha256)
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._load_lock:
+            if not self._loaded:
+                self._load()
+                self._loaded = True
+
+    def _load(self):
+        """Index what an earlier process left on disk, oldest access first."""
+        found = []
+        for dirpath, _, names in os.walk(self.root):
+            for name in names:
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:       # renamed into place or evicted by another process meanwhile
+                    continue
+                if name.endswith(".tmp"):
+                    if time.time() - st.st_mtime > DOWNLOAD_TMP_STALE_S:    # a download that died
+                        try:
+                            os.remove(path)
+                        except FileNotFoundError:
+                            pass
+                    continue                    # otherwise another process is still writing it
+                found.append((st.st_mtime, name, st.st_size))
+        with self._lock:
+            for _, sha256, size in sorted(found):
+                self._entries[sha256] = size
+                self._bytes += size
+            self._evict()
+
+    # ---- public API ---------------------------------------------------------
+    def contains(self, sha256: str) -> bool:
+        self._ensure_loaded()
+        with self._lock:
+            return sha256 in self._entries
+
+    def get(self, sha256: str, fetch) -> str:
+        """Local path of the document with this hash; on a miss it is downloaded from fetch(sha256)."""
+        self._ensure_loaded()
+        with self._lock:
+            size = self._entries.get(sha256)
+            if size is not None:
+                self._entries.move_to_end(sha256)
+        if size is not None:
+            try:
+                os.utime(self._path(sha256))    # recency survives a restart
+            except FileNotFoundError:           # evicted by another process: download it again
+                self._forget(sha256)
+            else:
+                with self._lock:
+                    self.stats["hits"] += 1
+                    self.stats["bytes_served"] += size
+                return self._path(sha256)
+        return self._flights.do(sha256, self._download, sha256, fetch)
+
+    def open(self, sha256: str, fetch):
+        """The cached document opened for reading (downloaded first on a miss).
+
+        The open file pins the bytes: an eviction after this point only unlinks the name.
+        A document evicted between get() and the open is downloaded again.
+        """
+        for _ in range(2):
+            path = self.get(sha256, fetch)
+            try:
+                return open(path, "rb")
+            except FileNotFoundError:
+                self._forget(sha256)
+        raise DownloadError(f"Download Documents: {sha256[:12]} was evicted while it was being opened")
+
+    @contextmanager
+    def mapped(self, sha256: str, fetch):
+        """Read-only memory map of the document (downloaded first on a miss), unmapped on exit."""
+        with self.open(sha256, fetch) as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                view = None                     # mmap cannot map an empty file
+            else:
+                view = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            yield view if view is not None else b""
+        finally:
+            if view is not None:
+                view.close()
+
+    @property
+    def size_bytes(self) -> int:
+        self._ensure_loaded()
+        with self._lock:
+            return self._bytes
+
+    def __len__(self):
+        self._ensure_loaded()
+        with self._lock:
+            return len(self._entries)
+
+    # ---- internals ------------------------------------------------------------
+    def _download(self, sha256: str, fetch) -> str:
+        path = self._path(sha256)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:                                    # another process already downloaded it
+            self._add(sha256, os.path.getsize(path), adopted=True)
+            return path
+        except FileNotFoundError:
+            pass
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        digest, size = hashlib.sha256(), 0
+        try:
+            body = fetch(sha256)
+            try:
+                with open(tmp, "wb") as out:
+                    while True:
+                        chunk = body.read(self.chunk_bytes)
+                        if not chunk:
+                            break
+                        digest.update(chunk)
+                        out.write(chunk)
+                        size += len(chunk)
+                        check_cancelled()
+            finally:
+                getattr(body, "close", lambda: None)()
+            if digest.hexdigest() != sha256:
+                raise DownloadError(f"Download Documents: {sha256[:12]} does not match its content hash")
+            os.replace(tmp, path)
+        except BaseException as exc:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            if isinstance(exc, Exception):
+                with self._lock:
+                    self.stats["errors"] += 1
+                if not isinstance(exc, DownloadError):
+                    raise DownloadError(f"Download Documents: {sha256[:12]} failed ({exc!r})") from exc
+            raise
+        self._add(sha256, size)
+        return path
+
+    def _add(self, sha256: str, size: int, adopted: bool = False):
+        with self._lock:
+            if sha256 in self._entries:
+                self._bytes -= self._entries[sha256]
+            self._entries[sha256] = size
+            self._bytes += size
+            self.stats["adopted" if adopted else "misses"] += 1
+            self.stats["bytes_downloaded"] += 0 if adopted else size
+            self.stats["bytes_served"] += size
+            self._evict()
+
+    def _forget(self, sha256: str):
+        with self._lock:
+            size = self._entries.pop(sha256, None)
+            if size is not None:
+                self._bytes -= size
+
+    def _evict(self):
+        """Drop least recently used documents until under max_bytes (the newest one always stays)."""
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            sha256, size = self._entries.popitem(last=False)
+            self._bytes -= size
+            self.stats["evictions"] += 1
+            try:
+                os.remove(self._path(sha256))
+            except FileNotFoundError:
+                pass
+
+
+# Process-wide cache: every review, intent and worker reads documents through it
+DOWNLOAD_CACHE = DownloadCache()
@@ -0,0 +1,180 @@
+"""Fault injection for the Document Processing and Credit AI stages.
+
+A Fault targets one stage (any DOC_NODES / AI_NODES name) and injects
+
+    error     the attempt fails
+    timeout   the attempt hangs for `seconds`, then fails
+    latency   the attempt takes `seconds` longer (no failure)
+
+It fires only when all of its filters match: `probability`, a document file name,
+an intent, a time window (seconds since the run started), the n-th call on the
+stage in the run, and at most `times` injections. Failures raise StageFailure, so
+the stage's retry policy (retry_policy.py) handles them like real ones; the
+injector keeps what it injected and how long each stage took to recover.
+
+Faults come from FAULT_SPEC (env FAULTS), `;`-separated, each
+`stage:kind[=seconds][,p=0.2][,doc=name][,intent=name][,window=5-15][,nth=2][,times=1]`:
+
+    FAULTS="Credit AI Invocation:latency=2,p=0.3; Download Documents:timeout=3,window=5-15"
+
+demo_faults() adds the demo's built-in failures (an ingest failure on bulk
+uploads, an ABL invocation failure when a file named fail.pdf is uploaded).
+"""
+import os
+import random
+import threading
+import time
+
+from retry_policy import StageFailure
+from simulation import AI_NODES, BULK_FAIL_DOC_INDEX, BULK_FAIL_THRESHOLD, DOC_NODES
+
+FAULT_SPEC  = os.environ.get("FAULTS", "")
+FAULT_KINDS = ("error", "timeout", "latency")
+
+
+class InjectedTimeout(StageFailure):
+    """An injected time-out: the attempt hung, then failed."""
+
+
+class Fault:
+    def __init__(self, stage: str, kind: str = "error", *, seconds: float = 0.0, probability: float = 1.0,
+                 doc: str = None, intent: str = None, window=None, nth: int = None, times: int = None):
+        if stage not in DOC_NODES and stage not in AI_NODES:
+            raise ValueError(f"unknown stage {stage!r}")
+        if kind not in FAULT_KINDS:
+            raise ValueError(f"unknown fault kind {kind!r} (expected one of {', '.join(FAULT_KINDS)})")
+        self.stage = stage
+        self.kind = kind
+        self.seconds = seconds          # added latency / time before a time-out fails
+        self.probability = probability
+        self.doc = doc                  # document file name, or None for any
+        self.intent = intent            # intent name, or None for any
+        self.window = window            # (start, end) seconds since the run started, or None
+        self.nth = nth                  # only the n-th call on the stage (1-based), or None
+        self.times = times              # injection cap, or None for unlimited
+
+    def matches(self, stage: str, *, doc=None, intents=(), call: int = 1, elapsed: float = 0.0) -> bool:
+        return (
+            stage == self.stage
+            and (self.doc is None or doc == self.doc)
+            and (self.intent is None or self.intent in intents)
+            and (self.window is None or self.window[0] <= elapsed < self.window[1])
+            and (self.nth is None or call == self.nth)
+        )
+
+    def describe(self) -> str:
+        what = self.kind if self.kind == "error" else f"{self.kind} {self.seconds:g}s"
+        return f"{self.stage} {what}"
+
+
+def parse_faults(spec: str) -> list:
+    """Faults from a FAULTS string (see the module docstring)."""
+    faults = []
+    for item in (spec or "").split(";"):
+        item = item.strip()
+        if not item:
+            continue
+        stage, _, rest = item.partition(":")
+        head, *options = [part.strip() for part in rest.split(",")]
+        kind, _, seconds = head.partition("=")
+        kwargs = {"seconds": float(seconds or 0)}
+        for option in options:
+            key, _, value = option.partition("=")
+            if key == "p":
+                kwargs["probability"] = float(value)
+            elif key in ("doc", "intent"):
+                kwargs[key] = value
+            elif key == "window":
+                start, _, end = value.partition("-")
+                kwargs["window"] = (float(start), float(end))
+            elif key in ("nth", "times"):
+                kwargs[key] = int(value)
+            else:
+                raise ValueError(f"unknown fault option {key!r} in {item!r}")
+        faults.append(Fault(stage.strip(), kind.strip() or "error", **kwargs))
+    return faults
+
+
+def demo_faults(docs, n_ingest: int) -> list:
+    """The demo's built-in failures, each injected once per run."""
+    faults = []
+    if n_ingest > BULK_FAIL_THRESHOLD:
+        faults.append(Fault("Async DB Ingestion", nth=BULK_FAIL_DOC_INDEX + 1, times=1))
+    if any(d.get("file_name", "").lower() == "fail.pdf" for d in docs):
+        faults.append(Fault("Credit AI Invocation", intent="ABL", times=1))
+    return faults
+
+
+class FaultInjector:
+    """Decides, per stage call, whether a configured fault fires. One per run."""
+
+    def __init__(self, faults=(), *, rng=random, clock=time.perf_counter):
+        self.faults = list(faults)
+        self.rng = rng
+        self.clock = clock
+        self.started_at = clock()
+        self._lock = threading.Lock()
+        self._calls = {}        # stage -> calls so far
+        self._fired = {}        # fault index -> injections so far
+        self.injected = []      # (seconds since start, fault description)
+        self.recoveries = {}    # stage -> [seconds from failure to the retry that succeeded]
+        self.stats = {"calls": 0, "injected": 0, "error": 0, "timeout": 0, "latency": 0}
+
+    def draw(self, stage: str, *, doc: str = None, intent=None):
+        """The fault to inject into this call on `stage` (or None). Counts the call and the injection.
+
+        `intent` may be one name or several (a batched call fails for all of its intents).
+        """
+        intents = (intent,) if isinstance(intent, str) else tuple(intent or ())
+        with self._lock:
+            call = self._calls[stage] = self._calls.get(stage, 0) + 1
+            self.stats["calls"] += 1
+            elapsed = self.clock() - self.started_at
+            for i, fault in enumerate(self.faults):
+                if fault.times is not None and self._fired.get(i, 0) >= fault.times:
+                    continue
+                if not fault.matches(stage, doc=doc, intents=intents, call=call, elapsed=elapsed):
+                    continue
+                if fault.probability < 1.0 and self.rng.random() >= fault.probability:
+                    continue
+                self._fired[i] = self._fired.get(i, 0) + 1
+                self.stats["injected"] += 1
+                self.stats[fault.kind] += 1
+                self.injected.append((elapsed, fault.describe()))
+                return fault
+            return None
+
+    def fire(self, stage: str, *, doc: str = None, intent=None, sleep=time.sleep, on_inject=None):
+        """Draw and apply a fault in line: sleep for latency / time-outs, raise for failures.
+
+        on_inject(fault) is called before it takes effect. Returns the latency fault that
+        was applied (None if nothing was injected).
+        """
+        fault = self.draw(stage, doc=doc, intent=intent)
+        if fault is None:
+            return None
+        if on_inject is not None:
+            on_inject(fault)
+        if fault.kind != "error":
+            sleep(fault.seconds)
+        if fault.kind == "timeout":
+            raise InjectedTimeout(f"{stage}: timed out after {fault.seconds:g}s (injected)")
+        if fault.kind == "error":
+            raise StageFailure(f"{stage}: failed (injected)")
+        return fault
+
+    def recovered(self, stage: str, seconds: float):
+        with self._lock:
+            self.recoveries.setdefault(stage, []).append(seconds)
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {
+                **self.stats,
+                "recovery_s": {stage: list(times) for stage, times in self.recoveries.items()},
+                "injected_at": list(self.injected),
+            }
+
+
+# Faults configured for every run (FAULTS env)
+CONFIGURED_FAULTS = parse_faults(FAULT_SPEC)
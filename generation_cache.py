@@ -0,0 +1,93 @@
+"""Cross-review cache for generated sections.
+
+A section's output is fully determined by the documents it was generated from,
+the intent, the prompt template version and the model configuration, so the key
+is exactly that: (sorted document content hashes, intent, prompt version, model
+config). Re-running a review over the same uploads - or another review that
+shares the same document set - serves unchanged sections without invoking the
+model; changing a document, a prompt version or the model config changes the key.
+A section generated from no documents at all is never cached: its key would be
+the same for every review and risk party.
+
+Backed by ResultCache (memory LRU + on-disk tier, one JSON file per key).
+"""
+import base64
+import hashlib
+import json
+import os
+
+from result_cache import ResultCache
+
+# Bump a section's prompt version whenever its template changes; old entries then stop matching
+DEFAULT_PROMPT_VERSION = "1"
+PROMPT_VERSIONS = {
+    "Business Description": "1",
+    "Recent Developments":  "1",
+    "ABL":                  "1",
+}
+
+MODEL_CONFIG = {
+    "model":             os.environ.get("CREDIT_AI_MODEL", "credit-ai"),
+    "temperature":       0.0,
+    "max_output_tokens": 1024,
+}
+
+GENERATION_CACHE_TTL         = float(os.environ.get("GENERATION_CACHE_TTL", str(7 * 24 * 3600)))
+GENERATION_CACHE_MAX_ENTRIES = 1024
+GENERATION_CACHE_DIR         = os.environ.get("GENERATION_CACHE_DIR",
+                                              os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "generations"))
+
+
+def document_hash(doc: dict) -> str:
+    """sha256 of the uploaded bytes (the file name and metadata do not affect generation)."""
+    data = doc.get("data")
+    if not data and doc.get("sha256"):
+        return doc["sha256"]    # ledger record of a document ingested earlier (bytes not kept)
+    raw = base64.b64decode(data) if data else doc.get("file_name", "").encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()
+
+
+def generation_key(doc_hashes, intent: str, *, prompt_version: str = None, model_config: dict = None) -> tuple:
+    version = prompt_version if prompt_version is not None else PROMPT_VERSIONS.get(intent, DEFAULT_PROMPT_VERSION)
+    config = json.dumps(model_config if model_config is not None else MODEL_CONFIG, sort_keys=True)
+    return (tuple(sorted(doc_hashes)), intent, version, config)
+
+
+class GenerationCache:
+    def __init__(self, cache: ResultCache):
+        self.cache = cache
+
+    @staticmethod
+    def cacheable(key) -> bool:
+        """A section generated from no documents is not cached: its key would be the same for every review."""
+        return bool(key[0])
+
+    def get(self, key):
+        """Cached section result for `key`, marked as served from cache, or None."""
+        if not self.cacheable(key):
+            return None
+        value = self.cache.get(key)
+        if value is None:
+            return None
+        return {**value, "cached": True, "ttfc": None, "ttc": None}
+
+    def put(self, key, result: dict):
+        """Store a successfully generated section (errors are never cached)."""
+        if result.get("error") or not self.cacheable(key):
+            return
+        self.cache.put(key, {k: v for k, v in result.items() if k != "cached"})
+
+    def invalidate(self, key):
+        """Drop a stored section (e.g. one generated without a document that later failed to ingest)."""
+        self.cache.invalidate(key)
+
+    @property
+    def stats(self) -> dict:
+        return self.cache.stats
+
+
+GENERATION_CACHE = GenerationCache(ResultCache(
+    max_entries=GENERATION_CACHE_MAX_ENTRIES,
+    ttl=GENERATION_CACHE_TTL,
+    disk_dir=GENERATION_CACHE_DIR or None,
+))
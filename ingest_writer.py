@@ -0,0 +1,246 @@
+"""Batched writer for the Async DB Ingestion stage.
+
+Extraction splits a document into chunks; writing each chunk as its own INSERT
+(and its own transaction) makes the database the bottleneck long before
+extraction is. IngestWriter buffers rows from every extraction worker and a
+background thread writes them in large transactions with executemany:
+
+    documents  (sha256, file_name, document_type, business_date, chunks, ingested_at)
+    chunks     (sha256, seq, text)
+
+A batch is flushed when INGEST_BATCH_ROWS rows are buffered (size) or the oldest
+buffered row is INGEST_FLUSH_EVERY seconds old (time). Writes are idempotent
+(chunks are keyed on the content hash, documents on hash + file name), so a
+retried ingest rewrites the same rows and identical uploads share their chunks.
+
+Backpressure: the buffer holds at most INGEST_MAX_BUFFERED rows. write() blocks
+the extraction worker until the flusher has made room, so a slow database slows
+extraction down instead of growing memory without bound. write() returns a
+ticket; committed(ticket) tells when the document's rows are durable. A flush
+that fails (any error, including opening the database) is retried on the next one
+and surfaces to writers as IngestError; so does a flusher thread that stopped.
+
+The database is a local SQLite stand-in (INGEST_DB_PATH) for the real store.
+"""
+import base64
+import os
+import sqlite3
+import threading
+import time
+
+from cancellation import check_cancelled
+from retry_policy import StageFailure
+
+INGEST_DB_PATH        = os.environ.get("INGEST_DB_PATH",
+                                       os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "ingest.sqlite3"))
+INGEST_CHUNK_CHARS    = 2000     # characters per extracted chunk
+INGEST_BATCH_ROWS     = 500      # flush once this many rows are buffered ...
+INGEST_FLUSH_EVERY    = 0.05     # ... or the oldest buffered row is this old (seconds)
+INGEST_MAX_BUFFERED   = 5000     # rows buffered before write() blocks (backpressure)
+INGEST_COMMIT_TIMEOUT = 30.0     # seconds an ingest attempt waits for its rows to commit
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    sha256        TEXT NOT NULL,
+    file_name     TEXT NOT NULL,
+    document_type TEXT,
+    business_date TEXT,
+    chunks        INTEGER,
+    ingested_at   REAL,
+    PRIMARY KEY (sha256, file_name)
+);
+CREATE TABLE IF NOT EXISTS chunks (
+    sha256 TEXT NOT NULL,
+    seq    INTEGER NOT NULL,
+    text   TEXT NOT NULL,
+    PRIMARY KEY (sha256, seq)
+);
+"""
+
+
+class IngestError(StageFailure):
+    """A batch could not be written; the ingest attempt fails and is retried by the stage policy."""
+
+
+def extract_chunks(doc: dict, chunk_chars: int = INGEST_CHUNK_CHARS) -> list:
+    """Text chunks of an uploaded document (stand-in extraction: the decoded bytes, split evenly)."""
+    data = doc.get("data")
+    if not data:    # a ledger record (bytes dropped): extracting it would overwrite the real chunks
+        raise IngestError(f"Async DB Ingestion: {doc.get('file_name', '')!r} has no bytes to extract")
+    text = base64.b64decode(data).decode("latin-1")
+    return [text[i:i + chunk_chars] for i in range(0, len(text), chunk_chars)] or [""]
+
+
+class IngestWriter:
+    def __init__(self, path: str = INGEST_DB_PATH, *, batch_rows: int = INGEST_BATCH_ROWS,
+                 flush_every: float = INGEST_FLUSH_EVERY, max_buffered: int = INGEST_MAX_BUFFERED,
+                 clock=time.perf_counter):
+        self.path = path
+        self.batch_rows = batch_rows
+        self.flush_every = flush_every
+        self.max_buffered = max_buffered
+        self.clock = clock
+        self._cond = threading.Condition()
+        self._docs = []             # (ticket, document row) waiting for the next flush
+        self._chunks = []           # chunk rows waiting for the next flush
+        self._oldest = None         # when the oldest buffered row arrived
+        self._issued = 0            # last ticket handed out
+        self._committed = 0         # every ticket up to this one is durable
+        self._error = None          # last flush failure, until a flush succeeds
+        self._dead = None           # what stopped the flusher thread, if it stopped
+        self._thread = None
+        self.stats = {"documents": 0, "rows": 0, "batches": 0, "size_flushes": 0, "time_flushes": 0,
+                      "blocked": 0, "blocked_s": 0.0, "peak_buffered": 0, "errors": 0}
+
+    # ---- producers (extraction workers) ------------------------------------------
+    def write(self, doc: dict, sha256: str, chunks) -> int:
+        """Buffer a document and its chunks; blocks while the buffer is full. Returns its ticket."""
+        if "sha256" in doc and not doc.get("data"):     # a ledger record: its chunks are already stored
+            raise IngestError(f"Async DB Ingestion: {doc.get('file_name', '')!r} has no bytes to write")
+        rows = [(sha256, seq, text) for seq, text in enumerate(chunks)]
+        meta = (sha256, doc.get("file_name", ""), doc.get("document_type", ""), doc.get("business_date", ""),
+                len(rows))
+        with self._cond:
+            if self._dead is not None:
+                self._raise_error()
+            self._start()
+            if self._chunks and len(self._chunks) + len(rows) > self.max_buffered:
+                self.stats["blocked"] += 1
+                blocked_at = self.clock()
+                while self._chunks and len(self._chunks) + len(rows) > self.max_buffered:
+                    self._raise_error()
+                    self._cond.notify_all()          # wake the flusher: the buffer is full
+                    self._cond.wait(0.1)
+                    check_cancelled()                # an abandoned run stops waiting for room
+                self.stats["blocked_s"] += self.clock() - blocked_at
+            self._issued += 1
+            self._docs.append((self._issued, meta))
+            self._chunks.extend(rows)
+            if self._oldest is None:
+                self._oldest = self.clock()
+            self.stats["peak_buffered"] = max(self.stats["peak_buffered"], len(self._chunks))
+            self._cond.notify_all()                  # the flusher re-arms its size / time check
+            return self._issued
+
+    def committed(self, ticket: int) -> bool:
+        """True once the ticket's rows are durable; raises IngestError while flushes are failing."""
+        with self._cond:
+            if ticket <= self._committed:
+                return True
+            self._raise_error()
+            return False
+
+    def flush(self, timeout: float = None) -> bool:
+        """Wait until everything buffered so far is durable (e.g. at the end of the stage)."""
+        deadline = None if timeout is None else self.clock() + timeout
+        with self._cond:
+            target = self._issued
+            while self._committed < target:
+                self._raise_error()
+                self._cond.notify_all()
+                remaining = None if deadline is None else deadline - self.clock()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(0.1 if remaining is None else min(0.1, remaining))
+            return True
+
+    def _raise_error(self):
+        if self._dead is not None:
+            raise IngestError(f"Async DB Ingestion: the batch writer stopped ({self._dead!r})")
+        if self._error is not None:
+            raise IngestError(f"Async DB Ingestion: batch write failed ({self._error})")
+
+    # ---- flusher -----------------------------------------------------------------------
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="ingest-writer", daemon=True)
+            self._thread.start()
+
+    def _due(self) -> bool:
+        return bool(self._docs) and (len(self._chunks) >= self.batch_rows
+                                     or self.clock() - self._oldest >= self.flush_every
+                                     or self._error is not None)
+
+    def _connect(self):
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        db = sqlite3.connect(self.path, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.executescript(SCHEMA)
+        return db
+
+    def _run(self):
+        try:
+            self._flush_forever()
+        except BaseException as exc:                 # the thread is going away: fail writers, never hang them
+            with self._cond:
+                self._dead = exc
+                self._cond.notify_all()
+            raise
+
+    def _flush_forever(self):
+        db = None
+        while True:
+            with self._cond:
+                while not self._due():
+                    wait = None if self._oldest is None else self.flush_every - (self.clock() - self._oldest)
+                    self._cond.wait(wait if wait is None or wait > 0 else 0)
+                by_size = len(self._chunks) >= self.batch_rows
+                n_docs, n_rows = 0, 0                # whole documents, up to batch_rows rows (at least one)
+                for _, meta in self._docs:
+                    if n_docs and n_rows + meta[4] > self.batch_rows:
+                        break
+                    n_docs, n_rows = n_docs + 1, n_rows + meta[4]
+                docs, chunks = self._docs[:n_docs], self._chunks[:n_rows]
+                del self._docs[:n_docs], self._chunks[:n_rows]
+                if not self._docs:
+                    self._oldest = None
+                self._cond.notify_all()              # room again for blocked writers
+            try:
+                if db is None:
+                    db = self._connect()
+                self._write_batch(db, docs, chunks)
+            except BaseException as exc:
+                with self._cond:                     # keep the rows; the next flush retries them
+                    self._docs, self._chunks = docs + self._docs, chunks + self._chunks
+                    self._oldest = self.clock()
+                    self._error = exc
+                    self.stats["errors"] += 1
+                    self._cond.notify_all()
+                if not isinstance(exc, Exception):
+                    raise
+                if db is not None:                   # reconnect for the retry
+                    try:
+                        db.close()
+                    except sqlite3.Error:
+                        pass
+                    db = None
+                time.sleep(self.flush_every)
+                continue
+            with self._cond:
+                self._committed = max(self._committed, docs[-1][0])
+                self._error = None
+                self.stats["documents"] += len(docs)
+                self.stats["rows"] += len(chunks)
+                self.stats["batches"] += 1
+                self.stats["size_flushes" if by_size else "time_flushes"] += 1
+                self._cond.notify_all()
+
+    @staticmethod
+    def _write_batch(db, docs, chunks):
+        """One transaction per batch: every buffered document row and chunk row."""
+        now = time.time()
+        db.execute("BEGIN")
+        try:
+            db.executemany("INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?, ?)",
+                           [(*meta, now) for _, meta in docs])
+            db.executemany("INSERT OR REPLACE INTO chunks VALUES (?, ?, ?)", chunks)
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+
+# Process-wide writer: every session's ingest shares its batches
+INGEST_WRITER         = IngestWriter()
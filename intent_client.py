@@ -0,0 +1,215 @@
+"""Pooled HTTP client for the section API (`GET {base_url}/{risk_party_id}/{review_id}/{intent}`).
+
+One requests.Session per client keeps TCP/TLS connections alive between sections;
+the adapter caps connections per host and blocks callers instead of opening more.
+Failed attempts (connection errors, timeouts, 429/5xx) are retried with capped
+exponential backoff and full jitter, honoring Retry-After when the server sends it;
+a caller that retries on its own (the hedged "Section Fetch" stage) passes
+max_retries=0 so each of its attempts is a single request.
+Auth headers come from the shared token cache (token_cache.py); a 401 drops the
+cached token and retries once with a fresh one.
+"""
+import json
+import os
+import threading
+import time
+from urllib.parse import quote
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from retry_policy import backoff_delay   # full jitter by default
+
+INTENT_API_URL = os.environ.get("INTENT_API_URL", "")
+
+DEFAULT_TIMEOUT  = (3.05, 30.0)   # (connect, read) seconds
+POOL_MAXSIZE     = 8              # max keep-alive connections per host
+MAX_RETRIES      = 3              # retries after the first attempt
+BACKOFF_BASE     = 0.2            # seconds; attempt n waits U(0, min(cap, base * 2**n))
+BACKOFF_CAP      = 2.0
+RETRY_STATUSES   = {429, 500, 502, 503, 504}
+
+
+class IntentAPIError(RuntimeError):
+    """Raised when a section fetch fails after all retries."""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class IntentClient:
+    def __init__(
+        self,
+        base_url: str,
+        *,
+        headers_provider=None,
+        on_unauthorized=None,
+        pool_maxsize: int = POOL_MAXSIZE,
+        timeout=DEFAULT_TIMEOUT,
+        max_retries: int = MAX_RETRIES,
+        backoff_base: float = BACKOFF_BASE,
+        backoff_cap: float = BACKOFF_CAP,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.headers_provider = headers_provider   # callable -> dict (auth headers), or None
+        self.on_unauthorized = on_unauthorized     # callable, invoked once on 401 before retrying
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+
+        self.session = requests.Session()
+        # We retry ourselves (with jitter), so the adapter must not retry underneath us.
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize, pool_block=True, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def url_for(self, intent: str, risk_party_id: str, review_id: str) -> str:
+        parts = (quote(str(p), safe="") for p in (risk_party_id, review_id, intent))
+        return f"{self.base_url}/" + "/".join(parts)
+
+    def request(self, method: str, url: str, *, max_retries: int = None, **kwargs) -> requests.Response:
+        """Send with pooled connection, timeout and retry-with-jitter (max_retries overrides the client's)."""
+        max_retries = self.max_retries if max_retries is None else max_retries
+        extra_headers = kwargs.pop("headers", None) or {}
+        last_exc = None
+        reauthed = False
+        attempt = 0
+        while True:
+            # Re-read auth headers per attempt: a retry may be the first call after a token refresh
+            headers = dict(self.headers_provider() if self.headers_provider else {})
+            headers.update(extra_headers)
+            try:
+                resp = self.session.request(method, url, headers=headers, timeout=self.timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as exc:
+                last_exc, resp = exc, None
+            if resp is not None and resp.status_code == 401 and self.on_unauthorized and not reauthed:
+                reauthed = True             # token revoked/expired server-side: refresh once, no backoff
+                resp.close()
+                self.on_unauthorized()
+                continue
+            if resp is not None and resp.status_code not in RETRY_STATUSES:
+                return resp
+            if attempt == max_retries:
+                break
+            delay = backoff_delay(attempt, self.backoff_base, self.backoff_cap)
+            if resp is not None:
+                retry_after = resp.headers.get("Retry-After")
+                if retry_after and retry_after.isdigit():
+                    delay = max(delay, float(retry_after))
+                resp.close()
+            time.sleep(delay)
+            attempt += 1
+        if resp is not None:
+            raise IntentAPIError(f"{method} {url} -> HTTP {resp.status_code}", status=resp.status_code)
+        raise IntentAPIError(f"{method} {url} failed: {last_exc}") from last_exc
+
+    def get_intent_result(self, intent: str, risk_party_id: str, review_id: str) -> dict:
+        result, _ = self.get_intent_result_conditional(intent, risk_party_id, review_id)
+        return result
+
+    def get_intent_result_conditional(self, intent: str, risk_party_id: str, review_id: str, etag: str = None, *,
+                                      max_retries: int = None):
+        """Return (result, etag). With `etag`, sends If-None-Match; result is None on 304 Not Modified."""
+        headers = {"If-None-Match": etag} if etag else None
+        resp = self.request("GET", self.url_for(intent, risk_party_id, review_id), headers=headers,
+                            max_retries=max_retries)
+        if resp.status_code == 304 and etag:
+            return None, resp.headers.get("ETag", etag)
+        if resp.status_code != 200:
+            raise IntentAPIError(f"{intent}: HTTP {resp.status_code}", status=resp.status_code)
+        return resp.json(), resp.headers.get("ETag")
+
+    def stream_intent_result(self, intent: str, risk_party_id: str, review_id: str):
+        """Yield text chunks from GET {url}/stream as the server produces them."""
+        url = self.url_for(intent, risk_party_id, review_id) + "/stream"
+        resp = self.request("GET", url, stream=True)
+        try:
+            if resp.status_code != 200:
+                raise IntentAPIError(f"{intent}: HTTP {resp.status_code}", status=resp.status_code)
+            resp.encoding = resp.encoding or "utf-8"
+            yield from resp.iter_content(chunk_size=None, decode_unicode=True)
+        finally:
+            resp.close()
+
+    def get_intent_results_batch(self, keys) -> list:
+        """POST {base_url}/batch for many (risk_party_id, review_id, intent) keys.
+
+        Returns [(result, etag)] in request order; a per-item failure comes back as
+        ({"intent": ..., "error": ...}, None) rather than failing the whole batch.
+        """
+        items = [{"risk_party_id": rp, "review_id": rid, "intent": intent} for rp, rid, intent in keys]
+        resp = self.request("POST", f"{self.base_url}/batch", json={"items": items})
+        if resp.status_code != 200:
+            raise IntentAPIError(f"batch of {len(items)}: HTTP {resp.status_code}", status=resp.status_code)
+        out = []
+        for item, res in zip(items, resp.json()["results"]):
+            if res.get("status") == 200:
+                out.append((res["body"], res.get("etag")))
+            else:
+                out.append(({"intent": item["intent"], "error": f"HTTP {res.get('status')}"}, None))
+        return out
+
+    def stream_intent_results_batch(self, keys):
+        """POST {base_url}/batch/stream: yield (index, event) as the sections of `keys` are generated together.
+
+        event is {"text": chunk}, {"done": True} after the item's last chunk, or {"error": ...}.
+        """
+        items = [{"risk_party_id": rp, "review_id": rid, "intent": intent} for rp, rid, intent in keys]
+        resp = self.request("POST", f"{self.base_url}/batch/stream", json={"items": items}, stream=True)
+        try:
+            if resp.status_code != 200:
+                raise IntentAPIError(f"batch of {len(items)}: HTTP {resp.status_code}", status=resp.status_code)
+            for line in resp.iter_lines():
+                if line:
+                    event = json.loads(line)
+                    yield event.pop("index"), event
+        finally:
+            resp.close()
+
+    def close(self):
+        self.session.close()
+
+
+_default_client = None
+_default_lock = threading.Lock()
+
+
+def default_client() -> IntentClient:
+    """Process-wide client for INTENT_API_URL (shared connection pool)."""
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            if not INTENT_API_URL:
+                raise IntentAPIError("INTENT_API_URL is not set")
+            from token_cache import default_token_cache, get_authenticated_headers
+            tokens = default_token_cache()
+            _default_client = IntentClient(
+                INTENT_API_URL,
+                headers_provider=get_authenticated_headers,
+                on_unauthorized=tokens.invalidate if tokens is not None else None,
+            )
+        return _default_client
+
+
+def get_intent_result(intent: str, risk_party_id: str, review_id: str) -> dict:
+    return default_client().get_intent_result(intent, risk_party_id, review_id)
+
+
+def get_intent_result_conditional(intent: str, risk_party_id: str, review_id: str, etag: str = None, *,
+                                  max_retries: int = None):
+    return default_client().get_intent_result_conditional(intent, risk_party_id, review_id, etag,
+                                                          max_retries=max_retries)
+
+
+def get_intent_results_batch(keys) -> list:
+    return default_client().get_intent_results_batch(keys)
+
+
+def stream_intent_result(intent: str, risk_party_id: str, review_id: str):
+    return default_client().stream_intent_result(intent, risk_party_id, review_id)
+
+
+def stream_intent_results_batch(keys):
+    return default_client().stream_intent_results_batch(keys)
@@ -0,0 +1,373 @@
+import csv
+import io
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from result_cache import ResultCache
+from retry_policy import run_with_retry
+from singleflight import SingleFlight
+
+
+def mock_fetch_intent_result(intent: str) -> dict:
+    """Mock of your API result. Replace with the real call later."""
+    long_texts = {
+        "Business Description": (
+            "The company operates a diversified platform with recurring revenue streams "
+            "across software subscriptions and transaction processing. Go-to-market is hybrid "
+            "(direct + partners) with concentration in the mid-market. Unit economics show "
+            "steady CAC payback under 12 months with gross retention >90% and NRR ~112%. "
+            "Key dependencies include cloud infra providers and a two-sided network of ISVs and channel partners. "
+            "Regulatory exposure is limited but expanding with payments attach. "
+            "Growth is expected to normalize as larger cohorts mature, with incremental margin from automation."
+        ),
+        "Recent Developments": (
+            "Management closed two tuck-ins in Q2 focused on workflow automation; integrations are on-track. "
+            "Pricing was re-aligned for tiered value, with minimal logo churn. "
+            "A targeted restructuring reduced OpEx by ~6% while preserving roadmap capacity. "
+            "Debt refi extended maturities to 2029 at a modest spread increase; covenant headroom remains ample. "
+            "Customer health mixed: usage stabilizing in SMB while enterprise pilots expand."
+        ),
+        "ABL": (
+            "Borrowing base primarily AR (Net 85) with immaterial inventory. "
+            "Advance rates align with policy (85% AR, 20% inventory cap). "
+            "Dilution/offsets trend at 2.1%–2.6%; top-10 obligors <30% of AR. "
+            "Covenants include springing FCCR and minimum liquidity. "
+            "Field exam flagged minor documentation gaps; remediation underway. "
+            "No in-eligibles from cross-aging; concentrations monitored monthly."
+        ),
+    }
+    return {
+        "intent": intent,
+        "llm_response": long_texts.get(intent, "Generated text... " * 20),
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+# Real API when set (point it at stand_in_server.py to run offline); mock otherwise
+INTENT_API_URL = os.environ.get("INTENT_API_URL", "")
+
+# Cap on section requests in flight per review fetch
+MAX_CONCURRENT_FETCHES = 6
+
+
+# Process-wide section cache keyed by (risk_party_id, review_id, intent), shared by all sessions.
+# Expired entries are revalidated with If-None-Match rather than refetched.
+SECTION_CACHE_TTL         = float(os.environ.get("SECTION_CACHE_TTL", "300"))
+SECTION_CACHE_MAX_ENTRIES = 512
+SECTION_CACHE = ResultCache(
+    max_entries=SECTION_CACHE_MAX_ENTRIES,
+    ttl=SECTION_CACHE_TTL,
+    disk_dir=os.environ.get("SECTION_CACHE_DIR") or None,   # optional on-disk tier
+)
+
+
+def _fetch_from_source(intent: str, risk_party_id: str, review_id: str, etag: str = None):
+    """(result, etag) from the real API (result None on 304) or the mock.
+
+    One request per call: the "Section Fetch" policy retries and hedges, so a client-side
+    retry under it would multiply the calls a hedged fetch makes.
+    """
+    if INTENT_API_URL:
+        from intent_client import get_intent_result_conditional   # lazy: keeps requests off the import path
+        return get_intent_result_conditional(intent, risk_party_id, review_id, etag, max_retries=0)
+    return mock_fetch_intent_result(intent), None
+
+
+# Identical (risk_party_id, review_id, intent) fetches from concurrent sessions share one call
+INTENT_FLIGHTS = SingleFlight()
+
+
+def _load_section(key, cache):
+    """Flight body: re-check the cache (a flight may have just landed), then revalidate or fetch.
+
+    The fetch runs under the "Section Fetch" retry policy: each attempt is a single request,
+    a slow one is hedged, a failed one is retried with backoff, and a backend that keeps
+    failing trips the breaker, so later sections fail fast.
+    """
+    risk_party_id, review_id, intent = key
+    entry = cache.lookup(key) if cache is not None else None
+    if entry is not None and cache.is_fresh(entry):
+        return entry["value"]
+    known_etag = entry["etag"] if entry else None
+    result, etag = run_with_retry(
+        "Section Fetch", lambda _attempt: _fetch_from_source(intent, risk_party_id, review_id, known_etag))
+    if result is None:                  # 304 Not Modified
+        return cache.refresh(key, entry)["value"]
+    if cache is not None:
+        cache.put(key, result, etag)
+    return result
+
+
+def fetch_intent_result(intent: str, risk_party_id: str, review_id: str, *, cache=SECTION_CACHE) -> dict:
+    """One section: fresh cache hit, or a single-flight revalidate/fetch shared by concurrent callers."""
+    key = (risk_party_id, review_id, intent)
+    if cache is not None:
+        value = cache.get(key)
+        if value is not None:
+            return value
+    return INTENT_FLIGHTS.do(key, _load_section, key, cache)
+
+
+def invalidate_sections(intents, risk_party_id: str, review_id: str, *, cache=SECTION_CACHE):
+    """Drop cached sections a new run of the review regenerated, so the next fetch reads the fresh ones."""
+    for intent in intents:
+        cache.invalidate((risk_party_id, review_id, intent))
+
+
+def iter_intent_results(intents, risk_party_id: str, review_id: str, *,
+                        fetch=fetch_intent_result, max_workers: int = MAX_CONCURRENT_FETCHES):
+    """Fetch all sections concurrently; yield (intent, result) in completion order.
+
+    A failed section yields {"intent": ..., "error": "..."} instead of aborting the rest.
+    """
+    intents = list(intents)
+    if not intents:
+        return
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(intents)))) as pool:
+        futures = {pool.submit(fetch, name, risk_party_id, review_id): name for name in intents}
+        for fut in as_completed(futures):
+            name = futures[fut]
+            try:
+                yield name, fut.result()
+            except Exception as exc:
+                yield name, {"intent": name, "error": str(exc)}
+
+
+
+# ---- Streaming: sections delivered as text chunks ----
+STREAM_FIRST_CHUNK_DELAY = 0.35   # mock: model "think time" before the first chunk (s)
+STREAM_CHUNK_DELAY       = 0.05   # mock: gap between chunks (s)
+STREAM_CHUNK_WORDS       = 3      # mock: words per chunk
+
+
+def _word_chunks(text: str):
+    """A section's text a few words at a time."""
+    words = text.split(" ")
+    for i in range(0, len(words), STREAM_CHUNK_WORDS):
+        yield " ".join(words[i:i + STREAM_CHUNK_WORDS]) + (" " if i + STREAM_CHUNK_WORDS < len(words) else "")
+
+
+def mock_stream_intent_result(intent: str):
+    """Mock streaming API: yields the mock section text a few words at a time."""
+    chunks = _word_chunks(mock_fetch_intent_result(intent)["llm_response"])
+    time.sleep(STREAM_FIRST_CHUNK_DELAY)
+    for i, chunk in enumerate(chunks):
+        if i:
+            time.sleep(STREAM_CHUNK_DELAY)
+        yield chunk
+
+
+def stream_intent_result(intent: str, risk_party_id: str, review_id: str):
+    """Iterator of text chunks for one section (real streaming endpoint or the mock)."""
+    if INTENT_API_URL:
+        from intent_client import stream_intent_result as stream_from_api   # lazy
+        return stream_from_api(intent, risk_party_id, review_id)
+    return mock_stream_intent_result(intent)
+
+
+class SectionStream:
+    """Drains a chunk iterator on a background thread so the UI thread can poll and repaint.
+
+    Records time-to-first-chunk (ttfc) and time-to-complete (ttc), both measured from
+    construction, i.e. from the moment the section was requested. Stops at the next
+    chunk once `cancel` (the run's CancelToken) is cancelled.
+    """
+
+    def __init__(self, intent: str, chunks, cancel=None):
+        self.intent = intent
+        self.cancel = cancel            # CancelToken of the run; the stream stops when it is cancelled
+        self.started_at = time.perf_counter()
+        self.first_chunk_at = None
+        self.completed_at = None
+        self.error = None
+        self._parts = []
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._drain, args=(chunks,), name=f"stream-{intent}", daemon=True)
+        self._thread.start()
+
+    def _drain(self, chunks):
+        try:
+            for chunk in chunks:
+                if self.cancel is not None and self.cancel.cancelled:
+                    self.error = "cancelled"
+                    getattr(chunks, "close", lambda: None)()   # closes the HTTP response for the real API
+                    break
+                if not chunk:
+                    continue
+                with self._lock:
+                    if self.first_chunk_at is None:
+                        self.first_chunk_at = time.perf_counter()
+                    self._parts.append(chunk)
+        except Exception as exc:
+            self.error = str(exc)
+        finally:
+            self.completed_at = time.perf_counter()
+
+    @property
+    def text(self) -> str:
+        with self._lock:
+            return "".join(self._parts)
+
+    @property
+    def done(self) -> bool:
+        return self.completed_at is not None
+
+    @property
+    def ttfc(self):
+        return None if self.first_chunk_at is None else self.first_chunk_at - self.started_at
+
+    @property
+    def ttc(self):
+        return None if self.completed_at is None else self.completed_at - self.started_at
+
+    def result(self) -> dict:
+        """Final section in the usual result shape, plus streaming timings."""
+        res = {
+            "intent": self.intent,
+            "llm_response": self.text,
+            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "ttfc": self.ttfc,
+            "ttc": self.ttc,
+        }
+        if self.error:
+            res["error"] = self.error
+        return res
+
+# ---- Bulk mode: many (risk_party_id, review_id) keys through one batched pipeline ----
+BULK_BATCH_SIZE        = 24   # sections per batch request
+MAX_CONCURRENT_BATCHES = 4    # batch requests in flight at once
+
+
+def parse_review_keys(text: str) -> list:
+    """Parse review keys from CSV or free text, one `risk_party_id,review_id` per line.
+
+    Also accepts `/`, `;`, tab or whitespace separators and an optional header row.
+    Returns de-duplicated (risk_party_id, review_id) tuples in input order.
+    """
+    keys = []
+    for row in csv.reader(io.StringIO((text or "").replace(";", ",").replace("\t", ","))):
+        fields = [f.strip() for f in row if f.strip()]
+        if len(fields) == 1:
+            fields = fields[0].replace("/", " ").split()
+        if len(fields) < 2:
+            continue
+        rp, rid = fields[0], fields[1]
+        if rp.lower().replace(" ", "_") == "risk_party_id":
+            continue
+        keys.append((rp, rid))
+    return list(dict.fromkeys(keys))
+
+
+def _fetch_batch_from_source(keys) -> list:
+    """[(result, etag)] for a batch of (risk_party_id, review_id, intent) keys, in order."""
+    if INTENT_API_URL:
+        from intent_client import get_intent_results_batch   # lazy: keeps requests off the import path
+        return get_intent_results_batch(keys)
+    return [(mock_fetch_intent_result(intent), None) for _, _, intent in keys]
+
+
+def iter_bulk_results(review_keys, intents, *, cache=SECTION_CACHE, fetch_batch=_fetch_batch_from_source,
+                      batch_size: int = BULK_BATCH_SIZE, max_workers: int = MAX_CONCURRENT_BATCHES):
+    """Yield (risk_party_id, review_id, intent, result) for every review x intent.
+
+    Fresh cache hits are yielded first; the remaining sections go out in batches of
+    `batch_size`, at most `max_workers` batches in flight, yielded as each batch lands.
+    A failed batch yields {"intent": ..., "error": ...} results for its sections.
+    """
+    pending = []
+    for rp, rid in review_keys:
+        for intent in intents:
+            key = (rp, rid, intent)
+            value = cache.get(key) if cache is not None else None
+            if value is not None:
+                yield rp, rid, intent, value
+            else:
+                pending.append(key)
+    if not pending:
+        return
+    batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(batches)))) as pool:
+        futures = {pool.submit(fetch_batch, batch): batch for batch in batches}
+        for fut in as_completed(futures):
+            batch = futures[fut]
+            try:
+                pairs = fut.result()
+            except Exception as exc:
+                pairs = [({"intent": key[2], "error": str(exc)}, None) for key in batch]
+            for key, (result, etag) in zip(batch, pairs):
+                if cache is not None and not result.get("error"):
+                    cache.put(key, result, etag)
+                yield (*key, result)
+
+
+# ---- Batched invocation: a review's batched intents (see scheduling.BatchWindow) share one call ----
+_BATCH_INVOKE_POOL = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_BATCHES, thread_name_prefix="batch-invoke")
+
+
+def mock_stream_batch(intents):
+    """Mock streaming batch: one think time, then every section's chunks interleaved as (index, event)."""
+    pending = {i: _word_chunks(mock_fetch_intent_result(intent)["llm_response"]) for i, intent in enumerate(intents)}
+    time.sleep(STREAM_FIRST_CHUNK_DELAY)
+    first = True
+    while pending:
+        if not first:
+            time.sleep(STREAM_CHUNK_DELAY)
+        first = False
+        for i in list(pending):
+            chunk = next(pending[i], None)
+            if chunk is None:
+                del pending[i]
+                yield i, {"done": True}
+            else:
+                yield i, {"text": chunk}
+
+
+def stream_batch_results(intents, risk_party_id: str, review_id: str) -> dict:
+    """One streaming backend call (POST /batch/stream, or the mock) for a batch of one review's sections.
+
+    Returns {intent: chunk iterator} for SectionStream. A single pump reads the shared
+    response and hands each chunk to its section as it arrives, so every section keeps
+    its own time-to-first-chunk; a failed call, or a failed item, becomes that
+    section's stream error.
+    """
+    intents = list(intents)
+    queues = [queue.Queue() for _ in intents]
+
+    def events():
+        if INTENT_API_URL:
+            from intent_client import stream_intent_results_batch   # lazy: keeps requests off the import path
+            return stream_intent_results_batch([(risk_party_id, review_id, intent) for intent in intents])
+        return mock_stream_batch(intents)
+
+    def pump():
+        open_items = set(range(len(intents)))
+        try:
+            for i, event in events():
+                if "text" in event:
+                    queues[i].put(("text", event["text"]))
+                    continue
+                open_items.discard(i)
+                queues[i].put(("error", event["error"]) if "error" in event else ("done", None))
+        except Exception as exc:
+            for i in open_items:
+                queues[i].put(("error", str(exc)))
+            return
+        for i in open_items:    # the response ended without closing these items
+            queues[i].put(("error", "batch stream ended early"))
+
+    _BATCH_INVOKE_POOL.submit(pump)
+
+    def member(i):
+        while True:
+            kind, value = queues[i].get()
+            if kind == "text":
+                yield value
+            elif kind == "error":
+                raise RuntimeError(value)
+            else:
+                return
+
+    return {intent: member(i) for i, intent in enumerate(intents)}
@@ -0,0 +1,304 @@
+"""Durable job queue for review processing (SQLite, WAL mode).
+
+A review run is a job; the per-stage work inside it (one Async DB Ingestion task
+per document, one Credit AI Invocation task per section) are tasks. Both live in
+one SQLite file, so every server process on the host sees the same queue and a
+restart loses nothing:
+
+    jobs   (risk_party_id, review_id, inputs) -> running | done | failed | cancelled
+    tasks  (job_id, stage, key)               -> pending | leased | done | failed
+
+Work is claimed with a lease: the claimer's worker id and an expiry time, renewed
+while it makes progress (heartbeat). A lease that runs out - the process died or
+hung - makes the job / task claimable again, and the next claim expires it first.
+Claims run in BEGIN IMMEDIATE transactions, so two processes never hold the same
+task; complete() only accepts the current lease holder, so a worker that lost its
+lease cannot record a second result. A job for the same review and the same
+document set (`inputs`, a hash of the document hashes) is resumed rather than
+started again: its done tasks keep their results and are not re-run.
+
+The file (JOB_QUEUE_PATH, next to this module unless set) and its schema are
+created on first use, not at import.
+
+WAL lets readers (load(), results()) run alongside the single writer; writes are
+short, and busy_timeout makes a contended writer wait instead of failing.
+"""
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+JOB_QUEUE_PATH    = os.environ.get("JOB_QUEUE_PATH",
+                                   os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "jobs.sqlite3"))
+JOB_LEASE_SECONDS = float(os.environ.get("JOB_LEASE_SECONDS", "30"))
+JOB_BUSY_TIMEOUT  = 5.0    # seconds a writer waits for the database lock
+JOB_CLAIM_POLL    = 0.5    # seconds between claims of a task another live worker holds
+WORKER_ID         = f"{socket.gethostname()}:{os.getpid()}"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id        INTEGER PRIMARY KEY,
+    risk_party_id TEXT NOT NULL,
+    review_id     TEXT NOT NULL,
+    inputs        TEXT NOT NULL,
+    state         TEXT NOT NULL,
+    owner         TEXT,
+    lease_expires REAL,
+    reason        TEXT,
+    created_at    REAL NOT NULL,
+    updated_at    REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_review ON jobs (risk_party_id, review_id, inputs);
+CREATE TABLE IF NOT EXISTS tasks (
+    task_id       INTEGER PRIMARY KEY,
+    job_id        INTEGER NOT NULL REFERENCES jobs (job_id),
+    stage         TEXT NOT NULL,
+    key           TEXT NOT NULL,
+    state         TEXT NOT NULL DEFAULT 'pending',
+    owner         TEXT,
+    lease_expires REAL,
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    result        TEXT,
+    error         TEXT,
+    updated_at    REAL NOT NULL,
+    UNIQUE (job_id, stage, key)
+);
+CREATE INDEX IF NOT EXISTS tasks_ready ON tasks (state, lease_expires);
+"""
+
+
+def inputs_hash(doc_hashes) -> str:
+    """Identity of a document set (order-independent): a job is resumed only over the same inputs."""
+    return hashlib.sha256("\n".join(sorted(doc_hashes)).encode("utf-8")).hexdigest()
+
+
+class ReviewLeased(RuntimeError):
+    """The review is being processed by another live worker."""
+
+    def __init__(self, owner: str):
+        super().__init__(f"review is being processed by {owner}")
+        self.owner = owner
+
+
+class JobQueue:
+    def __init__(self, path: str = JOB_QUEUE_PATH, *, lease_seconds: float = JOB_LEASE_SECONDS, clock=time.time):
+        self.path = os.path.abspath(path)    # every thread (and a chdir'd process) opens the same file
+        self.lease_seconds = lease_seconds
+        self.clock = clock      # wall clock: leases are compared across processes
+        self._local = threading.local()
+        self._renewed = {}      # worker -> last heartbeat that renewed its leases
+        self._lock = threading.Lock()
+        self.stats = {"claimed": 0, "completed": 0, "failed": 0, "expired": 0, "resumed": 0, "renewals": 0}
+        self._created = False   # the file and schema are created on first use, not at import
+
+    def _db(self) -> sqlite3.Connection:
+        """This thread's connection (sqlite3 connections are not shared across threads)."""
+        db = getattr(self._local, "db", None)
+        if db is None:
+            self._create()
+            db = sqlite3.connect(self.path, timeout=JOB_BUSY_TIMEOUT, isolation_level=None)
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")   # durable across process crashes; WAL fsyncs at checkpoints
+            self._local.db = db
+        return db
+
+    def _create(self):
+        with self._lock:
+            if self._created:
+                return
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=JOB_BUSY_TIMEOUT, isolation_level=None)
+            try:
+                db.executescript(SCHEMA)
+            finally:
+                db.close()
+            self._created = True
+
+    def _write(self, fn):
+        """Run fn(db) in one BEGIN IMMEDIATE transaction (takes the write lock up front)."""
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            out = fn(db)
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+        return out
+
+    def _count(self, key: str, n: int = 1):
+        with self._lock:
+            self.stats[key] += n
+
+    # ---- jobs ----------------------------------------------------------------
+    def open_review(self, risk_party_id: str, review_id: str, inputs: str, worker: str) -> tuple:
+        """(job_id, resumed) for processing the review over the document set `inputs`.
+
+        Resumes the newest unfinished job with the same inputs (its done tasks stay done);
+        raises ReviewLeased if a live worker other than `worker` holds it.
+        """
+        def txn(db):
+            now = self.clock()
+            row = db.execute(
+                "SELECT job_id, owner, lease_expires FROM jobs WHERE risk_party_id = ? AND review_id = ? "
+                "AND inputs = ? AND state != 'done' ORDER BY job_id DESC LIMIT 1",
+                (risk_party_id, review_id, inputs),
+            ).fetchone()
+            if row is not None and row["owner"] not in (None, worker) and (row["lease_expires"] or 0) > now:
+                raise ReviewLeased(row["owner"])
+            if row is not None:
+                db.execute("UPDATE jobs SET state = 'running', owner = ?, lease_expires = ?, reason = NULL, "
+                           "updated_at = ? WHERE job_id = ?", (worker, now + self.lease_seconds, now, row["job_id"]))
+                # the previous holder's leased tasks go back to pending; done tasks keep their results
+                db.execute("UPDATE tasks SET state = 'pending', owner = NULL, lease_expires = NULL, updated_at = ? "
+                           "WHERE job_id = ? AND state IN ('leased', 'failed')", (now, row["job_id"]))
+                return row["job_id"], True
+            cur = db.execute(
+                "INSERT INTO jobs (risk_party_id, review_id, inputs, state, owner, lease_expires, created_at, "
+                "updated_at) VALUES (?, ?, ?, 'running', ?, ?, ?, ?)",
+                (risk_party_id, review_id, inputs, worker, now + self.lease_seconds, now, now),
+            )
+            return cur.lastrowid, False
+
+        job_id, resumed = self._write(txn)
+        if resumed:
+            self._count("resumed")
+        return job_id, resumed
+
+    def finish_review(self, job_id: int, worker: str, state: str, reason: str = None) -> bool:
+        """Close the job (done / failed / cancelled) and hand back the tasks `worker` still leases."""
+        def txn(db):
+            now = self.clock()
+            db.execute("UPDATE tasks SET state = 'pending', owner = NULL, lease_expires = NULL, updated_at = ? "
+                       "WHERE job_id = ? AND owner = ? AND state = 'leased'", (now, job_id, worker))
+            cur = db.execute("UPDATE jobs SET state = ?, owner = NULL, lease_expires = NULL, reason = ?, "
+                             "updated_at = ? WHERE job_id = ? AND owner = ?", (state, reason, now, job_id, worker))
+            return cur.rowcount == 1
+
+        return self._write(txn)
+
+    # ---- tasks ---------------------------------------------------------------
+    def add_tasks(self, job_id: int, stage: str, keys) -> int:
+        """Create the stage's tasks for `keys`; existing ones (e.g. of a resumed job) are left as they are."""
+        now = self.clock()
+        rows = [(job_id, stage, key, now) for key in keys]
+        return self._write(lambda db: db.executemany(
+            "INSERT OR IGNORE INTO tasks (job_id, stage, key, updated_at) VALUES (?, ?, ?, ?)", rows).rowcount)
+
+    def claim(self, worker: str, *, job_id: int = None, stage: str = None, key: str = None, limit: int = 1) -> list:
+        """Lease up to `limit` pending tasks (oldest first), optionally only of one job / stage / key."""
+        where, args = ["state = 'pending'"], []
+        for column, value in (("job_id", job_id), ("stage", stage), ("key", key)):
+            if value is not None:
+                where.append(f"{column} = ?")
+                args.append(value)
+
+        def txn(db):
+            now = self.clock()
+            expired = self._expire(db, now)
+            rows = db.execute(f"SELECT task_id, job_id, stage, key, attempts FROM tasks WHERE {' AND '.join(where)} "
+                              "ORDER BY task_id LIMIT ?", (*args, limit)).fetchall()
+            db.executemany("UPDATE tasks SET state = 'leased', owner = ?, lease_expires = ?, attempts = attempts + 1, "
+                           "updated_at = ? WHERE task_id = ?",
+                           [(worker, now + self.lease_seconds, now, r["task_id"]) for r in rows])
+            return expired, [{**dict(r), "attempts": r["attempts"] + 1} for r in rows]
+
+        expired, tasks = self._write(txn)
+        self._count("expired", expired)
+        self._count("claimed", len(tasks))
+        return tasks
+
+    def complete(self, task_id: int, worker: str, result=None) -> bool:
+        """Record the task's result; False if `worker` no longer holds its lease (someone else owns it now)."""
+        ok = self._settle(task_id, worker, "done", result=json.dumps(result, default=str))
+        if ok:
+            self._count("completed")
+        return ok
+
+    def fail(self, task_id: int, worker: str, error: str) -> bool:
+        """Mark the task failed (it is retried when the job is resumed)."""
+        ok = self._settle(task_id, worker, "failed", error=error)
+        if ok:
+            self._count("failed")
+        return ok
+
+    def _settle(self, task_id: int, worker: str, state: str, *, result: str = None, error: str = None) -> bool:
+        return self._write(lambda db: db.execute(
+            "UPDATE tasks SET state = ?, result = ?, error = ?, owner = NULL, lease_expires = NULL, updated_at = ? "
+            "WHERE task_id = ? AND owner = ? AND state = 'leased'",
+            (state, result, error, self.clock(), task_id, worker)).rowcount == 1)
+
+    def task(self, job_id: int, stage: str, key: str):
+        """The task's row (state, owner, lease_expires, result), or None if it was never added."""
+        row = self._db().execute("SELECT task_id, state, owner, lease_expires, result FROM tasks "
+                                 "WHERE job_id = ? AND stage = ? AND key = ?", (job_id, stage, key)).fetchone()
+        if row is None:
+            return None
+        return {**dict(row), "result": json.loads(row["result"]) if row["result"] is not None else None}
+
+    def results(self, job_id: int, stage: str) -> dict:
+        """key -> result of the stage's done tasks."""
+        rows = self._db().execute("SELECT key, result FROM tasks WHERE job_id = ? AND stage = ? AND state = 'done'",
+                                  (job_id, stage)).fetchall()
+        return {r["key"]: json.loads(r["result"]) for r in rows}
+
+    # ---- leases ----------------------------------------------------------------
+    def renew(self, worker: str) -> int:
+        """Extend every lease `worker` holds (its jobs and tasks); returns how many were extended."""
+        def txn(db):
+            now = self.clock()
+            expires = now + self.lease_seconds
+            n = db.execute("UPDATE jobs SET lease_expires = ?, updated_at = ? WHERE owner = ? AND state = 'running'",
+                           (expires, now, worker)).rowcount
+            return n + db.execute("UPDATE tasks SET lease_expires = ? WHERE owner = ? AND state = 'leased'",
+                                  (expires, worker)).rowcount
+
+        n = self._write(txn)
+        self._count("renewals")
+        return n
+
+    def heartbeat(self, worker: str) -> bool:
+        """Renew `worker`'s leases if a third of the lease has passed since the last renewal; cheap to call often."""
+        now = self.clock()
+        with self._lock:
+            if now - self._renewed.get(worker, 0.0) < self.lease_seconds / 3:
+                return False
+            self._renewed[worker] = now
+        self.renew(worker)
+        return True
+
+    def forget(self, worker: str):
+        with self._lock:
+            self._renewed.pop(worker, None)
+
+    def expire_leases(self) -> int:
+        """Return tasks whose lease ran out to pending; returns how many."""
+        n = self._write(lambda db: self._expire(db, self.clock()))
+        self._count("expired", n)
+        return n
+
+    @staticmethod
+    def _expire(db, now: float) -> int:
+        return db.execute("UPDATE tasks SET state = 'pending', owner = NULL, lease_expires = NULL, updated_at = ? "
+                          "WHERE state = 'leased' AND lease_expires <= ?", (now, now)).rowcount
+
+    # ---- global view -----------------------------------------------------------
+    def load(self) -> dict:
+        """Queue-wide load: jobs by state, tasks by stage and state, and the workers holding live leases."""
+        db, now = self._db(), self.clock()
+        jobs = dict(db.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+        tasks = {}
+        for stage, state, n in db.execute("SELECT stage, state, COUNT(*) FROM tasks GROUP BY stage, state"):
+            tasks.setdefault(stage, {})[state] = n
+        workers = {r[0] for r in db.execute(
+            "SELECT owner FROM jobs WHERE state = 'running' AND lease_expires > ? "
+            "UNION SELECT owner FROM tasks WHERE state = 'leased' AND lease_expires > ?", (now, now))}
+        return {"jobs": jobs, "tasks": tasks, "workers": len(workers)}
+
+
+# Process-wide queue over the shared database file (opened on first use)
+JOB_QUEUE = JobQueue()
@@ -0,0 +1,284 @@
+"""S3 Upload: content-addressed document uploads against an S3-compatible store.
+
+LocalObjectStore is a filesystem-backed stand-in that answers the subset of the
+boto3 S3 client API the pipeline uses (head_object, get_object, put_object, the
+multipart calls), with the same argument names and response shapes, so a real
+boto3.client("s3") can take its place. Objects live under OBJECT_STORE_DIR/<bucket>/<key>,
+in-progress multipart uploads under OBJECT_STORE_DIR/.multipart/<upload id>/.
+OBJECT_STORE_LATENCY_MS / OBJECT_STORE_MBPS make every request pay a round trip
+and a per-connection bandwidth, like the network in front of real S3.
+
+DocumentUploader puts each document at documents/<sha256>:
+
+    exists        head_object finds the hash -> nothing is sent (dedupe)
+    small         one put_object (below MULTIPART_THRESHOLD)
+    large         multipart: PART_SIZE parts sent by UPLOAD_WORKERS threads in parallel
+    interrupted   the pending multipart upload for the key is found again and only
+                  the parts it does not already hold (by part ETag) are sent
+
+An upload that is cancelled or fails part-way is left pending on purpose, so the
+next attempt resumes it.
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait as wait_futures
+
+from cancellation import check_cancelled
+
+OBJECT_STORE_DIR       = os.environ.get("OBJECT_STORE_DIR",
+                                        os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "objects"))
+OBJECT_STORE_BUCKET    = os.environ.get("OBJECT_STORE_BUCKET", "credit-reviews")
+OBJECT_STORE_LATENCY_MS = float(os.environ.get("OBJECT_STORE_LATENCY_MS", "0"))   # per request
+OBJECT_STORE_MBPS       = float(os.environ.get("OBJECT_STORE_MBPS", "0"))         # per connection; 0 = unthrottled
+MULTIPART_THRESHOLD    = 8 * 1024 * 1024    # bytes; larger documents go up in parts
+PART_SIZE              = 5 * 1024 * 1024    # bytes per part (S3's minimum for all but the last)
+UPLOAD_WORKERS         = 4                  # parts in flight per document
+
+
+class NoSuchKey(KeyError):
+    """head_object on a key that does not exist (a 404 ClientError from boto3)."""
+
+
+class NoSuchUpload(KeyError):
+    """A multipart call on an upload id that does not exist (completed or aborted)."""
+
+
+def _missing(exc) -> bool:
+    code = getattr(exc, "response", {}).get("Error", {}).get("Code")
+    return isinstance(exc, NoSuchKey) or code in ("404", "NoSuchKey")
+
+
+def _etag(data: bytes) -> str:
+    return f'"{hashlib.md5(data).hexdigest()}"'
+
+
+def document_key(sha256: str) -> str:
+    return f"documents/{sha256}"
+
+
+def open_document(sha256: str, client=None, bucket: str = OBJECT_STORE_BUCKET):
+    """Readable body of the document stored at documents/<sha256> (NoSuchKey if it was never uploaded)."""
+    client = client if client is not None else OBJECT_STORE
+    return client.get_object(Bucket=bucket, Key=document_key(sha256))["Body"]
+
+
+class LocalObjectStore:
+    def __init__(self, root: str = OBJECT_STORE_DIR, *, latency: float = OBJECT_STORE_LATENCY_MS / 1000,
+                 mbps: float = OBJECT_STORE_MBPS):
+        self.root = root
+        self.latency = latency
+        self.mbps = mbps
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "bytes_in": 0, "bytes_out": 0}
+
+    def _request(self, body: bytes = b"", *, sent: int = 0):
+        """Charge one request: round trip plus transfer time (body in, `sent` bytes out) per connection."""
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["bytes_in"] += len(body)
+            self.stats["bytes_out"] += sent
+        delay = self.latency + ((len(body) + sent) / (self.mbps * 1e6) if self.mbps else 0.0)
+        if delay:
+            time.sleep(delay)
+
+    def _path(self, bucket: str, key: str) -> str:
+        return os.path.join(self.root, bucket, *key.split("/"))
+
+    def _upload_dir(self, upload_id: str) -> str:
+        path = os.path.join(self.root, ".multipart", upload_id)
+        if not os.path.isdir(path):
+            raise NoSuchUpload(upload_id)
+        return path
+
+    @staticmethod
+    def _write(path: str, data: bytes):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)       # readers never see a partial object
+
+    # ---- objects ---------------------------------------------------------------
+    def head_object(self, *, Bucket: str, Key: str) -> dict:
+        self._request()
+        path = self._path(Bucket, Key)
+        try:
+            size = os.path.getsize(path)
+        except FileNotFoundError:
+            raise NoSuchKey(Key) from None
+        with open(path + ".etag", encoding="utf-8") as f:
+            return {"ContentLength": size, "ETag": f.read()}
+
+    def get_object(self, *, Bucket: str, Key: str) -> dict:
+        """Body is an open binary file (read() / close(), like boto3's StreamingBody)."""
+        path = self._path(Bucket, Key)
+        try:
+            body = open(path, "rb")
+        except FileNotFoundError:
+            self._request()
+            raise NoSuchKey(Key) from None
+        size = os.fstat(body.fileno()).st_size
+        self._request(sent=size)
+        with open(path + ".etag", encoding="utf-8") as f:
+            return {"Body": body, "ContentLength": size, "ETag": f.read()}
+
+    def put_object(self, *, Bucket: str, Key: str, Body: bytes) -> dict:
+        self._request(Body)
+        etag = _etag(Body)
+        path = self._path(Bucket, Key)
+        self._write(path + ".etag", etag.encode("utf-8"))
+        self._write(path, Body)
+        return {"ETag": etag}
+
+    # ---- multipart ---------------------------------------------------------------
+    def create_multipart_upload(self, *, Bucket: str, Key: str) -> dict:
+        self._request()
+        upload_id = uuid.uuid4().hex
+        meta = {"Bucket": Bucket, "Key": Key, "Initiated": time.time()}
+        self._write(os.path.join(self.root, ".multipart", upload_id, "upload.json"), json.dumps(meta).encode())
+        return {"UploadId": upload_id}
+
+    def list_multipart_uploads(self, *, Bucket: str, Prefix: str = "") -> dict:
+        self._request()
+        uploads = []
+        base = os.path.join(self.root, ".multipart")
+        for upload_id in sorted(os.listdir(base)) if os.path.isdir(base) else ():
+            try:
+                with open(os.path.join(base, upload_id, "upload.json"), encoding="utf-8") as f:
+                    meta = json.load(f)
+            except FileNotFoundError:
+                continue    # being completed / aborted
+            if meta["Bucket"] == Bucket and meta["Key"].startswith(Prefix):
+                uploads.append({"Key": meta["Key"], "UploadId": upload_id, "Initiated": meta["Initiated"]})
+        return {"Uploads": uploads}
+
+    def upload_part(self, *, Bucket: str, Key: str, UploadId: str, PartNumber: int, Body: bytes) -> dict:
+        self._request(Body)
+        etag = _etag(Body)
+        self._write(os.path.join(self._upload_dir(UploadId), f"{PartNumber:05d}.part"), Body)
+        return {"ETag": etag}
+
+    def list_parts(self, *, Bucket: str, Key: str, UploadId: str) -> dict:
+        self._request()
+        parts = []
+        directory = self._upload_dir(UploadId)
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(".part"):
+                with open(os.path.join(directory, name), "rb") as f:
+                    data = f.read()
+                parts.append({"PartNumber": int(name[:-5]), "ETag": _etag(data), "Size": len(data)})
+        return {"Parts": parts}
+
+    def complete_multipart_upload(self, *, Bucket: str, Key: str, UploadId: str, MultipartUpload: dict) -> dict:
+        self._request()
+        directory = self._upload_dir(UploadId)
+        digests, body = [], bytearray()
+        for part in MultipartUpload["Parts"]:
+            with open(os.path.join(directory, f"{part['PartNumber']:05d}.part"), "rb") as f:
+                data = f.read()
+            if _etag(data) != part["ETag"]:
+                raise ValueError(f"part {part['PartNumber']} does not match its ETag")
+            digests.append(hashlib.md5(data).digest())
+            body += data
+        etag = f'"{hashlib.md5(b"".join(digests)).hexdigest()}-{len(digests)}"'   # S3's multipart ETag
+        path = self._path(Bucket, Key)
+        self._write(path + ".etag", etag.encode("utf-8"))
+        self._write(path, bytes(body))
+        shutil.rmtree(directory, ignore_errors=True)
+        return {"ETag": etag}
+
+    def abort_multipart_upload(self, *, Bucket: str, Key: str, UploadId: str) -> dict:
+        self._request()
+        shutil.rmtree(self._upload_dir(UploadId), ignore_errors=True)
+        return {}
+
+
+class DocumentUploader:
+    def __init__(self, client, bucket: str = OBJECT_STORE_BUCKET, *, threshold: int = MULTIPART_THRESHOLD,
+                 part_size: int = PART_SIZE, workers: int = UPLOAD_WORKERS):
+        self.client = client
+        self.bucket = bucket
+        self.threshold = threshold
+        self.part_size = part_size
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="s3-part")
+        self._lock = threading.Lock()
+        self.stats = {"uploads": 0, "deduped": 0, "multipart": 0, "parts": 0, "resumed_parts": 0,
+                      "bytes_sent": 0, "seconds": 0.0}
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+        except Exception as exc:
+            if _missing(exc):
+                return False
+            raise
+        return True
+
+    def upload(self, key: str, data: bytes) -> dict:
+        """Store `data` at `key` unless it is already there; returns what was sent and how fast."""
+        started = time.perf_counter()
+        result = {"key": key, "bytes": len(data), "sent": 0, "parts": 0, "resumed_parts": 0, "deduped": False}
+        if self.exists(key):
+            result["deduped"] = True
+        elif len(data) < self.threshold:
+            self.client.put_object(Bucket=self.bucket, Key=key, Body=data)
+            result["sent"] = len(data)
+        else:
+            self._multipart(key, data, result)
+        result["seconds"] = time.perf_counter() - started
+        with self._lock:
+            self.stats["uploads"] += 1
+            self.stats["deduped"] += result["deduped"]
+            self.stats["multipart"] += result["parts"] > 0
+            self.stats["parts"] += result["parts"]
+            self.stats["resumed_parts"] += result["resumed_parts"]
+            self.stats["bytes_sent"] += result["sent"]
+            self.stats["seconds"] += result["seconds"]
+        return result
+
+    def _multipart(self, key: str, data: bytes, result: dict):
+        pending = [u for u in self.client.list_multipart_uploads(Bucket=self.bucket, Prefix=key).get("Uploads", [])
+                   if u["Key"] == key]
+        if pending:     # an earlier attempt was interrupted: keep the parts it already sent
+            upload_id = max(pending, key=lambda u: u["Initiated"])["UploadId"]
+            held = {p["PartNumber"]: p["ETag"]
+                    for p in self.client.list_parts(Bucket=self.bucket, Key=key, UploadId=upload_id).get("Parts", [])}
+        else:
+            upload_id = self.client.create_multipart_upload(Bucket=self.bucket, Key=key)["UploadId"]
+            held = {}
+
+        parts = {n + 1: data[off:off + self.part_size] for n, off in enumerate(range(0, len(data), self.part_size))}
+        etags = {n: held[n] for n, body in parts.items() if held.get(n) == _etag(body)}
+        result["parts"] = len(parts)
+        result["resumed_parts"] = len(etags)
+
+        def send(n):
+            return n, self.client.upload_part(Bucket=self.bucket, Key=key, UploadId=upload_id, PartNumber=n,
+                                              Body=parts[n])["ETag"]
+
+        futures = {self._pool.submit(send, n) for n in parts if n not in etags}
+        try:
+            while futures:
+                done, futures = wait_futures(futures, timeout=0.1, return_when=FIRST_COMPLETED)
+                for future in done:
+                    n, etag = future.result()
+                    etags[n] = etag
+                    result["sent"] += len(parts[n])
+                check_cancelled()   # a cancelled run stops here; the upload stays pending for a resume
+        finally:
+            for future in futures:
+                future.cancel()
+        self.client.complete_multipart_upload(
+            Bucket=self.bucket, Key=key, UploadId=upload_id,
+            MultipartUpload={"Parts": [{"PartNumber": n, "ETag": etags[n]} for n in sorted(etags)]},
+        )
+
+
+# Process-wide store and uploader (swap LocalObjectStore for boto3.client("s3") against real S3)
+OBJECT_STORE = LocalObjectStore()
+DOCUMENT_UPLOADER = DocumentUploader(OBJECT_STORE)
@@ -0,0 +1,153 @@
+"""Process-wide TTL + LRU cache with an optional on-disk tier.
+
+Entries are dicts: {"value": ..., "etag": str | None, "stored_at": float, "expires_at": float}.
+An expired entry is not dropped right away: callers can revalidate it with its ETag
+(If-None-Match) and call refresh() on a 304 instead of downloading the body again.
+Memory is bounded by max_entries (least recently used evicted first); the disk tier,
+when enabled, holds one JSON file per key and is bounded by max_disk_entries.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResultCache:
+    def __init__(self, *, max_entries: int = 512, ttl: float = 300.0, disk_dir: str = None,
+                 max_disk_entries: int = 4096, clock=time.time):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_dir = disk_dir
+        self.max_disk_entries = max_disk_entries
+        self.clock = clock      # wall clock: disk entries must survive restarts
+        self._mem = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "stale": 0, "misses": 0, "disk_hits": 0, "evictions": 0, "refreshes": 0}
+        self._disk_ready = False    # disk_dir is created by the first write, not at construction
+
+    # ---- public API ---------------------------------------------------------
+    def lookup(self, key):
+        """Return the entry for `key` (fresh or expired) or None. Use is_fresh() to tell them apart."""
+        with self._lock:
+            entry = self._mem.get(key)
+            if entry is not None:
+                self._mem.move_to_end(key)
+        if entry is None and self.disk_dir:
+            entry = self._disk_read(key)
+            if entry is not None:
+                with self._lock:
+                    self.stats["disk_hits"] += 1
+                    self._mem_put(key, entry)
+        with self._lock:
+            if entry is None:
+                self.stats["misses"] += 1
+            elif self.is_fresh(entry):
+                self.stats["hits"] += 1
+            else:
+                self.stats["stale"] += 1
+        return entry
+
+    def get(self, key, default=None):
+        """Fresh value only."""
+        entry = self.lookup(key)
+        return entry["value"] if entry is not None and self.is_fresh(entry) else default
+
+    def is_fresh(self, entry) -> bool:
+        return entry["expires_at"] > self.clock()
+
+    def put(self, key, value, etag: str = None, ttl: float = None):
+        now = self.clock()
+        entry = {"value": value, "etag": etag, "stored_at": now,
+                 "expires_at": now + (self.ttl if ttl is None else ttl)}
+        with self._lock:
+            self._mem_put(key, entry)
+        if self.disk_dir:
+            self._disk_write(key, entry)
+        return entry
+
+    def refresh(self, key, entry=None, ttl: float = None):
+        """Server said 304 Not Modified: extend the existing entry's lifetime."""
+        entry = entry if entry is not None else self.lookup(key)
+        if entry is None:
+            return None
+        with self._lock:
+            self.stats["refreshes"] += 1
+        return self.put(key, entry["value"], entry["etag"], ttl)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._mem.pop(key, None)
+        if self.disk_dir:
+            try:
+                os.remove(self._disk_path(key))
+            except OSError:
+                pass
+
+    def clear(self):
+        """Drop the memory tier (disk entries stay and are re-promoted on lookup)."""
+        with self._lock:
+            self._mem.clear()
+
+    def __len__(self):
+        return len(self._mem)
+
+    # ---- internals ----------------------------------------------------------
+    def _mem_put(self, key, entry):
+        self._mem[key] = entry
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _disk_path(self, key) -> str:
+        digest = hashlib.sha256(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.disk_dir, f"{digest}.json")
+
+    def _disk_read(self, key):
+        path = self._disk_path(key)
+        try:
+            with open(path, encoding="utf-8") as fh:
+                entry = json.load(fh)
+        except (OSError, ValueError):
+            return None
+        try:
+            os.utime(path)      # mtime doubles as the disk tier's LRU clock
+        except OSError:
+            pass
+        return entry
+
+    def _disk_write(self, key, entry):
+        path = self._disk_path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            if not self._disk_ready:
+                os.makedirs(self.disk_dir, exist_ok=True)
+                self._disk_ready = True
+            with open(tmp, "w", encoding="utf-8") as fh:
+                json.dump(entry, fh)
+            os.replace(tmp, path)
+        except (OSError, TypeError, ValueError):
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return
+        self._disk_prune()
+
+    def _disk_prune(self):
+        try:
+            names = [n for n in os.listdir(self.disk_dir) if n.endswith(".json")]
+        except OSError:
+            return
+        excess = len(names) - self.max_disk_entries
+        if excess <= 0:
+            return
+        paths = [os.path.join(self.disk_dir, n) for n in names]
+        paths.sort(key=lambda p: os.path.getmtime(p) if os.path.exists(p) else 0)
+        for p in paths[:excess]:
+            try:
+                os.remove(p)
+            except OSError:
+                pass
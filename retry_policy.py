@@ -0,0 +1,254 @@
+"""Declarative retry policies for pipeline stages.
+
+Each stage that can fail declares a RetryPolicy in STAGE_RETRY_POLICIES instead of
+scripting its own retry:
+
+    max_attempts  attempts in total, the first one included
+    backoff       retry n waits min(cap, base * 2**n), jittered ("full": U(0, d),
+                  "equal": d/2 + U(0, d/2), "none": d)
+    fallback      upstream stage re-run before the retry (its time counts toward
+                  the backoff)
+    hedge_after   seconds after which a duplicate attempt is launched if the first
+                  has not answered; the first success wins (cuts tail latency)
+    breaker       consecutive failures that open the stage's circuit; while open,
+                  calls fail fast, and after `reset_after` seconds one probe is let
+                  through (half-open) to decide whether to close it again
+
+run_with_retry() applies a stage's policy to a callable and reports each step to
+on_event, so the lanes can show badges and chips. RETRY_STATS keeps, per stage,
+the retries, hedges, breaker trips and the latency retries added (time spent on
+failed attempts, fallbacks and backoff before the attempt that succeeded).
+"""
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait as wait_futures
+
+from cancellation import check_cancelled
+
+SECTION_FETCH_HEDGE_AFTER = float(os.environ.get("SECTION_FETCH_HEDGE_AFTER", "1.5"))   # seconds; 0 = off
+HEDGE_WORKERS             = 64     # threads shared by hedged calls (an attempt and its duplicate use one each)
+
+
+class StageFailure(RuntimeError):
+    """An attempt at a stage failed in a way worth retrying."""
+
+
+class CircuitOpenError(RuntimeError):
+    """The stage's circuit is open: the call was not attempted."""
+
+
+def backoff_delay(attempt: int, base: float = 0.2, cap: float = 2.0, rng=random, jitter: str = "full") -> float:
+    """Exponential backoff for retry number `attempt` (0-based), capped and jittered."""
+    delay = min(cap, base * (2 ** attempt))
+    if jitter == "full":
+        return rng.uniform(0.0, delay)
+    if jitter == "equal":
+        return delay / 2 + rng.uniform(0.0, delay / 2)
+    return delay
+
+
+class RetryPolicy:
+    def __init__(self, *, max_attempts: int = 3, backoff_base: float = 0.2, backoff_cap: float = 2.0,
+                 jitter: str = "full", fallback: str = None, hedge_after: float = None,
+                 breaker_threshold: int = 5, breaker_reset_after: float = 30.0, retry_on=(Exception,)):
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be >= 1")
+        if jitter not in ("full", "equal", "none"):
+            raise ValueError(f"unknown jitter {jitter!r} (expected 'full', 'equal' or 'none')")
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.jitter = jitter
+        self.fallback = fallback                    # stage name re-run before a retry, or None
+        self.hedge_after = hedge_after or None      # seconds, or None for no hedging
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset_after = breaker_reset_after
+        self.retry_on = tuple(retry_on)
+
+    def delay(self, retry: int, rng=random) -> float:
+        return backoff_delay(retry, self.backoff_base, self.backoff_cap, rng, self.jitter)
+
+
+# Stage name -> policy. Stages not listed use DEFAULT_RETRY_POLICY.
+DEFAULT_RETRY_POLICY = RetryPolicy(max_attempts=3, backoff_base=0.3, backoff_cap=2.0, jitter="equal")
+STAGE_RETRY_POLICIES = {
+    "Async DB Ingestion":   RetryPolicy(max_attempts=3, backoff_base=0.4, backoff_cap=2.0, jitter="equal",
+                                        fallback="Proxy Document Retriever", breaker_threshold=4),
+    "Credit AI Invocation": RetryPolicy(max_attempts=3, backoff_base=0.5, backoff_cap=3.0, jitter="equal",
+                                        fallback="Context Assembly / Upload", breaker_threshold=3,
+                                        breaker_reset_after=20.0),
+    # Each attempt is one HTTP request (intent_client's own retries are off for this stage), so the
+    # retry budget and backoff mirror the client's and a hedge duplicates a single request, not a retry loop
+    "Section Fetch":        RetryPolicy(max_attempts=4, backoff_base=0.2, backoff_cap=2.0, jitter="full",
+                                        hedge_after=SECTION_FETCH_HEDGE_AFTER, breaker_threshold=5),
+}
+
+
+class CircuitBreaker:
+    def __init__(self, *, threshold: int = 5, reset_after: float = 30.0, clock=time.monotonic):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0          # consecutive
+        self._opened_at = None
+        self._probing = False       # a half-open probe is in flight
+        self.stats = {"opened": 0, "rejected": 0, "probes": 0}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        return "half-open" if self.clock() - self._opened_at >= self.reset_after else "open"
+
+    def allow(self) -> bool:
+        """May a call go through now? In half-open state only one probe at a time is let through."""
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._probing:
+                self._probing = True
+                self.stats["probes"] += 1
+                return True
+            self.stats["rejected"] += 1
+            return False
+
+    def release(self):
+        """The call ended without a verdict (cancelled, or not a retryable failure): free the probe slot."""
+        with self._lock:
+            self._probing = False
+
+    def record(self, ok: bool):
+        with self._lock:
+            self._probing = False
+            if ok:
+                self._failures, self._opened_at = 0, None
+                return
+            self._failures += 1
+            if self._opened_at is not None or self._failures >= self.threshold:
+                if self._opened_at is None:
+                    self.stats["opened"] += 1
+                self._opened_at = self.clock()   # a failed probe re-opens for another reset_after
+
+
+class BreakerRegistry:
+    """One breaker per stage, built from the stage's policy on first use."""
+
+    def __init__(self, policies=None):
+        self.policies = STAGE_RETRY_POLICIES if policies is None else policies
+        self._lock = threading.Lock()
+        self._breakers = {}
+
+    def get(self, stage: str) -> CircuitBreaker:
+        with self._lock:
+            if stage not in self._breakers:
+                policy = self.policies.get(stage) or DEFAULT_RETRY_POLICY
+                self._breakers[stage] = CircuitBreaker(threshold=policy.breaker_threshold,
+                                                       reset_after=policy.breaker_reset_after)
+            return self._breakers[stage]
+
+
+class RetryStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}
+
+    def record(self, stage: str, *, calls: int = 0, retries: int = 0, hedges: int = 0,
+               hedge_wins: int = 0, rejected: int = 0, added: float = 0.0):
+        with self._lock:
+            s = self._stages.setdefault(stage, {"calls": 0, "retries": 0, "hedges": 0, "hedge_wins": 0,
+                                                "rejected": 0, "added_s": 0.0})
+            s["calls"] += calls
+            s["retries"] += retries
+            s["hedges"] += hedges
+            s["hedge_wins"] += hedge_wins
+            s["rejected"] += rejected
+            s["added_s"] += added
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {stage: dict(s) for stage, s in self._stages.items()}
+
+
+# Process-wide: every session's stages share the same backends, so they share breakers and counters
+STAGE_BREAKERS = BreakerRegistry()
+RETRY_STATS    = RetryStats()
+
+_HEDGE_POOL = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix="hedge")
+
+
+def _hedged(fn, attempt: int, hedge_after: float, stats: dict):
+    """fn(attempt), duplicated once if it has not returned after `hedge_after` seconds; first success wins."""
+    primary = _HEDGE_POOL.submit(fn, attempt)
+    done, _ = wait_futures([primary], timeout=hedge_after)
+    if done:
+        return primary.result()
+    stats["hedges"] += 1
+    hedge = _HEDGE_POOL.submit(fn, attempt)
+    pending, error = {primary, hedge}, None
+    while pending:
+        done, pending = wait_futures(pending, return_when=FIRST_COMPLETED)
+        for fut in done:
+            if fut.exception() is None:
+                stats["hedge_wins"] += fut is hedge
+                return fut.result()      # the loser finishes in the background; its result is dropped
+            error = fut.exception()
+    raise error
+
+
+def run_with_retry(stage: str, fn, *, policy: RetryPolicy = None, breaker: CircuitBreaker = None,
+                   fallback=None, on_event=None, sleep=time.sleep, rng=random, clock=time.perf_counter,
+                   stats: RetryStats = None):
+    """Run fn(attempt) (1-based) under the stage's policy; return its result or raise the last error.
+
+    After a failed attempt, fallback(attempt) (if given) re-runs the policy's fallback
+    stage, then the rest of the backoff is slept through `sleep`. on_event(kind, info)
+    sees "failed", "recovered", "gave_up" and "rejected" (circuit open).
+    """
+    policy = policy or STAGE_RETRY_POLICIES.get(stage) or DEFAULT_RETRY_POLICY
+    breaker = breaker or STAGE_BREAKERS.get(stage)
+    stats = RETRY_STATS if stats is None else stats
+    on_event = on_event or (lambda kind, info: None)
+    counts = {"hedges": 0, "hedge_wins": 0}
+    started = clock()
+    for attempt in range(1, policy.max_attempts + 1):
+        check_cancelled()   # an abandoned run stops retrying
+        if not breaker.allow():
+            stats.record(stage, calls=1, retries=attempt - 1, rejected=1, added=clock() - started, **counts)
+            on_event("rejected", {"attempt": attempt})
+            raise CircuitOpenError(f"{stage}: circuit open")
+        attempt_started = clock()
+        try:
+            if policy.hedge_after:
+                result = _hedged(fn, attempt, policy.hedge_after, counts)
+            else:
+                result = fn(attempt)
+        except policy.retry_on as exc:
+            breaker.record(False)
+            if attempt == policy.max_attempts:
+                stats.record(stage, calls=1, retries=attempt - 1, added=attempt_started - started, **counts)
+                on_event("gave_up", {"attempt": attempt, "error": exc})
+                raise
+            delay = policy.delay(attempt - 1, rng)
+            on_event("failed", {"attempt": attempt, "error": exc, "delay": delay, "fallback": policy.fallback})
+            backoff_started = clock()
+            if fallback is not None:
+                fallback(attempt)
+            sleep(max(0.0, delay - (clock() - backoff_started)))
+            continue
+        except BaseException:
+            breaker.release()   # cancelled / rerun / not retryable: a half-open probe must not stay taken
+            raise
+        breaker.record(True)
+        added = attempt_started - started if attempt > 1 else 0.0
+        stats.record(stage, calls=1, retries=attempt - 1, added=added, **counts)
+        if attempt > 1:
+            on_event("recovered", {"attempt": attempt, "added": added})
+        return result
@@ -0,0 +1,47 @@
+"""Run journal: one line per processing-run event (started, completed, failed, cancelled).
+
+Entries are kept in memory, process-wide, newest last, up to RUN_JOURNAL_MAX_ENTRIES.
+They are also appended to RUN_JOURNAL_PATH as JSON lines when that is set, so
+abandoned runs can be audited after a restart. A cancelled entry carries the
+reason, how far the run got and what its cancellation released; a failed entry
+carries the failure and how far the run got (a failure releases nothing).
+"""
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+RUN_JOURNAL_MAX_ENTRIES = 1000
+RUN_JOURNAL_PATH        = os.environ.get("RUN_JOURNAL_PATH", "")
+
+
+class RunJournal:
+    def __init__(self, *, max_entries: int = RUN_JOURNAL_MAX_ENTRIES, path: str = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = deque(maxlen=max_entries)
+        self._ids = itertools.count(1)
+        self.stats = {"started": 0, "completed": 0, "failed": 0, "cancelled": 0}
+
+    def start(self, risk_party_id: str, review_id: str, **fields) -> int:
+        run_id = next(self._ids)
+        self.record(run_id, "started", risk_party_id=risk_party_id, review_id=review_id, **fields)
+        return run_id
+
+    def record(self, run_id: int, event: str, **fields):
+        entry = {"run_id": run_id, "event": event, "at": time.time(), **fields}
+        with self._lock:
+            self._entries.append(entry)
+            self.stats[event] = self.stats.get(event, 0) + 1
+            if self.path:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry, default=str) + "\n")
+
+    def entries(self, event: str = None) -> list:
+        with self._lock:
+            return [dict(e) for e in self._entries if event is None or e["event"] == event]
+
+
+RUN_JOURNAL = RunJournal(path=RUN_JOURNAL_PATH or None)
@@ -0,0 +1,239 @@
+"""Scheduling policies for Credit AI payloads under a bounded worker pool.
+
+A payload needs a worker for each AI stage it runs. When it finishes a stage it
+releases its worker and queues for the next one; whenever a worker is free the
+pool hands it the queued job that ranks first under the active policy:
+
+    fifo      first queued, first served
+    sejf      shortest expected remaining work (learned per intent and stage)
+    priority  higher review priority first, FIFO within a priority
+    deadline  earliest deadline first
+
+A review's run has a pool of its own, holding only that review's payloads. Those
+all share the review's priority, so "priority" would order them FIFO. It is for
+pools shared across reviews (bench_scheduling.py), and RUN_POLICIES leaves it out.
+
+Expected stage times come from StageHistory, an EWMA of observed durations per
+(intent, stage) seeded with AI_STAGE_BASE, shared process-wide so estimates
+improve as reviews run.
+
+Payloads reach the pool through a BoundedQueue (flow control from Trigger
+Evaluation) and enter it only while the lane has room, so a burst of uploads
+waits upstream instead of piling up in the pool.
+"""
+import threading
+from collections import deque
+
+from simulation import AI_STAGE_BASE
+
+DEFAULT_SECTION_DEADLINE = 12.0   # seconds from dispatch to delivery, for the deadline policy
+HISTORY_ALPHA            = 0.3    # EWMA weight of the newest observation
+
+
+class Job:
+    def __init__(self, job_id, intent: str, *, arrival: float, stage: int = 0, priority: int = 0,
+                 deadline: float = None, members=None):
+        self.job_id = job_id
+        self.members = list(members) if members else [job_id]   # payloads moving together (a batch)
+        self.intent = intent
+        self.stage = stage              # stage the job is queued for / running
+        self.arrival = arrival          # when the payload was dispatched
+        self.priority = priority        # higher runs first under the priority policy
+        self.deadline = deadline        # absolute time; None = no deadline
+        self.enqueued_at = arrival      # when it last joined the ready queue
+        self.started_at = None          # when its current stage got a worker
+
+
+class StageHistory:
+    def __init__(self, base=AI_STAGE_BASE, *, alpha: float = HISTORY_ALPHA):
+        self.base = list(base)
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        self._ewma = {}     # (intent, stage) -> seconds
+
+    def observe(self, intent: str, stage: int, seconds: float):
+        with self._lock:
+            prev = self._ewma.get((intent, stage))
+            self._ewma[(intent, stage)] = seconds if prev is None else prev + self.alpha * (seconds - prev)
+
+    def expected(self, intent: str, stage: int) -> float:
+        with self._lock:
+            return self._ewma.get((intent, stage), self.base[stage] if stage < len(self.base) else 0.0)
+
+    def expected_remaining(self, intent: str, stage: int) -> float:
+        """Expected time to finish stage `stage` and every stage after it."""
+        return sum(self.expected(intent, s) for s in range(stage, len(self.base)))
+
+
+STAGE_HISTORY = StageHistory()
+
+
+class FIFO:
+    name = "fifo"
+
+    def key(self, job: Job, now: float):
+        return (job.enqueued_at, str(job.job_id))
+
+
+class ShortestExpectedJobFirst:
+    name = "sejf"
+
+    def __init__(self, history: StageHistory = None):
+        self.history = history or STAGE_HISTORY
+
+    def key(self, job: Job, now: float):
+        return (self.history.expected_remaining(job.intent, job.stage), job.enqueued_at, str(job.job_id))
+
+
+class PriorityFirst:
+    name = "priority"
+
+    def key(self, job: Job, now: float):
+        return (-job.priority, job.enqueued_at, str(job.job_id))
+
+
+class EarliestDeadlineFirst:
+    name = "deadline"
+
+    def key(self, job: Job, now: float):
+        deadline = job.deadline if job.deadline is not None else float("inf")
+        return (deadline, job.enqueued_at, str(job.job_id))
+
+
+POLICIES = {
+    "fifo":     FIFO,
+    "sejf":     ShortestExpectedJobFirst,
+    "priority": PriorityFirst,
+    "deadline": EarliestDeadlineFirst,
+}
+
+
+# Policies AI_SCHEDULING_POLICY may name for a review's run
+RUN_POLICIES = ("fifo", "sejf", "deadline")
+
+
+def make_policy(name: str, *, history: StageHistory = None, allowed=POLICIES):
+    if name not in allowed:
+        raise ValueError(f"unknown scheduling policy {name!r} (expected one of {', '.join(allowed)})")
+    cls = POLICIES[name]
+    return cls(history) if cls is ShortestExpectedJobFirst else cls()
+
+
+class BatchWindow:
+    """Holds payloads at a stage for up to `window` seconds so they can continue as one job."""
+
+    def __init__(self, window: float):
+        self.window = window
+        self.members = []
+        self.opened_at = None
+
+    def add(self, member, now: float):
+        if not self.members:
+            self.opened_at = now
+        self.members.append(member)
+
+    def flush_at(self):
+        return None if not self.members else self.opened_at + self.window
+
+    def should_flush(self, now: float, still_expected: int) -> bool:
+        """Flush once nobody else can join, or the window has run out."""
+        return bool(self.members) and (still_expected == 0 or now >= self.opened_at + self.window)
+
+    def flush(self) -> list:
+        members, self.members, self.opened_at = self.members, [], None
+        return members
+
+
+QUEUE_OVERFLOW = ("block", "shed")
+
+
+class BoundedQueue:
+    """FIFO hand-off between two stages, holding at most `capacity` items.
+
+    offer() refuses an item once the queue is full. With overflow="block" the
+    producer keeps it and offers it again later (it is held up, and so is whatever
+    feeds it); with overflow="shed" the item is dropped and counted.
+    """
+
+    def __init__(self, name: str, capacity: int, *, overflow: str = "block"):
+        if capacity < 1:
+            raise ValueError("capacity must be >= 1")
+        if overflow not in QUEUE_OVERFLOW:
+            raise ValueError(f"unknown overflow {overflow!r} (expected one of {', '.join(QUEUE_OVERFLOW)})")
+        self.name = name
+        self.capacity = capacity
+        self.overflow = overflow
+        self.items = deque()
+        self.stats = {"accepted": 0, "refused": 0, "shed": 0, "peak": 0, "blocked_s": 0.0}
+
+    def offer(self, item) -> bool:
+        if len(self.items) >= self.capacity:
+            self.stats["shed" if self.overflow == "shed" else "refused"] += 1
+            return False
+        self.items.append(item)
+        self.stats["accepted"] += 1
+        self.stats["peak"] = max(self.stats["peak"], len(self.items))
+        return True
+
+    def take(self):
+        return self.items.popleft()
+
+    def blocked(self, seconds: float):
+        """Book time a producer spent held up by this queue."""
+        self.stats["blocked_s"] += seconds
+
+    @property
+    def full(self) -> bool:
+        return len(self.items) >= self.capacity
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+
+class WorkerPool:
+    def __init__(self, policy, workers: int, *, admit=None):
+        if workers < 1:
+            raise ValueError("workers must be >= 1")
+        self.policy = policy
+        self.workers = workers
+        self.admit = admit      # admit(job) -> bool: extra gate (e.g. an invocation concurrency limit)
+        self.busy = 0
+        self.ready = []
+
+    def enqueue(self, job: Job, now: float):
+        job.enqueued_at = now
+        self.ready.append(job)
+
+    def release(self):
+        self.busy = max(0, self.busy - 1)
+
+    def drain(self) -> int:
+        """Drop every queued job and free every worker (the run was cancelled); returns the jobs dropped."""
+        dropped = len(self.ready) + self.busy
+        self.ready.clear()
+        self.busy = 0
+        return dropped
+
+    def assign(self, now: float) -> list:
+        """Hand free workers to queued jobs in policy order; returns the jobs that just started.
+
+        A job the admit gate turns away stays queued and the next one in order is tried.
+        """
+        started = []
+        for job in sorted(self.ready, key=lambda j: self.policy.key(j, now)):
+            if self.busy >= self.workers:
+                break
+            if self.admit is not None and not self.admit(job):
+                continue
+            self.ready.remove(job)
+            job.started_at = now
+            self.busy += 1
+            started.append(job)
+        return started
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self.ready)
+
+    def queued_at(self, stage: int) -> int:
+        return sum(1 for j in self.ready if j.stage == stage)
@@ -0,0 +1,92 @@
+"""Section Coverage Analysis and delta planning for reviews that gain documents.
+
+Each section reads a known set of document types (SECTION_COVERAGE). When a review
+that was already processed gets new or changed documents, only those documents
+need S3 Upload -> Async DB Ingestion, and only the sections covering their types
+need to be re-generated; every other section keeps its previous result.
+
+REVIEW_LEDGER remembers, per (risk_party_id, review_id), the documents ingested
+(metadata + content hash, no bytes) and the last result of every section. It is
+process-wide, so a later session adding a 10Q to the same review sees it too.
+"""
+import threading
+
+from generation_cache import document_hash
+
+# Document types each section draws from; unknown sections are treated as reading everything
+SECTION_COVERAGE = {
+    "Business Description": {"10K", "10Q", "Underwriting Memo"},
+    "Recent Developments":  {"10Q", "Earnings"},
+    "ABL":                  {"Field Exam", "Inventory Appraisal", "Underwriting Memo"},
+}
+
+
+def covers(section: str, doc_type: str) -> bool:
+    types = SECTION_COVERAGE.get(section)
+    return types is None or doc_type in types
+
+
+def covered_documents(section: str, docs) -> list:
+    """The documents a section is generated from."""
+    return [d for d in docs if covers(section, d.get("document_type", ""))]
+
+
+def document_record(doc: dict) -> dict:
+    """Ledger entry for a document: its metadata and content hash, without the bytes."""
+    record = {k: v for k, v in doc.items() if k != "data"}
+    record["sha256"] = document_hash(doc)
+    return record
+
+
+def diff_documents(previous: dict, docs):
+    """(delta, unchanged, removed) of `docs` against `previous` (file_name -> ledger record).
+
+    A document is in the delta when it is new, or its content or type changed.
+    """
+    delta, unchanged = [], []
+    for doc in docs:
+        before = previous.get(doc.get("file_name"))
+        same = (before is not None and before["sha256"] == document_hash(doc)
+                and before.get("document_type") == doc.get("document_type"))
+        (unchanged if same else delta).append(doc)
+    names = {d.get("file_name") for d in docs}
+    removed = [rec for name, rec in previous.items() if name not in names]
+    return delta, unchanged, removed
+
+
+def affected_sections(sections, delta, removed=(), previous=None) -> list:
+    """Sections covering any document type that was added, changed or removed (order kept)."""
+    previous = previous or {}
+    types = {d.get("document_type", "") for d in list(delta) + list(removed)}
+    for doc in delta:   # a re-typed document also affects the sections of its old type
+        before = previous.get(doc.get("file_name"))
+        if before is not None:
+            types.add(before.get("document_type", ""))
+    return [s for s in sections if any(covers(s, t) for t in types)]
+
+
+class ReviewLedger:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reviews = {}   # (risk_party_id, review_id) -> {"documents": {name: record}, "results": {section: result}}
+
+    def get(self, risk_party_id: str, review_id: str) -> dict:
+        """Copy of the review's record ({"documents": {}, "results": {}} if never processed)."""
+        with self._lock:
+            rec = self._reviews.get((risk_party_id, review_id), {})
+            return {"documents": dict(rec.get("documents", {})), "results": dict(rec.get("results", {}))}
+
+    def known(self, risk_party_id: str, review_id: str) -> bool:
+        with self._lock:
+            return (risk_party_id, review_id) in self._reviews
+
+    def record(self, risk_party_id: str, review_id: str, docs, results: dict):
+        """Store the documents now ingested for the review and merge in the sections just generated."""
+        documents = {d.get("file_name"): document_record(d) for d in docs}
+        with self._lock:
+            rec = self._reviews.setdefault((risk_party_id, review_id), {"documents": {}, "results": {}})
+            rec["documents"] = documents
+            rec["results"].update({k: v for k, v in results.items() if not v.get("error")})
+
+
+REVIEW_LEDGER = ReviewLedger()
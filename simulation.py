@@ -0,0 +1,243 @@
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from cancellation import check_cancelled, current_token
+
+DOC_TYPES = ["10K", "10Q", "Earnings", "Underwriting Memo", "Inventory Appraisal", "Field Exam"]
+
+DOC_NODES = [
+    "Document Upload",
+    "S3 Upload",
+    "Section Coverage Analysis",
+    "Proxy Document Retriever",
+    "Async DB Ingestion",
+    "Trigger Evaluation",
+]
+
+AI_NODES = [
+    "Receive Generation Payloads",
+    "Prompt Manager",
+    "Download Documents",
+    "Context Assembly / Upload",
+    "Credit AI Invocation",
+    "Output Delivery",
+]
+
+# We have 3 sections now
+PAYLOAD_SECTION_NAMES = ["Business Description", "Recent Developments", "ABL"]
+TOTAL_INTENTS = len(PAYLOAD_SECTION_NAMES)  # = 3
+
+# --- Demo ingest failure (injected by fault_injection.demo_faults) ---
+BULK_FAIL_THRESHOLD = 2     # trigger the failure path when total docs > this
+BULK_FAIL_DOC_INDEX = 1     # 0-based index of the doc that fails once (2 => 3rd doc)
+
+# --- Per-stage timings (seconds) ---
+SIM = {
+    "dp_progress": 1.00,   # each of the first 4 nodes: progress animation
+    "dp_success":  0.35,   # short settle after success
+    "fo_progress": 0.90,   # per-doc ingest "Ingesting…"
+    "fo_success":  0.45,   # per-doc "Ready" settle
+    "tr_progress": 1.00,   # Trigger Evaluation progress
+    "tr_success":  0.35,   # Trigger Evaluation success settle
+}
+
+SIM.update({
+    "tr_start":  0.80,   # when TE first flips to progress
+    "tr_tick":   0.50,   # each payload sent (counter increments)
+    "tr_finish": 0.60,   # settle after last payload, before success
+})
+
+SIM.update({
+    "ai_progress": 0.80,   # highlight current AI stage
+    "ai_advance":  0.60,   # move payloads to next stage
+    "ai_settle":   0.35,   # small settle after each hop
+})
+
+# Optional global multiplier for quick tuning (e.g., 1.0 normal, 1.5 slower, 2.0 slowest)
+SPEED_FACTOR = 1.0
+
+# Seed for the per-run RNG (deterministic demo; change for more variety).
+# Each run builds its own random.Random(DEMO_SEED) instead of reseeding the global module.
+DEMO_SEED = 7
+
+# Time to traverse each AI stage j -> j+1 (seconds, pre-jitter)
+# indexes: 0:Receive→Prompt, 1:Prompt→Download, 2:Download→Context,
+#          3:Context→Invocation, 4:Invocation→Output
+AI_STAGE_BASE = [0.7, 0.6, 0.6, 0.8, 1.1]
+
+# Credit AI worker pool: each stage needs a worker; queued payloads are picked by the policy
+# (fifo | sejf | deadline, see scheduling.RUN_POLICIES)
+AI_WORKERS           = int(os.environ.get("AI_WORKERS", "2"))
+AI_SCHEDULING_POLICY = os.environ.get("AI_SCHEDULING_POLICY", "sejf")
+
+# Batching: intents of one review reaching Download Documents within AI_BATCH_WINDOW seconds of each
+# other share one download, context assembly and invocation; outputs are split per intent (0 = off)
+AI_BATCH_WINDOW      = float(os.environ.get("AI_BATCH_WINDOW", "1.5"))
+AI_BATCH_STAGE       = 2      # first shared stage (Download Documents)
+AI_BATCH_MEMBER_COST = 0.25   # extra stage time per additional intent in a batch (longer prompt and output)
+
+# Download Documents reads through the shared download cache (download_cache.py): a payload whose
+# documents are all cached takes this share of the stage's time; otherwise the share it had to download
+DOWNLOAD_HIT_COST    = 0.1
+
+# Flow control: Trigger Evaluation hands payloads to the Credit AI lane through a bounded queue, and
+# the lane takes them in while fewer than AI_LANE_CAPACITY are in flight. When the queue is full,
+# "block" holds Trigger Evaluation (and the ingestion feeding it); "shed" drops the payload
+PAYLOAD_QUEUE_CAPACITY = int(os.environ.get("PAYLOAD_QUEUE_CAPACITY", "6"))
+PAYLOAD_QUEUE_OVERFLOW = os.environ.get("PAYLOAD_QUEUE_OVERFLOW", "block")   # block | shed
+AI_LANE_CAPACITY       = int(os.environ.get("AI_LANE_CAPACITY", "6"))
+
+# ---- Speed profiles ----
+# Temporary multipliers for specific nodes/stages. Each speed_profile() can include:
+#  - "dp": {node_index -> multiplier}
+#  - "fo": {doc_index -> multiplier}
+#  - "ai": {stage_index -> multiplier}
+#  - "ai_per_payload_stage": {(payload_index, stage_index) -> multiplier}
+# Active profiles multiply together. They are compiled into one flat table on push/pop
+# (dense lists per node/doc/stage plus a sparse (payload, stage) map), so a wait looks
+# its multiplier up in O(1) however many profiles are nested.
+class SpeedTable:
+    def __init__(self, dp_nodes: int, ai_stages: int):
+        self._dp_nodes = dp_nodes
+        self._ai_stages = ai_stages
+        self._profiles = {}         # token -> profile, in push order
+        self._tokens = 0
+        self._compile()
+
+    def push(self, profile: dict):
+        self._tokens += 1
+        self._profiles[self._tokens] = profile
+        self._compile()
+        return self._tokens
+
+    def pop(self, token):
+        """Remove the profile pushed with `token` (the table belongs to one thread, so no lock is needed)."""
+        self._profiles.pop(token, None)
+        self._compile()
+
+    def _compile(self):
+        dp = [1.0] * self._dp_nodes
+        ai = [1.0] * self._ai_stages
+        fo, pair = [], {}
+        for profile in self._profiles.values():
+            for i, m in profile.get("dp", {}).items():
+                dp[i] *= m
+            for i, m in profile.get("ai", {}).items():
+                ai[i] *= m
+            for i, m in profile.get("fo", {}).items():
+                if i >= len(fo):
+                    fo.extend([1.0] * (i + 1 - len(fo)))
+                fo[i] *= m
+            for key, m in profile.get("ai_per_payload_stage", {}).items():
+                pair[key] = pair.get(key, 1.0) * m
+        # published as one tuple, so a lookup reads the multipliers of a single compile
+        self._table = (dp, fo, ai, pair)
+
+    def dp(self, node_index: int) -> float:
+        return self._table[0][node_index]
+
+    def fo(self, doc_index: int) -> float:
+        fo = self._table[1]
+        return fo[doc_index] if doc_index < len(fo) else 1.0
+
+    def ai(self, stage_idx: int, payload_idx=None) -> float:
+        _, _, ai, pair = self._table
+        mult = ai[stage_idx] if stage_idx < len(ai) else 1.0
+        return mult * pair.get((payload_idx, stage_idx), 1.0) if pair else mult
+
+
+# Per thread, like the sleepers below: each Streamlit session runs its script on its own thread, so one
+# run's retry profile must not slow another session's waits, and (payload, stage) keys (per-run payload
+# indexes) cannot collide across runs
+_SPEED_TABLES = threading.local()
+
+def speed_table() -> SpeedTable:
+    """The calling thread's speed table."""
+    table = getattr(_SPEED_TABLES, "table", None)
+    if table is None:
+        table = _SPEED_TABLES.table = SpeedTable(len(DOC_NODES), len(AI_NODES))
+    return table
+
+@contextmanager
+def speed_profile(*, dp=None, fo=None, ai=None, ai_per_payload_stage=None):
+    """Temporarily adjust speed of specific nodes/stages on this thread while inside the context."""
+    table = speed_table()
+    token = table.push({
+        "dp": dp or {},
+        "fo": fo or {},
+        "ai": ai or {},
+        "ai_per_payload_stage": ai_per_payload_stage or {},
+    })
+    try:
+        yield
+    finally:
+        table.pop(token)
+
+def sleep_smooth(seconds: float):
+    """Chunked sleep so Streamlit can repaint between chunks; wakes early if the run is cancelled."""
+    steps = max(1, int(seconds * 5))
+    token = current_token()
+    for _ in range(steps):
+        if token is None:
+            time.sleep(seconds / steps)
+        else:
+            token.wait(seconds / steps)
+
+# ---- Sleepers ----
+# Every wait below sleeps through the innermost active sleeper (sleep_smooth by default).
+# A pipelined page installs one that keeps other lanes moving while this lane waits.
+# Per thread: each Streamlit session runs its script on its own thread.
+_SLEEPERS = threading.local()
+
+@contextmanager
+def sleeper(fn):
+    """Route waits on this thread through fn(seconds) while inside the context."""
+    stack = _SLEEPERS.__dict__.setdefault("stack", [])
+    stack.append(fn)
+    try:
+        yield
+    finally:
+        stack.pop()
+
+def _sleep(seconds: float):
+    check_cancelled()
+    stack = getattr(_SLEEPERS, "stack", None)
+    (stack[-1] if stack else sleep_smooth)(seconds)
+
+def wait(key: str):
+    dur = SIM[key] * SPEED_FACTOR
+    _sleep(dur)
+
+def pause(seconds: float):
+    """Wait an arbitrary time (e.g. a retry backoff) through the active sleeper."""
+    _sleep(seconds * SPEED_FACTOR)
+
+# --- Drop-in wait wrappers that respect overrides ---
+def wait_dp(node_index: int, phase: str):     # phase: "progress" | "success"
+    dur = SIM[f"dp_{phase}"] * SPEED_FACTOR
+    dur *= speed_table().dp(node_index)
+    _sleep(dur)
+
+def wait_fo(doc_index: int, phase: str):      # phase: "progress" | "success"
+    key = "fo_progress" if phase == "progress" else "fo_success"
+    dur = SIM[key] * SPEED_FACTOR
+    dur *= speed_table().fo(doc_index)
+    _sleep(dur)
+
+def wait_ai_phase(sim_key: str, *, payload_idx=None, stage_idx=None):
+    # sim_key is one of: "ai_progress", "ai_advance", "ai_settle"
+    dur = SIM.get(sim_key, 0.5) * SPEED_FACTOR
+    if stage_idx is not None:
+        dur *= speed_table().ai(stage_idx, payload_idx)
+    _sleep(dur)
+
+def stage_duration(stage: int, payload_idx=None, rng=random) -> float:
+    """Randomized dwell time for a payload at a given stage, scaled by SPEED_FACTOR and overrides."""
+    base = AI_STAGE_BASE[stage]
+    jitter = rng.uniform(0.75, 1.35)
+    dur = base * jitter * SPEED_FACTOR
+    # Apply any AI overrides (global stage and/or (payload,stage) specific)
+    return dur * speed_table().ai(stage, payload_idx)
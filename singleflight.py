@@ -0,0 +1,39 @@
+"""Request coalescing: concurrent calls with the same key share one in-flight execution.
+
+The first caller for a key runs the function; callers arriving while it is still
+running block on the same Future and get its result (or its exception). Once the
+call finishes the key is forgotten, so later callers start a fresh flight.
+"""
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+        self.stats = {"executed": 0, "shared": 0}
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            fut = self._flights.get(key)
+            leader = fut is None
+            if leader:
+                fut = self._flights[key] = Future()
+                self.stats["executed"] += 1
+            else:
+                self.stats["shared"] += 1
+        if not leader:
+            return fut.result()
+        try:
+            fut.set_result(fn(*args, **kwargs))
+        except BaseException as exc:
+            fut.set_exception(exc)
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+        return fut.result()
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._flights)
@@ -0,0 +1,273 @@
+"""Local stand-in for the section API, for offline latency/throughput benchmarks.
+
+    python stand_in_server.py --port 8765 --latency-ms 120 --error-rate 0.05 [--require-auth]
+
+Implements `GET /{risk_party_id}/{review_id}/{intent}` returning the same JSON shape
+as intents.mock_fetch_intent_result, with a content ETag (If-None-Match -> 304).
+`GET .../{intent}/stream` sends the same text as chunked text/plain, a few words
+per chunk (time-to-first-chunk = base latency, then --chunk-ms between chunks).
+`POST /batch` answers many sections in one round-trip ({"items": [...]} ->
+{"results": [{"status", "etag", "body"}]}), costing one base latency plus a small
+per-item increment. `POST /batch/stream` streams the same sections as one generation:
+chunked NDJSON lines {"index", "text"} interleaved across the items, {"index", "done"}
+after an item's last chunk, {"index", "error"} for a failed item. `POST /token` is a stand-in token issuer (client credentials -> short-lived bearer
+token); with --require-auth, section calls without a live token get 401.
+HTTP/1.1 keep-alive, one thread per connection.
+Latency is base ± jitter per request; `error_rate` answers 503 to exercise retries.
+"""
+import argparse
+import hashlib
+import json
+import random
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from intents import mock_fetch_intent_result
+
+
+class SectionAPIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive; every response carries Content-Length
+    disable_nagle_algorithm = True  # headers and body go out in separate writes
+
+    def setup(self):
+        super().setup()
+        self.server.count("connections")
+
+    def log_message(self, format, *args):   # quiet; stats are in server.stats
+        pass
+
+    def send_json(self, status: int, payload, headers=None):
+        body = b"" if status == 304 else json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def start_chunked(self, content_type: str):
+        self.server.count("streams")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def send_stream(self, text: str, words_per_chunk: int = 3):
+        self.start_chunked("text/plain; charset=utf-8")
+        for i, piece in enumerate(word_pieces(text, words_per_chunk)):
+            if i:
+                time.sleep(self.server.chunk_ms / 1000.0)
+            self.write_chunk(piece.encode("utf-8"))
+        self.wfile.write(b"0\r\n\r\n")
+
+    def send_batch_stream(self, items, words_per_chunk: int = 3):
+        """The items' chunks interleaved, one NDJSON line each, as a single generation produces them."""
+        self.start_chunked("application/x-ndjson")
+        pending = {}
+        for index, item in enumerate(items):
+            res = self.server.section_response(**item)
+            if res["status"] == 200:
+                pending[index] = word_pieces(res["body"]["llm_response"], words_per_chunk)
+            else:
+                self.write_chunk(json.dumps({"index": index, "error": f"HTTP {res['status']}"}).encode() + b"\n")
+        first = True
+        while pending:
+            if not first:
+                time.sleep(self.server.chunk_ms / 1000.0)
+            first = False
+            for index in list(pending):
+                piece = next(pending[index], None)
+                line = {"index": index, "text": piece} if piece is not None else {"index": index, "done": True}
+                if piece is None:
+                    del pending[index]
+                self.write_chunk(json.dumps(line).encode("utf-8") + b"\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def do_POST(self):
+        path = urlsplit(self.path).path.rstrip("/")
+        if path == "/token":
+            form = parse_qs(self.read_body().decode("utf-8"))
+            self.server.simulate_latency(self.server.token_latency_scale)
+            self.send_json(200, self.server.issue_token(form.get("client_id", [""])[0]))
+            return
+        if path in ("/batch", "/batch/stream"):
+            self.server.count("requests")
+            if self.server.require_auth and not self.server.token_valid(self.headers.get("Authorization", "")):
+                self.read_body()
+                self.server.count("unauthorized")
+                self.send_json(401, {"error": "invalid or expired token"}, {"WWW-Authenticate": "Bearer"})
+                return
+            items = json.loads(self.read_body() or b"{}").get("items", [])
+            self.server.count("batch_items", len(items))
+            self.server.simulate_latency(1.0 + self.server.batch_item_cost * len(items))
+            if path == "/batch/stream":
+                self.send_batch_stream(items)
+                return
+            self.send_json(200, {"results": [self.server.section_response(**item) for item in items]})
+            return
+        self.read_body()
+        self.send_json(404, {"error": "unknown endpoint"})
+
+    def do_GET(self):
+        self.server.count("requests")
+        parts = [unquote(p) for p in urlsplit(self.path).path.strip("/").split("/") if p]
+        streaming = len(parts) == 4 and parts[3] == "stream"
+        if streaming:
+            parts = parts[:3]
+        if len(parts) != 3:
+            self.send_json(404, {"error": "expected /{risk_party_id}/{review_id}/{intent}"})
+            return
+        if self.server.require_auth and not self.server.token_valid(self.headers.get("Authorization", "")):
+            self.server.count("unauthorized")
+            self.send_json(401, {"error": "invalid or expired token"}, {"WWW-Authenticate": "Bearer"})
+            return
+        self.server.simulate_latency()
+        if self.server.should_fail():
+            self.server.count("errors")
+            self.send_json(503, {"error": "transient"}, {"Retry-After": "0"})
+            return
+        risk_party_id, review_id, intent = parts
+        result = section_result(risk_party_id, review_id, intent)
+        if streaming:
+            self.send_stream(result["llm_response"])
+            return
+        etag = section_etag(result)
+        if self.headers.get("If-None-Match") == etag:
+            self.server.count("not_modified")
+            self.send_json(304, None, {"ETag": etag})
+            return
+        self.send_json(200, result, {"ETag": etag})
+
+
+def word_pieces(text: str, words_per_chunk: int = 3):
+    """The text a few words at a time (spaces kept, so the pieces join back into the text)."""
+    words = text.split(" ")
+    for i in range(0, len(words), words_per_chunk):
+        yield " ".join(words[i:i + words_per_chunk]) + (" " if i + words_per_chunk < len(words) else "")
+
+
+def section_result(risk_party_id: str, review_id: str, intent: str) -> dict:
+    result = mock_fetch_intent_result(intent)
+    result.update({"risk_party_id": risk_party_id, "review_id": review_id})
+    return result
+
+
+def section_etag(result: dict) -> str:
+    """Strong ETag over the section content (the timestamp is excluded: it changes every call)."""
+    key = "\x1f".join(str(result.get(k, "")) for k in ("risk_party_id", "review_id", "intent", "llm_response"))
+    return '"' + hashlib.sha256(key.encode("utf-8")).hexdigest()[:16] + '"'
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, *, latency_ms=80.0, jitter_ms=20.0, error_rate=0.0, seed=None,
+                 require_auth=False, token_ttl=300.0, token_latency_scale=1.0, batch_item_cost=0.05,
+                 chunk_ms=40.0):
+        super().__init__(address, SectionAPIHandler)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.require_auth = require_auth
+        self.token_ttl = token_ttl
+        self.token_latency_scale = token_latency_scale
+        self.batch_item_cost = batch_item_cost      # extra latency per batch item, as a fraction of base
+        self.chunk_ms = chunk_ms                    # gap between streamed chunks
+        self.tokens = {}    # token -> expires_at (wall clock)
+        self.stats = {"connections": 0, "requests": 0, "errors": 0, "not_modified": 0,
+                      "tokens_issued": 0, "unauthorized": 0, "batch_items": 0, "streams": 0}
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, key: str, n: int = 1):
+        with self._lock:
+            self.stats[key] = self.stats.get(key, 0) + n
+
+    def simulate_latency(self, scale: float = 1.0):
+        with self._lock:
+            ms = self.latency_ms + self.rng.uniform(-self.jitter_ms, self.jitter_ms)
+        time.sleep(max(0.0, ms * scale) / 1000.0)
+
+    def issue_token(self, client_id: str) -> dict:
+        token = secrets.token_urlsafe(24)
+        with self._lock:
+            self.tokens[token] = time.time() + self.token_ttl
+            self.stats["tokens_issued"] += 1
+        return {"access_token": token, "token_type": "Bearer", "expires_in": self.token_ttl, "client_id": client_id}
+
+    def token_valid(self, authorization: str) -> bool:
+        scheme, _, token = authorization.partition(" ")
+        with self._lock:
+            expires_at = self.tokens.get(token)
+        return scheme.lower() == "bearer" and expires_at is not None and expires_at > time.time()
+
+    def revoke_tokens(self):
+        with self._lock:
+            self.tokens.clear()
+
+    def section_response(self, risk_party_id: str, review_id: str, intent: str) -> dict:
+        """One /batch item; transient failures are reported per item."""
+        if self.should_fail():
+            self.count("errors")
+            return {"status": 503}
+        result = section_result(risk_party_id, review_id, intent)
+        return {"status": 200, "etag": section_etag(result), "body": result}
+
+    def should_fail(self) -> bool:
+        with self._lock:
+            return self.error_rate > 0 and self.rng.random() < self.error_rate
+
+
+def serve_in_thread(host: str = "127.0.0.1", port: int = 0, **kwargs) -> StandInServer:
+    """Start a stand-in server on a background thread (port 0 = ephemeral). Call .shutdown() when done."""
+    server = StandInServer((host, port), **kwargs)
+    threading.Thread(target=server.serve_forever, name="stand-in-server", daemon=True).start()
+    return server
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Local stand-in for the section API")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--latency-ms", type=float, default=80.0)
+    ap.add_argument("--jitter-ms", type=float, default=20.0)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--chunk-ms", type=float, default=40.0)
+    ap.add_argument("--require-auth", action="store_true")
+    ap.add_argument("--token-ttl", type=float, default=300.0)
+    args = ap.parse_args()
+
+    server = StandInServer(
+        (args.host, args.port),
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+        require_auth=args.require_auth, token_ttl=args.token_ttl, chunk_ms=args.chunk_ms,
+    )
+    print(f"stand-in section API on {server.base_url}  (INTENT_API_URL={server.base_url}, "
+          f"AUTH_TOKEN_URL={server.base_url}/token)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
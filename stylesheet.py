@@ -0,0 +1,119 @@
+import glob
+import hashlib
+import os
+import re
+
+# Streamlit serves ./static/<file> at app/static/<file> when
+# server.enableStaticServing is on (see .streamlit/config.toml).
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+STATIC_URL = "app/static"
+STYLESHEET_PREFIX = "app"
+
+_STYLE_TAG_RE = re.compile(r"</?style[^>]*>", re.IGNORECASE)
+_COMMENT_RE   = re.compile(r"/\*.*?\*/", re.DOTALL)
+_WS_RE        = re.compile(r"\s+")
+_PUNCT_RE     = re.compile(r"\s*([{};,])\s*")
+_IMPORTANT_RE = re.compile(r"\s*!\s*important", re.IGNORECASE)
+
+
+def minify_css(css: str) -> str:
+    """Strip <style> tags and comments, collapse whitespace around punctuation."""
+    css = _STYLE_TAG_RE.sub("", css)
+    css = _COMMENT_RE.sub("", css)
+    css = _WS_RE.sub(" ", css)
+    css = _PUNCT_RE.sub(r"\1", css)
+    css = _IMPORTANT_RE.sub("!important", css)
+    return css.replace(";}", "}").strip()
+
+
+def _split_statements(css: str) -> list:
+    """Split minified CSS into top-level statements (`sel{...}` or `@rule{...}`).
+
+    A stray closing brace at depth 0 is dropped instead of swallowing the next rule.
+    """
+    out, depth, start = [], 0, 0
+    for i, ch in enumerate(css):
+        if ch == "{":
+            depth += 1
+        elif ch == "}":
+            if depth == 0:
+                start = i + 1
+                continue
+            depth -= 1
+            if depth == 0:
+                out.append(css[start:i + 1].strip())
+                start = i + 1
+    return [s for s in out if s]
+
+
+def _normalize_declarations(body: str) -> str:
+    """`color : #fff ; color:#fff` -> `color:#fff` (drop exact repeats, keep last)."""
+    decls = []
+    for d in body.split(";"):
+        if not d.strip():
+            continue
+        prop, sep, value = d.partition(":")
+        decls.append(f"{prop.strip()}{sep}{value.strip()}" if sep else d.strip())
+    deduped = list(dict.fromkeys(reversed(decls)))
+    return ";".join(reversed(deduped))
+
+
+def _normalize_statement(stmt: str) -> str:
+    head, _, rest = stmt.partition("{")
+    body = rest[:-1]
+    if "{" in body:      # @media / @keyframes: recurse into nested rules
+        inner = "".join(_normalize_statement(s) for s in _split_statements(body))
+    else:
+        inner = _normalize_declarations(body)
+    return f"{head.strip()}{{{inner}}}"
+
+
+def merge_css(blocks) -> str:
+    """Merge CSS blocks in cascade order, dropping exact duplicate rules.
+
+    When a rule repeats, only its last occurrence is kept: that is the one that
+    decided the cascade originally, so the rendered result is unchanged.
+    """
+    statements = []
+    for block in blocks:
+        statements.extend(_normalize_statement(s) for s in _split_statements(minify_css(block)))
+    deduped = list(dict.fromkeys(reversed(statements)))
+    return "".join(reversed(deduped))
+
+
+def build_stylesheet(blocks) -> tuple:
+    """Return (css, digest) for the merged, minified stylesheet."""
+    css = merge_css(blocks)
+    digest = hashlib.sha256(css.encode("utf-8")).hexdigest()[:12]
+    return css, digest
+
+
+def write_stylesheet(css: str, digest: str, static_dir: str = STATIC_DIR) -> str:
+    """Write `<prefix>.<digest>.css` once and prune older builds. Returns the file name."""
+    name = f"{STYLESHEET_PREFIX}.{digest}.css"
+    path = os.path.join(static_dir, name)
+    os.makedirs(static_dir, exist_ok=True)
+    if not os.path.exists(path):
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            fh.write(css)
+        os.replace(tmp, path)   # atomic: concurrent sessions never see a partial file
+    for old in glob.glob(os.path.join(static_dir, f"{STYLESHEET_PREFIX}.*.css")):
+        if os.path.basename(old) != name:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+    return name
+
+
+def stylesheet_tag(blocks, *, static_serving: bool, static_dir: str = STATIC_DIR) -> str:
+    """HTML to inject: a cacheable <link> to the hashed file, or one inline <style> as fallback."""
+    css, digest = build_stylesheet(blocks)
+    if static_serving:
+        try:
+            name = write_stylesheet(css, digest, static_dir)
+            return f'<link rel="stylesheet" href="{STATIC_URL}/{name}">'
+        except OSError:
+            pass
+    return f'<style data-digest="{digest}">{css}</style>'
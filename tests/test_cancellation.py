@@ -0,0 +1,51 @@
+import threading
+
+import pytest
+
+from cancellation import CancelToken, Cancelled, cancel_scope, check_cancelled, current_token
+
+
+def test_cancel_is_idempotent_and_keeps_the_first_reason():
+    token = CancelToken()
+    assert token.cancel("navigated away")
+    assert not token.cancel("abandoned")
+    assert token.cancelled and token.reason == "navigated away"
+
+
+def test_wait_wakes_when_cancelled_from_another_thread():
+    token = CancelToken()
+    threading.Timer(0.05, token.cancel, args=("stop",)).start()
+    with pytest.raises(Cancelled) as info:
+        token.wait(5)
+    assert info.value.reason == "stop"
+
+
+def test_cancelled_is_not_an_exception():
+    assert not issubclass(Cancelled, Exception)
+
+
+def test_release_runs_callbacks_last_first_once():
+    token, order = CancelToken(), []
+    token.on_cancel(lambda: order.append("slots") or {"slots": 2})
+    token.on_cancel(lambda: order.append("bytes") or {"bytes": 10, "slots": 1})
+    assert token.release() == {}     # not cancelled: nothing to release
+    token.cancel()
+    assert token.release() == {"bytes": 10, "slots": 3}
+    assert token.release() == {"bytes": 10, "slots": 3}
+    assert order == ["bytes", "slots"]
+
+
+def test_scope_is_per_thread_and_nested():
+    outer, inner = CancelToken(), CancelToken()
+    seen = []
+    with cancel_scope(outer):
+        with cancel_scope(inner):
+            assert current_token() is inner
+            threading.Thread(target=lambda: seen.append(current_token())).start()
+        assert current_token() is outer
+        outer.cancel()
+        with pytest.raises(Cancelled):
+            check_cancelled()
+    assert current_token() is None
+    check_cancelled()
+    assert seen == [None]
@@ -0,0 +1,89 @@
+import threading
+
+import pytest
+
+from concurrency_limit import AdaptiveLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_limit_caps_slots_in_flight():
+    limiter = AdaptiveLimiter(initial=2)
+    a, b = limiter.try_acquire(), limiter.try_acquire()
+    assert a and b and limiter.try_acquire() is None
+    assert limiter.in_flight == 2 and limiter.stats["rejected"] == 1
+    limiter.release(a)
+    assert limiter.try_acquire() is not None
+
+
+def test_aimd_grows_on_success_and_backs_off_on_errors():
+    clock = FakeClock()
+    limiter = AdaptiveLimiter(initial=2, backoff=0.5, clock=clock)
+    token = limiter.try_acquire()
+    clock.now += 1
+    limiter.release(token, ok=True)
+    assert limiter.limit == 3
+    limiter.release(limiter.try_acquire(), ok=False)
+    assert limiter.limit == 1 and limiter.stats["backoffs"] == 1
+
+
+def test_aimd_backs_off_when_latency_climbs():
+    clock = FakeClock()
+    limiter = AdaptiveLimiter(initial=4, backoff=0.5, tolerance=2.0, clock=clock)
+    for latency in (1.0, 3.0):
+        token = limiter.try_acquire()
+        clock.now += latency
+        limiter.release(token)
+    assert limiter.limit == 2
+
+
+def test_gradient_shrinks_under_rising_latency():
+    limiter = AdaptiveLimiter(algorithm="gradient", initial=10, min_limit=1)
+    for _ in range(5):
+        limiter.observe(1.0, ok=True)
+    grown = limiter.limit
+    for _ in range(10):
+        limiter.observe(4.0, ok=True)
+    assert limiter.limit < grown
+    with pytest.raises(ValueError):
+        AdaptiveLimiter(algorithm="vegas")
+
+
+def test_abandon_and_lease_reclaim():
+    clock = FakeClock()
+    limiter = AdaptiveLimiter(initial=1, lease_timeout=10, clock=clock)
+    token = limiter.try_acquire()
+    assert limiter.abandon(token) and not limiter.abandon(token)
+    assert limiter.limit == 1 and limiter.stats["abandoned"] == 1
+    limiter.try_acquire()
+    clock.now = 11
+    assert limiter.try_acquire() is not None     # the lost slot was reclaimed
+    assert limiter.stats["reclaimed"] == 1 and limiter.stats["errors"] == 1
+
+
+def test_blocked_acquire_is_woken_by_release():
+    limiter = AdaptiveLimiter(initial=1)
+    token = limiter.try_acquire()
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(limiter.acquire(timeout=5)))
+    waiter.start()
+    while limiter.queue_depth == 0:
+        threading.Event().wait(0.01)
+    assert limiter.try_acquire() is None          # a queued caller goes first
+    limiter.release(token)
+    waiter.join(5)
+    assert got and got[0] is not None
+
+
+def test_slot_counts_an_exception_as_an_error():
+    limiter = AdaptiveLimiter(initial=2)
+    with pytest.raises(RuntimeError):
+        with limiter.slot():
+            raise RuntimeError("model error")
+    assert limiter.stats["errors"] == 1 and limiter.in_flight == 0
@@ -0,0 +1,104 @@
+import hashlib
+import io
+import os
+import threading
+import time
+
+import pytest
+
+from download_cache import DOWNLOAD_TMP_STALE_S, DownloadCache, DownloadError
+
+
+def blob(n: int, fill: bytes) -> tuple:
+    data = fill * n
+    return hashlib.sha256(data).hexdigest(), data
+
+
+class Origin:
+    def __init__(self, *docs, delay: float = 0.0):
+        self.docs = {sha: data for sha, data in docs}
+        self.delay = delay
+        self.fetches = []
+
+    def __call__(self, sha256):
+        self.fetches.append(sha256)
+        time.sleep(self.delay)
+        return io.BytesIO(self.docs[sha256])
+
+
+def test_miss_downloads_once_then_hits(tmp_path):
+    sha, data = blob(1000, b"a")
+    origin = Origin((sha, data))
+    cache = DownloadCache(str(tmp_path), chunk_bytes=256)
+    path = cache.get(sha, origin)
+    assert open(path, "rb").read() == data and path == str(tmp_path / sha[:2] / sha)
+    cache.get(sha, origin)
+    assert origin.fetches == [sha]
+    assert (cache.stats["misses"], cache.stats["hits"], cache.stats["bytes_downloaded"]) == (1, 1, 1000)
+
+
+def test_concurrent_misses_share_one_download(tmp_path):
+    sha, data = blob(1000, b"b")
+    origin = Origin((sha, data), delay=0.1)
+    cache = DownloadCache(str(tmp_path))
+    threads = [threading.Thread(target=cache.get, args=(sha, origin)) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    assert origin.fetches == [sha]
+
+
+def test_corrupt_download_is_rejected_and_not_kept(tmp_path):
+    sha, _ = blob(1000, b"c")
+    cache = DownloadCache(str(tmp_path))
+    with pytest.raises(DownloadError):
+        cache.get(sha, lambda s: io.BytesIO(b"tampered"))
+    assert not cache.contains(sha) and not os.listdir(tmp_path / sha[:2])
+
+
+def test_least_recently_used_is_evicted(tmp_path):
+    docs = [blob(1000, bytes([65 + i])) for i in range(3)]
+    origin = Origin(*docs)
+    cache = DownloadCache(str(tmp_path), max_bytes=2500)
+    cache.get(docs[0][0], origin)
+    cache.get(docs[1][0], origin)
+    cache.get(docs[0][0], origin)
+    cache.get(docs[2][0], origin)
+    assert [cache.contains(sha) for sha, _ in docs] == [True, False, True]
+    assert cache.size_bytes == 2000 and cache.stats["evictions"] == 1
+
+
+def test_restart_adopts_files_and_keeps_live_temp_files(tmp_path):
+    sha, data = blob(1000, b"d")
+    DownloadCache(str(tmp_path)).get(sha, Origin((sha, data)))
+    live = tmp_path / sha[:2] / f"{sha}.live.tmp"
+    stale = tmp_path / sha[:2] / f"{sha}.stale.tmp"
+    live.write_bytes(b"in progress")
+    stale.write_bytes(b"dead")
+    old = time.time() - DOWNLOAD_TMP_STALE_S - 1
+    os.utime(stale, (old, old))
+    cache = DownloadCache(str(tmp_path))
+    assert cache.contains(sha) and len(cache) == 1
+    assert live.exists() and not stale.exists()
+
+
+def test_open_survives_an_eviction_by_another_process(tmp_path):
+    sha, data = blob(1000, b"e")
+    origin = Origin((sha, data))
+    cache = DownloadCache(str(tmp_path))
+    cache.get(sha, origin)
+    os.remove(tmp_path / sha[:2] / sha)     # another process evicted it
+    with cache.open(sha, origin) as f:
+        assert f.read() == data
+    assert len(origin.fetches) == 2
+
+
+def test_mapped_view_reads_the_document(tmp_path):
+    sha, data = blob(5000, b"f")
+    cache = DownloadCache(str(tmp_path))
+    with cache.mapped(sha, Origin((sha, data))) as view:
+        assert view[:] == data
+    empty = hashlib.sha256(b"").hexdigest()
+    with cache.mapped(empty, Origin((empty, b""))) as view:
+        assert view == b""
@@ -0,0 +1,76 @@
+import random
+
+import pytest
+
+from fault_injection import Fault, FaultInjector, InjectedTimeout, demo_faults, parse_faults
+from retry_policy import StageFailure
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_parse_faults_reads_every_option():
+    latency, timeout = parse_faults("Credit AI Invocation:latency=2,p=0.3,intent=ABL; "
+                                    "Download Documents:timeout=3,window=5-15,nth=2,times=1")
+    assert (latency.stage, latency.kind, latency.seconds, latency.probability, latency.intent) == \
+        ("Credit AI Invocation", "latency", 2.0, 0.3, "ABL")
+    assert (timeout.kind, timeout.window, timeout.nth, timeout.times) == ("timeout", (5.0, 15.0), 2, 1)
+    assert parse_faults("Async DB Ingestion:error,doc=b.pdf")[0].doc == "b.pdf"
+    assert parse_faults("") == []
+    for bad in ("Nowhere:error", "S3 Upload:melt", "S3 Upload:error,color=red"):
+        with pytest.raises(ValueError):
+            parse_faults(bad)
+
+
+def test_filters_and_injection_cap():
+    injector = FaultInjector([Fault("Async DB Ingestion", doc="b.pdf", times=2)])
+    assert injector.draw("Async DB Ingestion", doc="a.pdf") is None
+    assert injector.draw("Async DB Ingestion", doc="b.pdf") is not None
+    assert injector.draw("Async DB Ingestion", doc="b.pdf") is not None
+    assert injector.draw("Async DB Ingestion", doc="b.pdf") is None
+    assert injector.stats["calls"] == 4 and injector.stats["injected"] == 2
+
+
+def test_nth_call_window_intent_and_probability():
+    clock = FakeClock()
+    injector = FaultInjector([Fault("S3 Upload", nth=2), Fault("Output Delivery", window=(5, 10)),
+                              Fault("Credit AI Invocation", intent="ABL", probability=0.5)],
+                             rng=random.Random(1), clock=clock)
+    assert [injector.draw("S3 Upload") is not None for _ in range(3)] == [False, True, False]
+    assert injector.draw("Output Delivery") is None
+    clock.now = 6
+    assert injector.draw("Output Delivery") is not None
+    assert injector.draw("Credit AI Invocation", intent=["Business Description"]) is None
+    fired = sum(injector.draw("Credit AI Invocation", intent=["ABL", "Recent Developments"]) is not None
+                for _ in range(200))
+    assert 60 < fired < 140
+
+
+def test_fire_applies_the_fault():
+    slept = []
+    injector = FaultInjector([Fault("S3 Upload", "latency", seconds=2, times=1),
+                              Fault("S3 Upload", "timeout", seconds=3, times=1),
+                              Fault("S3 Upload", times=1)])
+    assert injector.fire("S3 Upload", sleep=slept.append).kind == "latency"
+    with pytest.raises(InjectedTimeout):
+        injector.fire("S3 Upload", sleep=slept.append)
+    with pytest.raises(StageFailure):
+        injector.fire("S3 Upload", sleep=slept.append)
+    assert injector.fire("S3 Upload", sleep=slept.append) is None
+    assert slept == [2, 3]
+    injector.recovered("S3 Upload", 1.5)
+    summary = injector.summary()
+    assert summary["recovery_s"] == {"S3 Upload": [1.5]}
+    assert [what for _, what in summary["injected_at"]] == ["S3 Upload latency 2s", "S3 Upload timeout 3s",
+                                                           "S3 Upload error"]
+
+
+def test_demo_faults():
+    docs = [{"file_name": "a.pdf"}, {"file_name": "FAIL.pdf"}]
+    assert [f.stage for f in demo_faults(docs, n_ingest=2)] == ["Credit AI Invocation"]
+    assert [f.stage for f in demo_faults(docs[:1], n_ingest=5)] == ["Async DB Ingestion"]
@@ -0,0 +1,75 @@
+import sqlite3
+import time
+
+import pytest
+
+from ingest_writer import IngestError, IngestWriter, extract_chunks
+
+DOC = {"file_name": "a.pdf", "document_type": "10K", "business_date": "2024", "data": "JVBERi0xLjQK" * 400}
+
+
+class Stop(BaseException):
+    """Kills the flusher thread, like an interpreter shutdown would."""
+
+
+def wait_committed(writer, ticket):
+    assert writer.flush(timeout=5)
+    return writer.committed(ticket)
+
+
+def test_buffered_rows_are_committed(tmp_path):
+    path = tmp_path / "ingest.sqlite3"
+    writer = IngestWriter(str(path), flush_every=0.01)
+    chunks = extract_chunks(DOC)
+    ticket = writer.write(DOC, "h1", chunks)
+    assert wait_committed(writer, ticket)
+    db = sqlite3.connect(path)
+    assert db.execute("SELECT COUNT(*) FROM chunks WHERE sha256 = 'h1'").fetchone()[0] == len(chunks)
+    assert db.execute("SELECT chunks FROM documents").fetchone()[0] == len(chunks)
+
+
+def test_document_without_bytes_is_rejected(tmp_path):
+    record = {k: v for k, v in DOC.items() if k != "data"}
+    with pytest.raises(IngestError):
+        extract_chunks(record)
+    with pytest.raises(IngestError):
+        IngestWriter(str(tmp_path / "ingest.sqlite3")).write({**record, "sha256": "h1"}, "h1", ["text"])
+
+
+def test_failing_flush_surfaces_and_recovers(tmp_path):
+    blocker = tmp_path / "not-a-dir"
+    blocker.write_text("")
+    writer = IngestWriter(str(blocker / "ingest.sqlite3"), flush_every=0.01)
+    ticket = writer.write(DOC, "h1", extract_chunks(DOC))
+    with pytest.raises(IngestError, match="batch write failed"):
+        writer.flush(timeout=5)
+    assert writer.stats["errors"] >= 1
+    # the rows were kept: once the database can be opened, the retry commits them
+    blocker.unlink()
+    blocker.mkdir()
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        try:
+            if writer.committed(ticket):
+                break
+        except IngestError:     # until the next retry succeeds
+            pass
+        time.sleep(0.01)
+    assert writer.committed(ticket)
+
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_dead_flusher_fails_writers(tmp_path):
+    writer = IngestWriter(str(tmp_path / "ingest.sqlite3"), flush_every=0.01)
+
+    def stop(db, docs, chunks):
+        raise Stop()
+
+    writer._write_batch = stop
+    ticket = writer.write(DOC, "h1", extract_chunks(DOC))
+    writer._thread.join(5)
+    assert not writer._thread.is_alive()
+    with pytest.raises(IngestError, match="stopped"):
+        writer.committed(ticket)
+    with pytest.raises(IngestError, match="stopped"):
+        writer.write(DOC, "h2", extract_chunks(DOC))
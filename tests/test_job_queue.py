@@ -0,0 +1,96 @@
+import os
+
+import pytest
+
+from job_queue import JobQueue, ReviewLeased, inputs_hash
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def queue(tmp_path, clock):
+    return JobQueue(str(tmp_path / "queue" / "jobs.sqlite3"), lease_seconds=30, clock=clock)
+
+
+def test_database_is_created_on_first_use(tmp_path):
+    path = tmp_path / "queue" / "jobs.sqlite3"
+    q = JobQueue(str(path))
+    assert not path.exists()
+    q.load()
+    assert path.exists()
+
+
+def test_claim_leases_a_task_once(queue):
+    job_id, resumed = queue.open_review("RP1", "R1", inputs_hash(["a", "b"]), "w1")
+    assert not resumed
+    queue.add_tasks(job_id, "Async DB Ingestion", ["a.pdf", "b.pdf"])
+    first = queue.claim("w1", job_id=job_id, key="a.pdf")
+    assert [t["key"] for t in first] == ["a.pdf"]
+    assert queue.claim("w2", job_id=job_id, key="a.pdf") == []
+    task = queue.task(job_id, "Async DB Ingestion", "a.pdf")
+    assert (task["state"], task["owner"]) == ("leased", "w1")
+    assert queue.task(job_id, "Async DB Ingestion", "missing.pdf") is None
+
+
+def test_expired_lease_is_claimed_again(queue, clock):
+    job_id, _ = queue.open_review("RP1", "R1", "inputs", "w1")
+    queue.add_tasks(job_id, "Credit AI Invocation", ["ABL"])
+    [task] = queue.claim("w1", job_id=job_id)
+    clock.now += 31
+    [again] = queue.claim("w2", job_id=job_id)
+    assert again["task_id"] == task["task_id"]
+    assert again["attempts"] == 2
+    assert queue.stats["expired"] == 1
+    # the worker that lost its lease cannot record a result any more
+    assert not queue.complete(task["task_id"], "w1", {"text": "late"})
+    assert queue.complete(task["task_id"], "w2", {"text": "ok"})
+    assert queue.results(job_id, "Credit AI Invocation") == {"ABL": {"text": "ok"}}
+
+
+def test_heartbeat_keeps_leases_alive(queue, clock):
+    job_id, _ = queue.open_review("RP1", "R1", "inputs", "w1")
+    queue.add_tasks(job_id, "Credit AI Invocation", ["ABL"])
+    queue.claim("w1", job_id=job_id)
+    clock.now += 20
+    assert queue.heartbeat("w1")
+    clock.now += 20
+    assert queue.claim("w2", job_id=job_id) == []
+
+
+def test_live_review_is_not_opened_twice_and_resumes_after_expiry(queue, clock):
+    job_id, _ = queue.open_review("RP1", "R1", "inputs", "w1")
+    queue.add_tasks(job_id, "Async DB Ingestion", ["a.pdf", "b.pdf"])
+    [task] = queue.claim("w1", job_id=job_id, key="a.pdf")
+    queue.complete(task["task_id"], "w1", {"chunks": 8})
+    queue.claim("w1", job_id=job_id, key="b.pdf")
+    with pytest.raises(ReviewLeased):
+        queue.open_review("RP1", "R1", "inputs", "w2")
+
+    clock.now += 31
+    resumed_id, resumed = queue.open_review("RP1", "R1", "inputs", "w2")
+    assert (resumed_id, resumed) == (job_id, True)
+    assert queue.results(job_id, "Async DB Ingestion") == {"a.pdf": {"chunks": 8}}
+    assert queue.task(job_id, "Async DB Ingestion", "b.pdf")["state"] == "pending"
+
+
+def test_finished_review_starts_a_new_job(queue):
+    job_id, _ = queue.open_review("RP1", "R1", "inputs", "w1")
+    assert queue.finish_review(job_id, "w1", "done")
+    new_id, resumed = queue.open_review("RP1", "R1", "inputs", "w1")
+    assert new_id != job_id and not resumed
+
+
+def test_relative_path_is_made_absolute(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert JobQueue("jobs.sqlite3").path == os.path.join(str(tmp_path), "jobs.sqlite3")
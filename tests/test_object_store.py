@@ -0,0 +1,80 @@
+import hashlib
+import os
+
+import pytest
+
+from object_store import DocumentUploader, LocalObjectStore, NoSuchKey, document_key, open_document
+
+DATA = os.urandom(50_000)
+KEY = document_key(hashlib.sha256(DATA).hexdigest())
+
+
+class FlakyStore(LocalObjectStore):
+    """Drops the connection on every upload_part after the first `fail_after`."""
+
+    def __init__(self, root, fail_after):
+        super().__init__(root)
+        self.fail_after = fail_after
+        self.parts = 0
+
+    def upload_part(self, **kwargs):
+        self.parts += 1
+        if self.parts > self.fail_after:
+            raise ConnectionError("connection reset")
+        return super().upload_part(**kwargs)
+
+
+class Boto3Shaped(LocalObjectStore):
+    """Omits empty Uploads / Parts lists, as boto3 does."""
+
+    def list_multipart_uploads(self, **kwargs):
+        response = super().list_multipart_uploads(**kwargs)
+        return response if response["Uploads"] else {}
+
+    def list_parts(self, **kwargs):
+        response = super().list_parts(**kwargs)
+        return response if response["Parts"] else {}
+
+
+def test_small_document_is_put_once_and_deduped(tmp_path):
+    store = LocalObjectStore(str(tmp_path))
+    uploader = DocumentUploader(store, "docs")
+    first = uploader.upload(KEY, DATA)
+    assert (first["sent"], first["parts"], first["deduped"]) == (len(DATA), 0, False)
+    assert uploader.upload(KEY, DATA)["deduped"]
+    body = open_document(KEY.split("/")[1], store, "docs")
+    with body:
+        assert body.read() == DATA
+    with pytest.raises(NoSuchKey):
+        store.head_object(Bucket="docs", Key=document_key("0" * 64))
+
+
+def test_multipart_upload_has_an_s3_etag(tmp_path):
+    store = Boto3Shaped(str(tmp_path))
+    result = DocumentUploader(store, "docs", threshold=10_000, part_size=10_000, workers=3).upload(KEY, DATA)
+    assert (result["parts"], result["resumed_parts"], result["sent"]) == (5, 0, len(DATA))
+    head = store.head_object(Bucket="docs", Key=KEY)
+    assert head["ContentLength"] == len(DATA) and head["ETag"].endswith('-5"')
+    assert not os.listdir(tmp_path / ".multipart")
+
+
+def test_interrupted_upload_resumes_with_the_parts_it_holds(tmp_path):
+    flaky = FlakyStore(str(tmp_path), fail_after=2)
+    with pytest.raises(ConnectionError):
+        DocumentUploader(flaky, "docs", threshold=10_000, part_size=10_000, workers=1).upload(KEY, DATA)
+    store = LocalObjectStore(str(tmp_path))
+    result = DocumentUploader(store, "docs", threshold=10_000, part_size=10_000, workers=2).upload(KEY, DATA)
+    assert result["resumed_parts"] == 2 and result["sent"] == len(DATA) - 20_000
+    with store.get_object(Bucket="docs", Key=KEY)["Body"] as body:
+        assert body.read() == DATA
+
+
+def test_complete_rejects_a_part_that_does_not_match(tmp_path):
+    store = LocalObjectStore(str(tmp_path))
+    upload_id = store.create_multipart_upload(Bucket="docs", Key=KEY)["UploadId"]
+    store.upload_part(Bucket="docs", Key=KEY, UploadId=upload_id, PartNumber=1, Body=b"abc")
+    with pytest.raises(ValueError):
+        store.complete_multipart_upload(Bucket="docs", Key=KEY, UploadId=upload_id,
+                                        MultipartUpload={"Parts": [{"PartNumber": 1, "ETag": '"nope"'}]})
+    store.abort_multipart_upload(Bucket="docs", Key=KEY, UploadId=upload_id)
+    assert store.list_multipart_uploads(Bucket="docs")["Uploads"] == []
@@ -0,0 +1,56 @@
+from result_cache import ResultCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = ResultCache(ttl=10, clock=clock)
+    cache.put("k", {"text": "v"}, etag='"1"')
+    assert cache.get("k") == {"text": "v"}
+    clock.now = 10
+    assert cache.get("k") is None
+    entry = cache.lookup("k")       # expired entries stay around for revalidation
+    assert entry["etag"] == '"1"' and not cache.is_fresh(entry)
+    assert cache.stats["stale"] == 2
+
+
+def test_refresh_on_not_modified_extends_the_entry():
+    clock = FakeClock()
+    cache = ResultCache(ttl=10, clock=clock)
+    cache.put("k", "v", etag='"1"')
+    clock.now = 15
+    entry = cache.refresh("k")
+    assert entry["value"] == "v" and entry["etag"] == '"1"'
+    assert entry["expires_at"] == 25
+    assert cache.get("k") == "v"
+    assert cache.refresh("missing") is None
+    assert cache.stats["refreshes"] == 1
+
+
+def test_least_recently_used_is_evicted():
+    cache = ResultCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.stats["evictions"] == 1
+
+
+def test_disk_tier_repromotes_and_invalidates(tmp_path):
+    cache = ResultCache(disk_dir=str(tmp_path))
+    cache.put(("RP1", "R1", "ABL"), {"text": "v"}, etag='"1"')
+    cache.clear()
+    assert cache.get(("RP1", "R1", "ABL")) == {"text": "v"}
+    assert cache.stats["disk_hits"] == 1
+    cache.invalidate(("RP1", "R1", "ABL"))
+    cache.clear()
+    assert cache.lookup(("RP1", "R1", "ABL")) is None
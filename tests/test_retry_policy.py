@@ -0,0 +1,103 @@
+import pytest
+
+from cancellation import Cancelled
+from retry_policy import CircuitBreaker, CircuitOpenError, RetryPolicy, RetryStats, run_with_retry
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def open_breaker(clock):
+    breaker = CircuitBreaker(threshold=2, reset_after=10.0, clock=clock)
+    breaker.record(False)
+    breaker.record(False)
+    return breaker
+
+
+def run(fn, breaker, **policy):
+    return run_with_retry("test", fn, policy=RetryPolicy(backoff_base=0, **policy), breaker=breaker,
+                          sleep=lambda s: None, stats=RetryStats())
+
+
+def test_breaker_opens_after_threshold_and_rejects():
+    clock = FakeClock()
+    breaker = open_breaker(clock)
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    assert breaker.stats == {"opened": 1, "rejected": 1, "probes": 0}
+
+
+def test_half_open_lets_one_probe_through():
+    clock = FakeClock()
+    breaker = open_breaker(clock)
+    clock.now = 10.0
+    assert breaker.state == "half-open"
+    assert breaker.allow()
+    assert not breaker.allow()      # the probe is still in flight
+    breaker.record(True)
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_failed_probe_reopens():
+    clock = FakeClock()
+    breaker = open_breaker(clock)
+    clock.now = 10.0
+    assert breaker.allow()
+    breaker.record(False)
+    assert breaker.state == "open"
+    clock.now = 19.0
+    assert not breaker.allow()
+    clock.now = 20.0
+    assert breaker.allow()
+
+
+def test_cancelled_probe_frees_the_slot():
+    clock = FakeClock()
+    breaker = open_breaker(clock)
+    clock.now = 10.0
+
+    def cancelled(attempt):
+        raise Cancelled("test")
+
+    with pytest.raises(Cancelled):
+        run(cancelled, breaker)
+    assert breaker.state == "half-open"
+    assert run(lambda attempt: "ok", breaker) == "ok"
+    assert breaker.state == "closed"
+
+
+def test_non_retryable_error_frees_the_probe():
+    clock = FakeClock()
+    breaker = open_breaker(clock)
+    clock.now = 10.0
+
+    def fails(attempt):
+        raise KeyError("not retried")
+
+    with pytest.raises(KeyError):
+        run(fails, breaker, retry_on=(ValueError,))
+    assert breaker.allow()
+
+
+def test_retry_recovers_and_open_circuit_rejects():
+    breaker = CircuitBreaker(threshold=5)
+    attempts = []
+
+    def flaky(attempt):
+        attempts.append(attempt)
+        if attempt < 3:
+            raise ValueError("transient")
+        return attempt
+
+    assert run(flaky, breaker, max_attempts=3) == 3
+    assert attempts == [1, 2, 3]
+
+    clock = FakeClock()
+    with pytest.raises(CircuitOpenError):
+        run(lambda attempt: "never", open_breaker(clock))
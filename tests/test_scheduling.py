@@ -0,0 +1,66 @@
+import pytest
+
+from scheduling import RUN_POLICIES, BoundedQueue, Job, StageHistory, WorkerPool, make_policy
+
+
+def pool_order(policy, jobs, now=10.0):
+    pool = WorkerPool(policy, workers=len(jobs))
+    for job in jobs:
+        pool.enqueue(job, job.arrival)
+    return [job.job_id for job in pool.assign(now)]
+
+
+def test_stage_history_learns_per_intent_and_stage():
+    history = StageHistory([1.0, 2.0], alpha=0.5)
+    assert history.expected("ABL", 1) == 2.0
+    history.observe("ABL", 1, 4.0)
+    history.observe("ABL", 1, 2.0)
+    assert history.expected("ABL", 1) == 3.0
+    assert history.expected_remaining("ABL", 0) == 4.0
+    assert history.expected("Business Description", 1) == 2.0
+
+
+def test_policies_rank_queued_jobs():
+    history = StageHistory([1.0, 1.0])
+    history.observe("long", 0, 5.0)
+    jobs = [Job("a", "long", arrival=1.0, priority=0, deadline=30.0),
+            Job("b", "short", arrival=2.0, priority=2, deadline=None),
+            Job("c", "short", arrival=3.0, priority=1, deadline=20.0)]
+    assert pool_order(make_policy("fifo"), jobs) == ["a", "b", "c"]
+    assert pool_order(make_policy("sejf", history=history), jobs) == ["b", "c", "a"]
+    assert pool_order(make_policy("priority"), jobs) == ["b", "c", "a"]
+    assert pool_order(make_policy("deadline"), jobs) == ["c", "a", "b"]
+    with pytest.raises(ValueError):
+        make_policy("random")
+    # a run's pool holds one review's payloads, which all share its priority
+    with pytest.raises(ValueError):
+        make_policy("priority", allowed=RUN_POLICIES)
+
+
+def test_pool_respects_workers_and_the_admit_gate():
+    pool = WorkerPool(make_policy("fifo"), workers=2, admit=lambda job: job.intent != "gated")
+    for i, intent in enumerate(["gated", "x", "y", "z"]):
+        pool.enqueue(Job(i, intent, arrival=i), i)
+    assert [j.job_id for j in pool.assign(5.0)] == [1, 2]
+    assert pool.assign(5.0) == []
+    pool.release()
+    assert [j.job_id for j in pool.assign(6.0)] == [3]
+    assert pool.queue_depth == 1 and pool.queued_at(0) == 1
+    assert pool.drain() == 3 and pool.busy == 0 and pool.queue_depth == 0
+
+
+def test_bounded_queue_blocks_or_sheds_when_full():
+    blocking = BoundedQueue("payloads", 2)
+    assert blocking.offer(1) and blocking.offer(2) and blocking.full
+    assert not blocking.offer(3)
+    assert blocking.stats["refused"] == 1 and len(blocking) == 2
+    assert blocking.take() == 1 and blocking.offer(3)
+    assert blocking.stats["peak"] == 2
+
+    shedding = BoundedQueue("payloads", 1, overflow="shed")
+    shedding.offer("a")
+    assert not shedding.offer("b") and shedding.stats["shed"] == 1
+    with pytest.raises(ValueError):
+        BoundedQueue("payloads", 0)
+    with pytest.raises(ValueError):
+        BoundedQueue("payloads", 1, overflow="drop")
@@ -0,0 +1,44 @@
+import threading
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_execution():
+    flight, started, release = SingleFlight(), threading.Event(), threading.Event()
+    calls = []
+
+    def slow(x):
+        calls.append(x)
+        started.set()
+        release.wait(5)
+        return x * 2
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("k", slow, 21)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flight.do("k", slow, 21))) for _ in range(3)]
+    for t in followers:
+        t.start()
+    while flight.stats["shared"] < 3:
+        threading.Event().wait(0.01)
+    release.set()
+    for t in [leader, *followers]:
+        t.join(5)
+    assert results == [42] * 4 and calls == [21]
+    assert flight.stats == {"executed": 1, "shared": 3}
+    assert flight.in_flight() == 0
+
+
+def test_errors_reach_every_caller_and_the_key_is_forgotten():
+    flight = SingleFlight()
+
+    def boom():
+        raise ValueError("down")
+
+    with pytest.raises(ValueError):
+        flight.do("k", boom)
+    assert flight.do("k", lambda: "fresh") == "fresh"
+    assert flight.stats["executed"] == 2
@@ -0,0 +1,38 @@
+import os
+
+from stylesheet import build_stylesheet, merge_css, minify_css, stylesheet_tag, write_stylesheet
+
+
+def test_minify_strips_tags_comments_and_whitespace():
+    css = "<style>\n/* card */\n.card {\n  color : red ;\n  margin: 0 ! important;\n}\n</style>"
+    assert minify_css(css) == ".card{color : red;margin: 0!important}"
+
+
+def test_merge_keeps_the_last_duplicate_rule_in_cascade_order():
+    blocks = [".a{color:red}.b{color:blue}", ".a{color:red}", "@media (max-width:600px){.a{color:red}}"]
+    assert merge_css(blocks) == ".b{color:blue}.a{color:red}@media (max-width:600px){.a{color:red}}"
+
+
+def test_merge_drops_repeated_declarations_and_stray_braces():
+    assert merge_css([".a{color : #fff;color:#fff}}.b{top:0}"]) == ".a{color:#fff}.b{top:0}"
+
+
+def test_digest_follows_content():
+    css, digest = build_stylesheet([".a{color:red}"])
+    assert build_stylesheet(["/* same */ .a { color: red }"]) == (css, digest)
+    assert build_stylesheet([".a{color:blue}"])[1] != digest
+
+
+def test_write_prunes_older_builds(tmp_path):
+    old = write_stylesheet(".a{}", "000000000000", str(tmp_path))
+    new = write_stylesheet(".b{}", "111111111111", str(tmp_path))
+    assert os.listdir(tmp_path) == [new] and old != new
+    assert (tmp_path / new).read_text() == ".b{}"
+
+
+def test_tag_links_the_hashed_file_or_inlines_it(tmp_path):
+    link = stylesheet_tag([".a{color:red}"], static_serving=True, static_dir=str(tmp_path))
+    name = os.listdir(tmp_path)[0]
+    assert link == f'<link rel="stylesheet" href="app/static/{name}">'
+    inline = stylesheet_tag([".a{color:red}"], static_serving=False, static_dir=str(tmp_path))
+    assert inline.startswith('<style data-digest="') and inline.endswith(".a{color:red}</style>")
@@ -0,0 +1,72 @@
+import threading
+
+from token_cache import TokenCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def issuer():
+    issued = []
+
+    def fetch_token():
+        issued.append(len(issued) + 1)
+        return {"access_token": f"t{len(issued)}", "expires_in": 300}
+
+    return fetch_token, issued
+
+
+def test_token_is_reused_until_the_refresh_window():
+    clock, (fetch, issued) = FakeClock(), issuer()
+    cache = TokenCache(fetch, refresh_ahead=60, skew=5, clock=clock)
+    assert cache.headers() == {"Authorization": "Bearer t1"}
+    clock.now = 200
+    assert cache.token() == "t1"
+    assert issued == [1] and cache.stats["blocked_calls"] == 1
+
+
+def test_refresh_ahead_serves_the_old_token_while_fetching():
+    clock, (fetch, issued) = FakeClock(), issuer()
+    cache = TokenCache(fetch, refresh_ahead=60, skew=5, clock=clock)
+    cache.token()
+    clock.now = 250                     # inside the window: expires at 295
+    assert cache.token() == "t1"
+    for t in [t for t in threading.enumerate() if t.name == "token-refresh"]:
+        t.join(5)
+    assert cache.token() == "t2"
+    assert cache.stats["background_refreshes"] == 1 and cache.stats["blocked_calls"] == 1
+
+
+def test_expired_or_invalidated_token_blocks_for_a_new_one():
+    clock, (fetch, issued) = FakeClock(), issuer()
+    cache = TokenCache(fetch, refresh_ahead=0, skew=5, clock=clock)
+    cache.token()
+    clock.now = 295
+    assert cache.token() == "t2"
+    cache.invalidate()
+    assert cache.token() == "t3"
+    assert cache.stats["invalidations"] == 1 and cache.stats["blocked_calls"] == 3
+
+
+def test_failed_background_refresh_keeps_the_current_token():
+    clock = FakeClock()
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) > 1:
+            raise ConnectionError("issuer down")
+        return {"access_token": "t1", "expires_in": 300}
+
+    cache = TokenCache(flaky, refresh_ahead=60, skew=0, clock=clock)
+    cache.token()
+    clock.now = 250
+    assert cache.token() == "t1"
+    for t in [t for t in threading.enumerate() if t.name == "token-refresh"]:
+        t.join(5)
+    assert cache.token() == "t1" and len(calls) >= 2
@@ -0,0 +1,69 @@
+from section_coverage import SECTION_COVERAGE
+from trigger_rules import TRIGGER_RULES, AllOf, AnyOf, HasType, Latest, TriggerEvaluator, rules_from_coverage
+
+
+def doc(doc_type, date="2024", name=None):
+    return {"file_name": name or f"{doc_type}-{date}.pdf", "document_type": doc_type, "business_date": date}
+
+
+def test_rules_follow_section_coverage():
+    rules = rules_from_coverage()
+    assert set(rules) == set(SECTION_COVERAGE)
+    for section, types in SECTION_COVERAGE.items():
+        for t in types:
+            d = doc(t)
+            assert rules[section].satisfied([d], [d])
+        other = doc("Unrelated")
+        assert not rules[section].satisfied([other], [other])
+    assert rules["Recent Developments"].describe() == "latest 10Q or latest Earnings"
+
+
+def test_explicit_rules_take_precedence_over_coverage():
+    memo = doc("Underwriting Memo")
+    trigger = TriggerEvaluator(["ABL", "Business Description"], [memo])
+    assert trigger.rule_for("ABL").describe() == "Field Exam or Inventory Appraisal"
+    # The memo is covered by both sections but satisfies neither requirement
+    assert trigger.on_ingested(memo) == []
+    assert sorted(trigger.unsatisfiable()) == ["ABL", "Business Description"]
+
+
+def test_coverage_is_the_fallback_for_intents_without_a_rule():
+    memo = doc("Underwriting Memo")
+    trigger = TriggerEvaluator(["ABL", "Credit Memo"], [memo], rules={}, fallback=rules_from_coverage())
+    assert trigger.on_ingested(memo) == ["ABL", "Credit Memo"]
+    assert set(TRIGGER_RULES) == set(SECTION_COVERAGE)
+
+
+def test_latest_needs_the_most_recent_document():
+    old, new = doc("10Q", "Q12024"), doc("10Q", "Q32024")
+    rule = Latest("10Q")
+    assert not rule.satisfied([old], [old, new])
+    assert rule.satisfied([new], [old, new])
+
+
+def test_composed_rules():
+    rule = AllOf(AnyOf("10K", "10Q"), HasType("Field Exam"))
+    assert rule.describe() == "(10K or 10Q) and Field Exam"
+    assert not rule.satisfied([doc("10K")], [])
+    assert rule.satisfied([doc("10Q"), doc("Field Exam")], [])
+
+
+def test_intents_fire_as_their_documents_are_ingested():
+    docs = [doc("Field Exam"), doc("10K")]
+    trigger = TriggerEvaluator(["Business Description", "ABL", "Recent Developments"], docs)
+    assert trigger.ready() == []
+    assert trigger.unsatisfiable() == ["Recent Developments"]
+    assert trigger.on_ingested(docs[0]) == ["ABL"]
+    assert trigger.on_ingested(docs[1]) == ["Business Description"]
+    assert trigger.finish() == ["Recent Developments"]
+    assert trigger.dispatched[-1] == ("Recent Developments", "ingest complete")
+
+
+def test_affected_section_waits_for_its_delta_documents():
+    kept, changed = doc("10K", name="kept.pdf"), doc("Underwriting Memo", name="memo.pdf")
+    trigger = TriggerEvaluator(["Business Description", "ABL"], [kept, changed], ingested=[kept], delta=[changed])
+    # Business Description is satisfied by the kept 10K but was re-planned because of the memo
+    assert trigger.waiting_on("Business Description") == [changed]
+    assert trigger.ready() == []
+    assert trigger.on_ingested(changed) == ["Business Description"]
+    assert trigger.finish() == ["ABL"]     # a memo alone does not meet ABL's requirement
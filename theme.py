@@ -0,0 +1,496 @@
+from simulation import AI_NODES
+
+# ===============================
+# THEME / COLORS (GS palette)
+# ===============================
+
+PRIMARY        = "#7297C5"
+PRIMARY_DARK   = "#4F79B1"
+PRIMARY_LIGHT  = "#AFC3E1"
+BG_TOP         = "#F7FAFF"
+BG_MID         = "#EFF4FB"
+BG_BOTTOM      = "#E6EFFA"
+TEXT_DARK      = "#16324A"
+ERROR          = "#E74C3C"
+PENDING        = "#98A6B3"
+SUCCESS        = "#34C759"
+PROGRESS       = "#F4C542"
+
+FORM_CARD_CSS = """
+<style>
+/* --- Review page: hide rogue unlabeled TextInput (prevents blank full-width pill) --- */
+.form-card [data-testid="stTextInput"]:has([data-testid="stWidgetLabel"] p:empty) {
+  display: none !important;
+  margin: 0 !important;
+  padding: 0 !important;
+  border: 0 !important;
+}
+/* Be safe: if the label exists but is whitespace-only, hide it too */
+.form-card [data-testid="stWidgetLabel"] p:empty { display:none !important; }
+</style>
+"""
+
+LANE_BASE_CSS = f""" 
+<style>
+.board {{
+  background: rgba(255, 255, 255, 0.98);
+  border: 1px solid rgba(22, 50, 74, 0.08);
+  border-radius: 16px;
+  box-shadow: 0 8px 24px rgba(22, 50, 74, 0.08);
+  padding: 14px 16px;
+}}
+.group-title {{
+  font-weight: 800; color: {PRIMARY}; margin: 4px 0 8px 4px; letter-spacing: .2px;
+}}
+.lane {{
+  display: flex; align-items: center; gap: 14px; flex-wrap: nowrap;
+  overflow-x: auto; padding: 10px 8px 14px 8px; border-radius: 12px;
+  background: #FAFDFF; border: 1px dashed rgba(79, 121, 177, 0.18);
+}}
+.node-wrap {{ position: relative; display: inline-block; }}
+.node-pill {{
+  flex-shrink: 0; min-width: 160px; text-align: center; white-space: nowrap;
+  padding: 10px 14px; border-radius: 999px; font-weight: 700; color: #173044;
+  background: #EEF3F7; border: 1px solid rgba(25, 53, 74, 0.08);
+  transition: background-color .6s ease, box-shadow .6s ease, border-color .6s ease, color .6s ease;
+}}
+.node-pill.pending  {{ background: #EEF3F7; color: #41515C; }}
+.node-pill.progress {{ background: {PROGRESS}; color: #132C3C; }}
+.node-pill.success  {{ background: {SUCCESS};  color: #06220E;  }}
+
+.arrow-flex {{
+  flex: 1 1 0; display: flex; align-items: center; justify-content: center;
+  min-width: 24px; font-size: 22px; color: rgba(60,84,96,0.65); user-select: none;
+}}
+.arrow-back {{ color:#E74C3C; text-shadow:0 0 8px rgba(231,76,60,0.22); }}
+.arrow-back.pulse {{ animation: backpulse .9s ease-in-out infinite; }}
+
+@keyframes backpulse {{
+  0%   {{ transform: translateY(0); }}
+  50%  {{ transform: translateY(-1px); }}
+  100% {{ transform: translateY(0); }}
+}}
+</style>
+"""
+
+BADGES_AND_EVENTS_CSS = f"""
+<style>
+/* Anchor badges to each pill */
+.node-wrap {{ position: relative; display: inline-block; }}
+
+.retry-badge {{
+  position: absolute; top: -8px; right: -8px;
+  background: {ERROR}; color: #fff; font-weight: 800;
+  border-radius: 10px; padding: 2px 6px; font-size: 11px; line-height: 1;
+  box-shadow: 0 4px 10px rgba(231,76,60,0.28);
+}}
+
+.retry-scar {{
+  position: absolute; top: -6px; right: -6px;
+  width: 10px; height: 10px; border-radius: 50%;
+  background: #A8B6C8; box-shadow: 0 0 0 2px rgba(168,182,200,0.25);
+}}
+
+/* Row of event chips under the lane */
+.event-row {{ margin: 6px 2px 0; display: flex; gap: 8px; flex-wrap: wrap; }}
+.event-chip {{
+  background:#F3F7FD; color:#435768; border:1px solid rgba(22,50,74,0.10);
+  padding: 4px 8px; border-radius: 999px; font-size:12px; font-weight:700;
+}}
+.event-chip .red   {{ color: {ERROR}; }}
+.event-chip .green {{ color: #2E7D32; }}
+</style>
+"""
+
+STATUS_PILL_RETRY_CSS = """
+<style>
+/* Make "Retrying…" pills red (card-level only) */
+.status-pill.retrying { background:#E74C3C; color:#ffffff; }
+.status-pill.error    { background:#E74C3C; color:#ffffff; }
+</style>
+"""
+
+PILL_PULSE_CSS = """
+<style>
+/* Soft pulse for in-progress lane nodes (affects both pipelines) */
+@keyframes pillPulse {
+  0%   { transform: translateZ(0) scale(1.00); box-shadow: 0 0 0 0 rgba(255,149,0,.35); }
+  50%  { transform: translateZ(0) scale(1.035); box-shadow: 0 0 0 7px rgba(255,149,0,.10); }
+  100% { transform: translateZ(0) scale(1.00); box-shadow: 0 0 0 0 rgba(255,149,0,0); }
+}
+.node-pill.progress {
+  animation: pillPulse 1.25s ease-in-out infinite;
+  will-change: transform, box-shadow;
+  border-color: rgba(255,149,0,.55);
+}
+
+/* If you ever mark a lane node as "retrying", give it the same pulse */
+.node-pill.retrying {
+  animation: pillPulse 1.25s ease-in-out infinite;
+  will-change: transform, box-shadow;
+}
+
+/* Respect reduced motion prefs */
+@media (prefers-reduced-motion: reduce) {
+  .node-pill.progress,
+  .node-pill.retrying { animation: none; }
+}
+</style>
+"""
+
+GLOBAL_CSS = f"""
+<style>
+/* Force light background even if Streamlit is in dark mode */
+[data-testid="stAppViewContainer"] {{
+  background: linear-gradient(135deg, {BG_TOP} 0%, {BG_MID} 45%, {BG_BOTTOM} 100%);
+}}
+[data-testid="stHeader"] {{ background: transparent; }}
+.block-container {{ padding-top: 0 !important; padding-bottom: 0 !important; }}
+
+/* Hero */
+.hero-wrap {{
+  padding: 10vh 0 2vh;   /* not full-height → leaves room for buttons */
+  display: block;
+}}
+.hero {{
+  width: min(920px, 92vw);
+  margin: 0 auto;
+  background: rgba(255,255,255,0.98);
+  border: 1px solid rgba(22,50,74,0.08);
+  border-radius: 18px;
+  box-shadow: 0 16px 40px rgba(22,50,74,0.10);
+  padding: 36px 36px 24px 36px;
+  text-align: center;
+}}
+.hero h1 {{ margin: 0 0 10px; color: {TEXT_DARK}; font-weight: 800; }}
+.hero p  {{ margin: 0; color: #435768; }}
+
+/* Button row right under the hero */
+.btn-wrap {{
+  width: min(920px, 92vw);
+  margin: 14px auto 0 auto;
+  display: flex; gap: 14px; justify-content: center;
+}}
+
+.primary-btn button {{
+  background: linear-gradient(135deg, {PRIMARY} 0%, {PRIMARY_DARK} 100%) !important;
+  color: #fff !important; border: 0 !important;
+  padding: 0.9rem 1.4rem !important;
+  border-radius: 12px !important; font-weight: 800 !important;
+  box-shadow: 0 10px 22px rgba(79,121,177,0.28);
+}}
+.primary-btn button:hover {{
+  transform: translateY(-2px) scale(1.02);
+  box-shadow: 0 14px 26px rgba(79,121,177,0.36);
+}}
+.secondary-btn button {{
+  background: transparent !important; color: {PRIMARY_DARK} !important;
+  border: 2px solid {PRIMARY_DARK} !important;
+  padding: 0.85rem 1.25rem !important; border-radius: 12px !important; font-weight: 800 !important;
+}}
+.secondary-btn button:hover {{
+  transform: translateY(-2px) scale(1.02);
+  background: {PRIMARY_LIGHT}22 !important;
+  border-color: {PRIMARY} !important;
+}}
+</style>
+"""
+UPLOAD_CSS = f"""
+<style>
+/* Force light app background even in dark mode */
+[data-testid="stAppViewContainer"] {{
+  background: linear-gradient(135deg, #F7FAFF 0%, #EFF4FB 45%, #E6EFFA 100%);
+}}
+[data-testid="stHeader"] {{ background: transparent; }}
+
+/* -------- Inputs: text + select -------- */
+[data-testid="stTextInput"] input,
+[data-testid="stSelectbox"] [role="combobox"],
+[data-testid="stDateInput"] input {{
+  background: #FFFFFF !important;
+  color: {TEXT_DARK} !important;
+  border: 1.5px solid {PRIMARY_LIGHT} !important;
+  border-radius: 12px !important;
+  padding: 10px 12px !important;
+  box-shadow: 0 1px 2px rgba(22,50,74,0.06) inset;
+}}
+/* Labels */
+[data-testid="stWidgetLabel"] > p {{
+  color: {TEXT_DARK} !important;
+  font-weight: 700 !important;
+}}
+
+/* -------- File uploader -------- */
+[data-testid="stFileUploaderDropzone"] {{
+  background: #FFFFFF !important;
+  border: 2px dashed {PRIMARY_LIGHT} !important;
+  color: {TEXT_DARK} !important;
+  border-radius: 14px !important;
+}}
+[data-testid="stFileUploaderDropzone"]:hover {{
+  border-color: {PRIMARY} !important;
+  background: {PRIMARY_LIGHT}11 !important;
+}}
+[data-testid="stFileUploaderFile"] p {{
+  color: {TEXT_DARK} !important;
+}}
+
+/* -------- Expander per-doc card -------- */
+[data-testid="stExpander"] details {{
+  background: #FFFFFF !important;
+  border: 1px solid rgba(22,50,74,0.10) !important;
+  border-radius: 14px !important;
+  box-shadow: 0 6px 16px rgba(22,50,74,0.06);
+}}
+[data-testid="stExpander"] summary {{
+  color: {TEXT_DARK} !important;
+  font-weight: 700 !important;
+}}
+[data-testid="stExpander"] svg {{ color: {PRIMARY_DARK} !important; }}
+
+/* -------- Buttons (kills Streamlit red) -------- */
+.stButton > button {{
+  background: linear-gradient(135deg, {PRIMARY} 0%, {PRIMARY_DARK} 100%) !important;
+  color: #fff !important;
+  border: 0 !important;
+  border-radius: 12px !important;
+  padding: 0.9rem 1.2rem !important;
+  font-weight: 800 !important;
+  box-shadow: 0 8px 18px rgba(79,121,177,0.28);
+}}
+.stButton > button:hover {{
+  transform: translateY(-1px);
+  box-shadow: 0 12px 22px rgba(79,121,177,0.36);
+}}
+
+/* -------- Optional: form card wrapper -------- */
+.form-card {{
+  background: rgba(255,255,255,0.98);
+  border: 1px solid rgba(22,50,74,0.08);
+  border-radius: 18px;
+  box-shadow: 0 16px 40px rgba(22,50,74,0.10);
+  padding: 22px 20px;
+}}
+</style>
+"""
+FIX_SELECTBOX_CSS = f"""
+<style>
+/* --- Text inputs only (leave selectbox out of this) --- */
+[data-testid="stTextInput"] input,
+[data-testid="stDateInput"] input {{
+  background: #FFFFFF !important;
+  color: {TEXT_DARK} !important;
+  border: 1.5px solid {PRIMARY_LIGHT} !important;
+  border-radius: 12px !important;
+  padding: 10px 12px !important;
+  box-shadow: 0 1px 2px rgba(22,50,74,0.06) inset;
+}}
+[data-testid="stTextInput"] input:focus,
+[data-testid="stDateInput"] input:focus {{
+  outline: none !important;
+  border-color: {PRIMARY} !important;
+  box-shadow: 0 0 0 3px {PRIMARY}22 !important;
+}}
+
+/* --- Selectbox (wrapper) --- */
+[data-testid="stSelectbox"] [role="combobox"] {{
+  background: #FFFFFF !important;
+  color: {TEXT_DARK} !important;
+  border: 1.5px solid {PRIMARY_LIGHT} !important;
+  border-radius: 12px !important;
+  padding: 10px 12px !important;
+  box-shadow: 0 1px 2px rgba(22,50,74,0.06) inset;
+}}
+/* Focus ring when anything inside is focused */
+[data-testid="stSelectbox"] [role="combobox"]:focus-within {{
+  outline: none !important;
+  border-color: {PRIMARY} !important;
+  box-shadow: 0 0 0 3px {PRIMARY}22 !important;
+}}
+
+/* --- Kill the ghost inner input inside the select --- */
+[data-testid="stSelectbox"] [role="combobox"] input {{
+  background: transparent !important;
+  border: 0 !important;
+  box-shadow: none !important;
+  outline: none !important;
+  padding: 0 !important;
+  margin: 0 !important;
+  height: 24px !important;          /* keeps the control height tidy */
+  color: inherit !important;
+}}
+/* Ensure internal chips/labels don't add a background */
+[data-testid="stSelectbox"] [role="combobox"] > div {{
+  background: transparent !important;
+}}
+/* Chevron color */
+[data-baseweb="select"] svg {{
+  color: {PRIMARY_DARK} !important;
+}}
+
+/* Optional: dropdown menu styling for better contrast */
+[data-baseweb="menu"] {{
+  background: #FFFFFF !important;
+  color: {TEXT_DARK} !important;
+  border: 1px solid {PRIMARY_LIGHT} !important;
+  box-shadow: 0 10px 24px rgba(22,50,74,0.12) !important;
+  border-radius: 12px !important;
+}}
+</style>
+"""
+FIX_GHOST_SELECT_INPUT = f"""
+<style>
+/* Keep the select wrapper styled & with focus ring */
+[data-testid="stSelectbox"] [role="combobox"] {{
+  position: relative;
+  overflow: hidden;                 /* hide any inner pill corners */
+  background: #FFFFFF !important;
+  color: {TEXT_DARK} !important;
+  border: 1.5px solid {PRIMARY_LIGHT} !important;
+  border-radius: 12px !important;
+  padding: 10px 12px !important;
+  box-shadow: 0 1px 2px rgba(22,50,74,0.06) inset;
+}}
+[data-testid="stSelectbox"] [role="combobox"]:focus-within {{
+  outline: none !important;
+  border-color: {PRIMARY} !important;
+  box-shadow: 0 0 0 3px {PRIMARY}22 !important;
+}}
+
+/* Hide the internal search <input> Safari/BaseWeb renders */
+[data-testid="stSelectbox"] [role="combobox"] input,
+div[data-baseweb="select"] input {{
+  opacity: 0 !important;            /* invisible but still present */
+  width: 0 !important;
+  min-width: 0 !important;
+  height: 0 !important;
+  padding: 0 !important;
+  margin: 0 !important;
+  border: 0 !important;
+  box-shadow: none !important;
+  background: transparent !important;
+  outline: none !important;
+  caret-color: transparent !important;
+  pointer-events: none !important;  /* prevents cursor showing */
+}}
+/* Chevron color */
+[data-baseweb="select"] svg {{ color: {PRIMARY_DARK} !important; }}
+</style>
+"""
+
+FANOUT_CSS = f"""
+<style>
+/* Fan-out card */
+.fanout-card {{
+  background: rgba(255,255,255,0.98);
+  border: 1px solid rgba(22,50,74,0.08);
+  border-radius: 16px;
+  box-shadow: 0 10px 26px rgba(22,50,74,0.08);
+  padding: 14px 16px;
+  margin-top: 10px;
+}}
+.fanout-title {{
+  font-weight: 800; color: {PRIMARY}; margin: 0 0 8px 2px; letter-spacing: .2px;
+}}
+.doc-grid {{
+  display: grid;
+  grid-template-columns: repeat(auto-fit, minmax(240px, 1fr));
+  gap: 12px;
+}}
+.doc-chip {{
+  background: #FFFFFF;
+  border: 1px solid rgba(22,50,74,0.10);
+  border-radius: 14px;
+  box-shadow: 0 6px 16px rgba(22,50,74,0.06);
+  padding: 10px 12px;
+}}
+.doc-chip h5 {{
+  margin: 0 0 6px 0; font-size: 0.98rem; color: {TEXT_DARK}; white-space: nowrap; overflow: hidden; text-overflow: ellipsis;
+}}
+.doc-meta {{ color:#5d6c79; font-size: 12px; margin-top:2px; }}
+.status-pill {{
+  display: inline-block; padding: 3px 8px; border-radius: 999px; font-weight: 700; font-size: 12px; margin-top: 8px;
+}}
+.status-pill.pending  {{ background:#EEF3F7; color:#41515C; }}
+.status-pill.progress {{ background:{PROGRESS}; color:#132C3C; }}
+.status-pill.success  {{ background:{SUCCESS}; color:#06220E; }}
+.status-pill.streaming {{ background:{PROGRESS}; color:#132C3C; }}
+</style>
+"""
+OCCUPANCY_CSS = f"""
+<style>
+/* Row of occupancy dots (one cell per AI node) */
+.occ-strip {{ 
+  display: grid; grid-template-columns: repeat({len(AI_NODES)}, 1fr);
+  gap: 10px; margin: 6px 2px 8px 2px;
+}}
+.occ-cell {{
+  display: flex; justify-content: center; align-items: center; gap: 6px;
+}}
+.occ-dot {{
+  width: 8px; height: 8px; border-radius: 50%;
+  background: #dbe6f4;
+}}
+.occ-dot.on {{
+  background: {PRIMARY_DARK}; box-shadow: 0 0 0 3px rgba(79,121,177,0.18);
+}}
+
+/* Global in-flight meter (right-aligned) */
+.global-meter {{
+  display: flex; align-items: center; gap: 8px; justify-content: flex-end; margin: 2px 4px 8px;
+  color: #5d6c79; font-size: 13px;
+}}
+.gdot {{ width: 10px; height: 10px; border-radius: 50%; background: #dbe6f4; }}
+.gdot.on {{ background: {PRIMARY_DARK}; }}
+
+/* Mini 6-segment progress bar in each payload card */
+.segbar {{
+  display: grid; grid-template-columns: repeat({len(AI_NODES)},1fr); gap: 3px; margin-top: 8px;
+}}
+.seg {{
+  height: 6px; border-radius: 4px; background: #e7eef8;
+}}
+.seg.on {{ background: {PRIMARY_DARK}; }}
+</style>
+"""
+
+LANE_RETRY_CSS = f"""
+<style>
+.node-pill.error   {{ background: {ERROR}; color: #fff; }}
+.node-pill.retrying {{ background:#FACC15; color: #3A2B00;}}
+/* Curved dashed retry arrow under the lane */
+.retry-wrap {{ position: relative; height: 40px; margin: -6px 0 8px 0;}}
+.retry-svg {{ width: 100%; height: 100%;}}
+.retry-path {{ fill: none; stroke: {ERROR}; stroke-width: 3; stroke-dasharray: 6 6;opacity: .85;}}
+</style>"""
+
+CARD_DETAILS_CSS = f"""
+<style>
+.view-link {{ cursor:pointer; color:{PRIMARY_DARK}; font-weight:700; }}
+.view-link:hover {{ text-decoration: underline; }}
+.card-details {{ margin-top:6px; }}
+.card-details summary::-webkit-details-marker {{ display:none; }}
+.fulltext {{
+  margin-top:6px; background:#F7FAFF; border:1px solid rgba(22,50,74,0.10);
+  border-radius:10px; padding:10px; white-space:pre-wrap; color:{TEXT_DARK};
+  max-height:260px; overflow:auto;
+}}
+</style>
+"""
+
+# Injection order == cascade order; keep it identical to the old per-block st.markdown calls.
+APP_CSS_BLOCKS = [
+    FORM_CARD_CSS,
+    LANE_BASE_CSS,
+    BADGES_AND_EVENTS_CSS,
+    STATUS_PILL_RETRY_CSS,
+    PILL_PULSE_CSS,
+    LANE_RETRY_CSS,
+    OCCUPANCY_CSS,
+    FANOUT_CSS,
+    FIX_GHOST_SELECT_INPUT,
+    FIX_SELECTBOX_CSS,
+    UPLOAD_CSS,
+    GLOBAL_CSS,
+    CARD_DETAILS_CSS,
+]
@@ -0,0 +1,123 @@
+"""Shared bearer-token cache with refresh-ahead.
+
+One TokenCache per process serves every thread and session. A token inside its
+refresh-ahead window is still handed out while a single background thread fetches
+the next one; only a missing or expired token blocks callers, and concurrent
+blocking refreshes are coalesced into one issuer call (SingleFlight).
+
+`fetch_token()` must return {"access_token": str, "expires_in": seconds}.
+"""
+import os
+import threading
+import time
+
+from singleflight import SingleFlight
+
+AUTH_TOKEN_URL     = os.environ.get("AUTH_TOKEN_URL", "")
+AUTH_CLIENT_ID     = os.environ.get("AUTH_CLIENT_ID", "")
+AUTH_CLIENT_SECRET = os.environ.get("AUTH_CLIENT_SECRET", "")
+
+REFRESH_AHEAD = 60.0    # seconds before expiry to start a background refresh
+EXPIRY_SKEW   = 5.0     # treat tokens as expired this many seconds early (clock skew, in-flight requests)
+
+
+class TokenCache:
+    def __init__(self, fetch_token, *, refresh_ahead: float = REFRESH_AHEAD, skew: float = EXPIRY_SKEW,
+                 clock=time.time):
+        self.fetch_token = fetch_token
+        self.refresh_ahead = refresh_ahead
+        self.skew = skew
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._token = None
+        self._expires_at = 0.0
+        self._bg_running = False
+        self._flights = SingleFlight()
+        self.stats = {"fetches": 0, "background_refreshes": 0, "blocked_calls": 0, "invalidations": 0}
+
+    def token(self) -> str:
+        now = self.clock()
+        with self._lock:
+            token, expires_at = self._token, self._expires_at
+            start_bg = (
+                token is not None
+                and now < expires_at
+                and now >= expires_at - self.refresh_ahead
+                and not self._bg_running
+            )
+            if start_bg:
+                self._bg_running = True
+        if token is not None and now < expires_at:
+            if start_bg:
+                threading.Thread(target=self._background_refresh, name="token-refresh", daemon=True).start()
+            return token
+        with self._lock:
+            self.stats["blocked_calls"] += 1
+        return self._flights.do("token", self._refresh)
+
+    def headers(self) -> dict:
+        return {"Authorization": f"Bearer {self.token()}"}
+
+    def invalidate(self):
+        """Drop the cached token (e.g. the API answered 401); the next call refreshes."""
+        with self._lock:
+            self._token, self._expires_at = None, 0.0
+            self.stats["invalidations"] += 1
+
+    def _refresh(self) -> str:
+        issued_at = self.clock()
+        data = self.fetch_token()
+        token = data["access_token"]
+        expires_at = issued_at + float(data.get("expires_in", 300)) - self.skew
+        with self._lock:
+            self._token, self._expires_at = token, expires_at
+            self.stats["fetches"] += 1
+        return token
+
+    def _background_refresh(self):
+        try:
+            self._flights.do("token", self._refresh)
+            with self._lock:
+                self.stats["background_refreshes"] += 1
+        except Exception:
+            pass    # current token is still valid; the next caller retries (blocking once it expires)
+        finally:
+            with self._lock:
+                self._bg_running = False
+
+
+def http_token_fetcher(token_url: str, client_id: str, client_secret: str, *, session=None, timeout=(3.05, 10.0)):
+    """Client-credentials fetcher for `token_url` (OAuth2-style form POST)."""
+    import requests     # lazy: keeps requests off the import path
+
+    http = session or requests.Session()
+
+    def fetch_token() -> dict:
+        resp = http.post(
+            token_url,
+            data={"grant_type": "client_credentials", "client_id": client_id, "client_secret": client_secret},
+            timeout=timeout,
+        )
+        resp.raise_for_status()
+        return resp.json()
+
+    return fetch_token
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def default_token_cache():
+    """Process-wide TokenCache for AUTH_TOKEN_URL, or None when auth is not configured."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None and AUTH_TOKEN_URL:
+            _default_cache = TokenCache(http_token_fetcher(AUTH_TOKEN_URL, AUTH_CLIENT_ID, AUTH_CLIENT_SECRET))
+        return _default_cache
+
+
+def get_authenticated_headers() -> dict:
+    """Authorization header from the shared cache ({} when auth is not configured)."""
+    cache = default_token_cache()
+    return cache.headers() if cache is not None else {}
@@ -0,0 +1,163 @@
+"""Dependency-aware Trigger Evaluation.
+
+Each intent declares the documents it needs before it can be generated
+(TRIGGER_RULES). An intent without a declared rule falls back to the documents it
+covers (section_coverage.SECTION_COVERAGE). As documents finish Async DB Ingestion,
+TriggerEvaluator reports the intents whose requirements just became satisfied,
+so each generation payload is dispatched as soon as its own inputs are ready
+instead of after a fixed number of documents.
+
+Rules compose: a plain doc-type string means "any ingested document of this type",
+Latest(t) means "the most recent document of type t in the review (by business
+date) is ingested", and AnyOf / AllOf combine rules. An intent whose rule cannot be
+met by the review's documents at all is dispatched once ingestion finishes.
+
+On an incremental run the evaluator is seeded with the documents ingested before
+and given the delta (new/changed documents). A section also waits for every delta
+document it covers: it was re-planned because of them, and its result is cached
+under their hashes.
+"""
+import re
+from abc import ABC, abstractmethod
+
+from section_coverage import SECTION_COVERAGE, covers
+
+
+def business_date_key(value: str) -> tuple:
+    """Sort key for "YYYY" / "Q#YYYY" business dates (a year sorts after its quarters)."""
+    m = re.fullmatch(r"Q([1-4])(\d{4})", value or "")
+    if m:
+        return (int(m.group(2)), int(m.group(1)))
+    return (int(value), 5) if (value or "").isdigit() else (0, 0)
+
+
+class Rule(ABC):
+    @abstractmethod
+    def satisfied(self, ingested, documents) -> bool:
+        """Are the rule's documents among `ingested` (out of the review's `documents`)?"""
+
+    @abstractmethod
+    def describe(self) -> str:
+        """Short requirement shown on the lane, e.g. "10K or 10Q"."""
+
+
+class HasType(Rule):
+    def __init__(self, doc_type: str):
+        self.doc_type = doc_type
+
+    def satisfied(self, ingested, documents) -> bool:
+        return any(d.get("document_type") == self.doc_type for d in ingested)
+
+    def describe(self) -> str:
+        return self.doc_type
+
+
+class Latest(Rule):
+    def __init__(self, doc_type: str):
+        self.doc_type = doc_type
+
+    def satisfied(self, ingested, documents) -> bool:
+        of_type = [d for d in documents if d.get("document_type") == self.doc_type]
+        if not of_type:
+            return False
+        latest = max(of_type, key=lambda d: business_date_key(d.get("business_date", "")))
+        return any(d is latest for d in ingested)
+
+    def describe(self) -> str:
+        return f"latest {self.doc_type}"
+
+
+def _rule(value) -> Rule:
+    return value if isinstance(value, Rule) else HasType(value)
+
+
+class AnyOf(Rule):
+    def __init__(self, *rules):
+        self.rules = [_rule(r) for r in rules]
+
+    def satisfied(self, ingested, documents) -> bool:
+        return any(r.satisfied(ingested, documents) for r in self.rules)
+
+    def describe(self) -> str:
+        return " or ".join(r.describe() for r in self.rules)
+
+
+class AllOf(Rule):
+    def __init__(self, *rules):
+        self.rules = [_rule(r) for r in rules]
+
+    def satisfied(self, ingested, documents) -> bool:
+        return all(r.satisfied(ingested, documents) for r in self.rules)
+
+    def describe(self) -> str:
+        return " and ".join(f"({r.describe()})" if isinstance(r, AnyOf) else r.describe() for r in self.rules)
+
+
+# Sections that need the most recent document of each covered type, not just any of them
+LATEST_ONLY = {"Recent Developments"}
+
+
+def rules_from_coverage(coverage=None, latest=LATEST_ONLY) -> dict:
+    """One rule per section: any (or the latest, for LATEST_ONLY) document of a type it covers."""
+    coverage = SECTION_COVERAGE if coverage is None else coverage
+    return {section: AnyOf(*(Latest(t) if section in latest else t for t in sorted(types)))
+            for section, types in coverage.items()}
+
+
+# Per-intent document requirements. Coverage says what a section reads; these say what it cannot start
+# without (an Underwriting Memo alone is not enough for ABL). Intents without a rule fall back to
+# COVERAGE_RULES, and intents outside Section Coverage Analysis too are dispatched on the first ingested document.
+TRIGGER_RULES = {
+    "Business Description": AnyOf("10K", "10Q"),
+    "Recent Developments":  AnyOf(Latest("10Q"), Latest("Earnings")),
+    "ABL":                  AnyOf("Field Exam", "Inventory Appraisal"),
+}
+
+COVERAGE_RULES = rules_from_coverage()
+
+
+class TriggerEvaluator:
+    def __init__(self, intents, documents, *, rules=None, fallback=None, ingested=(), delta=()):
+        self.rules = TRIGGER_RULES if rules is None else rules
+        self.fallback = COVERAGE_RULES if fallback is None else fallback
+        self.documents = list(documents)
+        self.ingested = list(ingested)
+        self.delta = list(delta)
+        self.pending = list(intents)
+        self.dispatched = []    # (intent, reason) in dispatch order
+
+    def rule_for(self, intent: str) -> Rule:
+        if intent in self.rules:
+            return _rule(self.rules[intent])
+        if intent in self.fallback:
+            return _rule(self.fallback[intent])
+        return AnyOf(*sorted({d.get("document_type", "") for d in self.documents}))
+
+    def waiting_on(self, intent: str) -> list:
+        """Delta documents the intent covers that are not ingested yet."""
+        return [d for d in self.delta if covers(intent, d.get("document_type", ""))
+                and not any(d is x for x in self.ingested)]
+
+    def ready(self) -> list:
+        """Dispatch and return the pending intents whose requirements are met by what is ingested so far."""
+        fired = [i for i in self.pending
+                 if not self.waiting_on(i) and self.rule_for(i).satisfied(self.ingested, self.documents)]
+        for intent in fired:
+            self.pending.remove(intent)
+            self.dispatched.append((intent, self.rule_for(intent).describe()))
+        return fired
+
+    def on_ingested(self, doc: dict) -> list:
+        self.ingested.append(doc)
+        return self.ready()
+
+    def unsatisfiable(self) -> list:
+        """Pending intents that no remaining document can unblock."""
+        return [i for i in self.pending if not self.rule_for(i).satisfied(self.documents, self.documents)]
+
+    def finish(self) -> list:
+        """Ingestion is over: dispatch whatever is still pending (inputs missing from the review)."""
+        fired = self.pending[:]
+        self.dispatched.extend((i, "ingest complete") for i in fired)
+        self.pending.clear()
+        return fired